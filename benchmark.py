@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+⏱️ Benchmark suite for the audio to MP3 converter
+Synthesizes test recordings and measures probe, bitrate and conversion throughput
+"""
+
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+from typing import Dict, List
+
+import convert
+from convert import AudioConverter
+
+REPO_DIR = Path(__file__).parent
+BENCH_DIR = REPO_DIR / "test-files" / "bench"
+
+# Imported only on the code paths that need them; a plain `import convert` must not load these
+LAZY_MODULES = ('asyncio', 'ffmpeg', 'pydub', 'rich.progress', 'tomllib', 'concurrent.futures')
+
+# lavfi sources used to synthesize inputs (deterministic: fixed frequency / seed)
+SOURCES = {
+    'sine': "sine=frequency=440:sample_rate=44100:duration={duration}",
+    'noise': "anoisesrc=color=pink:sample_rate=44100:seed=42:duration={duration}",
+}
+
+# Input formats to synthesize: name → (extension, ffmpeg encoding arguments)
+FORMATS = {
+    'm4a': ('.m4a', ['-c:a', 'aac', '-b:a', '128k']),
+    'aac': ('.aac', ['-c:a', 'aac', '-b:a', '128k']),
+    'wav': ('.wav', ['-c:a', 'pcm_s16le']),
+    'flac': ('.flac', ['-c:a', 'flac']),
+    'ogg': ('.ogg', ['-c:a', 'libvorbis', '-q:a', '4']),
+    'opus': ('.opus', ['-c:a', 'libopus', '-b:a', '96k']),
+    # Video container: a small test pattern alongside the audio track
+    'mp4': ('.mp4', ['-f', 'lavfi', '-i', 'testsrc=size=320x240:rate=15',
+                     '-shortest', '-c:v', 'mpeg4', '-c:a', 'aac', '-b:a', '128k']),
+}
+
+
+def synthesize(directory: Path, durations: List[int], sources: List[str], formats: List[str]) -> List[Path]:
+    """Create one stereo file per (format, source, duration), reusing existing files"""
+    directory.mkdir(parents=True, exist_ok=True)
+    files = []
+    for name in formats:
+        extension, encode_args = FORMATS[name]
+        for source in sources:
+            for duration in durations:
+                path = directory / f"bench-{source}-{duration}s{extension}"
+                if not path.exists():
+                    subprocess.run([
+                        'ffmpeg', '-v', 'error', '-y',
+                        '-f', 'lavfi', '-i', SOURCES[source].format(duration=duration),
+                        '-ac', '2', *encode_args, str(path)
+                    ], check=True)
+                files.append(path)
+    return files
+
+
+def python_peak_rss_kb() -> int:
+    """Peak resident set size of this Python process so far (KB).
+
+    A running maximum, so it only describes the first stage measured; the
+    conversion stages report the peak of their own ffmpeg processes instead,
+    from the wait4() usage the converter records per file (see stage_totals).
+    """
+    scale = 1024 if sys.platform == 'darwin' else 1  # macOS reports bytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale
+
+
+def make_converter(output_dir: Path, **options) -> AudioConverter:
+    """Converter writing to a scratch directory with no persistent index"""
+    return AudioConverter(output_dir / "in", output_dir / "out", use_index=False, **options)
+
+
+def bench_probe(files: List[Path], scratch: Path, repeat: int) -> Dict:
+    """Time uncached get_audio_info per file"""
+    converter = make_converter(scratch)
+    per_file = {}
+    for path in files:
+        timings = []
+        for _ in range(repeat):
+            converter.probe_cache.clear()
+            start = time.perf_counter()
+            info = converter.get_audio_info(path)
+            timings.append(time.perf_counter() - start)
+        per_file[path.name] = {'seconds': min(timings), 'method': info.get('probe')}
+    return {'files': per_file, 'python_peak_rss_kb': python_peak_rss_kb()}
+
+
+def bench_bitrate(scratch: Path, number: int) -> Dict:
+    """Time calculate_optimal_bitrate calls"""
+    converter = make_converter(scratch)
+    seconds = min(timeit.repeat(lambda: converter.calculate_optimal_bitrate(3600.0), number=number, repeat=3))
+    return {'calls': number, 'ns_per_call': seconds / number * 1e9}
+
+
+def bench_convert_file(files: List[Path], scratch: Path, backends: List[str]) -> Dict:
+    """Time convert_file for each backend and input, with each file's stage metrics"""
+    stages = {}
+    for backend in backends:
+        converter = make_converter(scratch, backend=backend)
+        per_file = {}
+        results = []
+        for path in files:
+            duration = converter.get_audio_info(path)['duration']
+            start = time.perf_counter()
+            result = converter.convert_file(path, converter.output_dir / f"{path.name}.mp3")
+            wall = time.perf_counter() - start
+            results.append(result)
+            per_file[path.name] = {
+                'seconds': wall,
+                'realtime_factor': duration / wall if wall else None,
+                'success': result['success'],
+                'error': result.get('error'),
+                'stages': result.get('metrics'),
+            }
+        stages[backend] = {'files': per_file, 'stages': convert.stage_totals(results)}
+    return stages
+
+
+def bench_convert_files(files: List[Path], scratch: Path, backends: List[str], job_counts: List[int]) -> Dict:
+    """Time whole-batch convert_files for each backend and worker count, with stage totals"""
+    stages = {}
+    for backend in backends:
+        for jobs in job_counts:
+            converter = make_converter(scratch, backend=backend, jobs=jobs)
+            start = time.perf_counter()
+            results = converter.convert_files(files)
+            wall = time.perf_counter() - start
+            failed = sum(1 for r in results if 'error' in r)
+            converted_seconds = sum(r['duration'] for r in results if 'error' not in r)
+            stages[f"{backend}/jobs={jobs}"] = {
+                'seconds': wall,
+                'files_per_sec': (len(files) - failed) / wall if wall else None,
+                'realtime_factor': converted_seconds / wall if wall else None,
+                'failed': failed,
+                'stages': convert.stage_totals(results),
+            }
+    return stages
+
+
+def bench_formats(files: List[Path], scratch: Path, backend: str) -> Dict:
+    """Batch throughput per input format (single worker, so formats compare fairly)"""
+    groups: Dict[str, List[Path]] = {}
+    for path in files:
+        input_format = convert.input_format_for(path)
+        groups.setdefault(input_format.name if input_format else path.suffix, []).append(path)
+
+    stages = {}
+    for name, paths in groups.items():
+        converter = make_converter(scratch, backend=backend, jobs=1)
+        start = time.perf_counter()
+        results = converter.convert_files(paths)
+        wall = time.perf_counter() - start
+        ok = [r for r in results if 'error' not in r]
+        stages[name] = {
+            'files': len(paths),
+            'seconds': wall,
+            'files_per_sec': len(ok) / wall if wall else None,
+            'realtime_factor': sum(r['duration'] for r in ok) / wall if wall else None,
+            'failed': len(paths) - len(ok),
+            'probe': sorted({converter.get_audio_info(path).get('probe') for path in paths}),
+            'stages': convert.stage_totals(results),
+        }
+    return stages
+
+
+def import_time_us() -> int:
+    """Cumulative `import convert` time in microseconds, from python -X importtime"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import convert'],
+                            cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) == 3 and fields[2] == 'convert':
+            return int(fields[1])
+    raise RuntimeError("convert missing from -X importtime output")
+
+
+def bench_startup(repeat: int) -> Dict:
+    """Time `import convert` and `convert.py --help`, and list heavy modules loaded eagerly"""
+    import_us = min(import_time_us() for _ in range(repeat))
+
+    help_timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, 'convert.py', '--help'], cwd=REPO_DIR, capture_output=True, check=True)
+        help_timings.append(time.perf_counter() - start)
+
+    probe = ("import convert, json, sys; "
+             f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))")
+    loaded = subprocess.run([sys.executable, '-c', probe], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    return {
+        'import_ms': import_us / 1000,
+        'help_ms': min(help_timings) * 1000,
+        'eager_modules': json.loads(loaded.stdout),
+    }
+
+
+def check_startup(startup: Dict, budget_ms: float) -> List[str]:
+    """List startup budget violations"""
+    problems = []
+    if startup['import_ms'] > budget_ms:
+        problems.append(f"import convert: {startup['import_ms']:.1f}ms over the {budget_ms:g}ms budget")
+    if startup['eager_modules']:
+        problems.append(f"imported at startup: {', '.join(startup['eager_modules'])}")
+    return problems
+
+
+def ffmpeg_version() -> str:
+    """First line of `ffmpeg -version`"""
+    try:
+        result = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True, check=True)
+        return result.stdout.split('\n')[0]
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        return "unavailable"
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """List stages whose throughput dropped (or import time grew) more than tolerance versus baseline"""
+    regressions = []
+    for section in ('convert_files', 'formats'):
+        for stage, current in report.get(section, {}).items():
+            previous = baseline.get(section, {}).get(stage)
+            if not previous or not previous.get('files_per_sec') or not current.get('files_per_sec'):
+                continue
+            ratio = current['files_per_sec'] / previous['files_per_sec']
+            if ratio < 1 - tolerance:
+                regressions.append(f"{stage}: {previous['files_per_sec']:.2f} → {current['files_per_sec']:.2f} files/sec")
+
+    current, previous = report.get('startup'), baseline.get('startup')
+    if current and previous and current['import_ms'] > previous['import_ms'] * (1 + tolerance):
+        regressions.append(f"import convert: {previous['import_ms']:.1f} → {current['import_ms']:.1f} ms")
+    return regressions
+
+
+def parse_list(value: str, cast=str) -> List:
+    """Split a comma-separated option value"""
+    return [cast(item) for item in value.split(',') if item]
+
+
+def main():
+    """Run the benchmark suite and emit JSON"""
+    parser = argparse.ArgumentParser(description="Benchmark the audio to MP3 conversion pipeline")
+    parser.add_argument("--durations", default="10,60,300", help="Synthesized input durations in seconds (default: 10,60,300)")
+    parser.add_argument("--sources", default="sine,noise", help=f"lavfi sources to synthesize ({','.join(SOURCES)})")
+    parser.add_argument("--formats", default="m4a", help=f"Input formats to synthesize ({','.join(FORMATS)}; default: m4a)")
+    parser.add_argument("--backends", default=",".join(convert.available_backends()),
+                        help="Backends to benchmark (default: every installed one)")
+    parser.add_argument("--jobs", default="1,2,4", help="Worker counts for batch conversion (default: 1,2,4)")
+    parser.add_argument("--repeat", type=int, default=3, help="Probe repetitions per file, best is kept (default: 3)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report; exit 1 on throughput regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed throughput drop versus baseline (default: 0.2)")
+    parser.add_argument("--startup-only", action="store_true", help="Only measure startup time (no inputs or encodes)")
+    parser.add_argument("--startup-budget", type=float, metavar="MS",
+                        help="Exit 1 if `import convert` takes longer or loads a lazily imported module")
+    args = parser.parse_args()
+
+    if args.startup_only:
+        report = {'python': platform.python_version(), 'startup': bench_startup(args.repeat)}
+        print(json.dumps(report, indent=2))
+        problems = check_startup(report['startup'], args.startup_budget) if args.startup_budget else []
+        for line in problems:
+            print(f"❌ Startup: {line}", file=sys.stderr)
+        if problems:
+            sys.exit(1)
+        return
+
+    sources = parse_list(args.sources)
+    backends = parse_list(args.backends)
+    formats = parse_list(args.formats)
+    unknown = ([s for s in sources if s not in SOURCES] + [b for b in backends if b not in convert.ENCODER_BACKENDS]
+               + [f for f in formats if f not in FORMATS])
+    if unknown:
+        parser.error(f"unknown source/backend/format: {', '.join(unknown)}")
+
+    # Keep Rich output from mixing with the JSON report
+    convert.console.quiet = True
+
+    print("⏱️  Synthesizing inputs...", file=sys.stderr)
+    files = synthesize(BENCH_DIR, parse_list(args.durations, int), sources, formats)
+
+    print("⏱️  Measuring startup...", file=sys.stderr)
+    startup = bench_startup(args.repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scratch = Path(tmp)
+        print("⏱️  Probing...", file=sys.stderr)
+        probe = bench_probe(files, scratch, args.repeat)
+        bitrate = bench_bitrate(scratch, 100_000)
+        print("⏱️  Converting single files...", file=sys.stderr)
+        single = bench_convert_file(files, scratch, backends)
+        print("⏱️  Converting batches...", file=sys.stderr)
+        batch = bench_convert_files(files, scratch, backends, parse_list(args.jobs, int))
+        print("⏱️  Converting per format...", file=sys.stderr)
+        per_format = bench_formats(files, scratch, backends[0])
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'ffmpeg': ffmpeg_version(),
+        'inputs': {path.name: path.stat().st_size for path in files},
+        'startup': startup,
+        'get_audio_info': probe,
+        'calculate_optimal_bitrate': bitrate,
+        'convert_file': single,
+        'convert_files': batch,
+        'formats': per_format,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+    failed = False
+    if args.startup_budget:
+        for line in check_startup(startup, args.startup_budget):
+            print(f"❌ Startup: {line}", file=sys.stderr)
+            failed = True
+    if args.compare:
+        regressions = compare(report, json.loads(Path(args.compare).read_text()), args.tolerance)
+        for line in regressions:
+            print(f"❌ Regression: {line}", file=sys.stderr)
+        failed = failed or bool(regressions)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
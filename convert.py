@@ -5,50 +5,1348 @@ Python version with visual monitoring and smart compression
 """
 
 import argparse
+import errno
+import fnmatch
+import hashlib
+import importlib.util
+import json
+import os
+import queue
+import re
+import secrets
+import select
+import shutil
+import signal
+import struct
 import subprocess
+import sys
+import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import List, Dict
+from typing import Callable, List, Dict, Iterable, Iterator, NamedTuple, Optional, Set, Tuple
 
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeRemainingColumn
 
-import ffmpeg
-from pydub import AudioSegment
+# asyncio, rich.progress, ffmpeg-python, pydub and tomllib are imported where
+# they are used: `--help`, dry runs and cached checks start without them
 
 # Initialize Rich console
 console = Console()
 
+# MP4 atoms that only wrap other atoms (walked when looking for track info)
+MP4_CONTAINER_ATOMS = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+
+# Bitrates (kbps) libmp3lame can encode CBR at exactly; other values get rounded
+MP3_BITRATES = (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+
+# Sample entry fourcc → codec name as reported by ffprobe
+MP4_AUDIO_CODECS = {
+    b'mp4a': 'aac',
+    b'alac': 'alac',
+    b'ac-3': 'ac3',
+    b'ec-3': 'eac3',
+    b'Opus': 'opus',
+    b'fLaC': 'flac',
+    b'.mp3': 'mp3',
+}
+
+
+def iter_mp4_atoms(data: bytes, start: int = 0, end: Optional[int] = None):
+    """Yield (type, payload_start, payload_end) for each atom in a buffer"""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack('>I4s', data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                return
+            size = struct.unpack('>Q', data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield kind, pos + header, pos + size
+        pos += size
+
+
+def read_moov_atom(file_path: Path) -> Optional[bytes]:
+    """Read the raw 'moov' atom by seeking over top-level atoms (mdat is skipped, not read)"""
+    with open(file_path, 'rb') as f:
+        file_size = f.seek(0, 2)
+        pos = 0
+        while pos + 8 <= file_size:
+            f.seek(pos)
+            header = f.read(16)
+            if len(header) < 8:
+                return None
+            size, kind = struct.unpack('>I4s', header[:8])
+            header_size = 8
+            if size == 1:
+                if len(header) < 16:
+                    return None
+                size = struct.unpack('>Q', header[8:16])[0]
+                header_size = 16
+            elif size == 0:
+                size = file_size - pos
+            if size < header_size:
+                return None
+            if kind == b'moov':
+                f.seek(pos + header_size)
+                payload = f.read(size - header_size)
+                return payload if len(payload) == size - header_size else None
+            pos += size
+    return None
+
+
+def read_mp4_header(file_path: Path) -> Optional[Dict]:
+    """Read duration and audio stream layout from the MP4 container header.
+
+    Only the 'moov' atom is read, so the cost is independent of track length.
+    Returns None when the header is missing, truncated or has no audio track.
+    """
+    moov = read_moov_atom(file_path)
+    if not moov:
+        return None
+
+    duration = 0.0
+    for kind, start, end in iter_mp4_atoms(moov):
+        if kind == b'mvhd':
+            version = moov[start]
+            if version == 1:
+                timescale, length = struct.unpack('>IQ', moov[start + 20:start + 32])
+            else:
+                timescale, length = struct.unpack('>II', moov[start + 12:start + 20])
+            if timescale:
+                duration = length / timescale
+
+    stream = _find_mp4_audio_stream(moov, 0, len(moov))
+    if stream is None or duration <= 0:
+        return None
+
+    stream['duration'] = duration
+    return stream
+
+
+def _find_mp4_audio_stream(data: bytes, start: int, end: int) -> Optional[Dict]:
+    """Walk container atoms for the first 'stsd' audio sample entry"""
+    for kind, payload_start, payload_end in iter_mp4_atoms(data, start, end):
+        if kind == b'stsd':
+            # Full box header (4) + entry count (4), then the first sample entry
+            entry = payload_start + 8
+            if entry + 36 > payload_end:
+                return None
+            fourcc = data[entry + 4:entry + 8]
+            if fourcc not in MP4_AUDIO_CODECS:
+                return None
+            # SampleEntry (8 + 8) then AudioSampleEntry reserved (8)
+            channels, sample_size = struct.unpack('>HH', data[entry + 24:entry + 28])
+            sample_rate = struct.unpack('>I', data[entry + 32:entry + 36])[0] >> 16
+            return {
+                'codec': MP4_AUDIO_CODECS[fourcc],
+                'channels': channels,
+                'frame_rate': sample_rate,
+                'sample_width': max(sample_size // 8, 1),
+            }
+        if kind in MP4_CONTAINER_ATOMS:
+            stream = _find_mp4_audio_stream(data, payload_start, payload_end)
+            if stream is not None:
+                return stream
+    return None
+
+
+def read_ffprobe_info(file_path: Path) -> Optional[Dict]:
+    """Read duration and audio stream layout with ffprobe (no decoding).
+
+    ffprobe is started with spawn(), so a worker's Watchdog can kill it.
+    """
+    try:
+        process = spawn(['ffprobe', '-v', 'error', '-show_format', '-show_streams', '-of', 'json', str(file_path)],
+                        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return None
+    stdout, _ = process.communicate()
+    if process.returncode != 0:
+        return None
+    try:
+        probe = json.loads(stdout)
+    except ValueError:
+        return None
+
+    audio = next((s for s in probe.get('streams', []) if s.get('codec_type') == 'audio'), None)
+    if audio is None:
+        return None
+
+    duration = float(probe.get('format', {}).get('duration') or audio.get('duration') or 0)
+    if duration <= 0:
+        return None
+
+    bits = int(audio.get('bits_per_sample') or audio.get('bits_per_raw_sample') or 16)
+    return {
+        'duration': duration,
+        'codec': audio.get('codec_name', 'unknown'),
+        'channels': int(audio.get('channels') or 2),
+        'frame_rate': int(audio.get('sample_rate') or 44100),
+        'sample_width': max(bits // 8, 1),
+    }
+
+
+def read_decoded_info(file_path: Path, chunk_size: int = 1024 * 1024) -> Optional[Dict]:
+    """Decode the first audio stream and count its samples: the last resort for a duration.
+
+    ffmpeg writes WAV to a pipe; the header gives the layout and the PCM
+    after it is counted, never held. The decoder is started with spawn(),
+    so a worker's Watchdog can kill it.
+    """
+    args = ['ffmpeg', '-nostdin', '-v', 'error', '-i', str(file_path), '-map', '0:a:0',
+            '-c:a', 'pcm_s16le', '-f', 'wav', 'pipe:1']
+    try:
+        decoder = spawn(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return None
+    fmt = None
+    data_bytes = 0
+    try:
+        riff = decoder.stdout.read(12)
+        while riff[:4] == b'RIFF' and riff[8:12] == b'WAVE':
+            header = decoder.stdout.read(8)
+            if len(header) < 8:
+                break
+            kind, size = struct.unpack('<4sI', header)
+            if kind == b'data':
+                while chunk := decoder.stdout.read(chunk_size):
+                    data_bytes += len(chunk)
+                break
+            payload = decoder.stdout.read(size + size % 2)
+            if kind == b'fmt ' and len(payload) >= 16:
+                fmt = struct.unpack('<HHIIHH', payload[:16])
+    finally:
+        decoder.stdout.close()  # a decoder still writing gets EPIPE and exits
+        decoder.wait()
+
+    if decoder.returncode != 0 or fmt is None or not fmt[3] or not data_bytes:
+        return None
+    _, channels, sample_rate, byte_rate, _, bits = fmt
+    return {
+        'duration': data_bytes / byte_rate,
+        'codec': 'unknown',
+        'channels': channels,
+        'frame_rate': sample_rate,
+        'sample_width': max(bits // 8, 1),
+    }
+
+
+def snap_mp3_bitrate(kbps: float) -> int:
+    """Round down to the nearest standard MP3 bitrate"""
+    return max((rate for rate in MP3_BITRATES if rate <= kbps), default=MP3_BITRATES[0])
+
+
+def last_stderr_line(stderr: bytes) -> str:
+    """Return the last non-empty line of captured ffmpeg stderr"""
+    lines = [line.strip() for line in (stderr or b'').decode('utf-8', 'replace').splitlines()]
+    lines = [line for line in lines if line]
+    return lines[-1] if lines else ""
+
+
+def read_stderr_tail(stderr_file) -> str:
+    """Return the last non-empty line written to a captured stderr file"""
+    stderr_file.seek(0)
+    return last_stderr_line(stderr_file.read())
+
+
+def make_partial_path(output_path: Path) -> Path:
+    """Create the hidden sibling an output is encoded into before commit_file moves it into place.
+
+    The name carries a random token and is reserved with O_EXCL, so two
+    encodes of the same output never write into the same partial file.
+    """
+    while True:
+        partial = output_path.with_name(f".{output_path.stem}.{secrets.token_hex(4)}.partial{output_path.suffix}")
+        try:
+            os.close(os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+            return partial
+        except FileExistsError:
+            continue
+
+
+def commit_file(partial: Path, final: Path):
+    """Atomically replace final with a fully written file: fsync it, rename it, fsync the directory"""
+    with open(partial, 'rb') as f:
+        os.fsync(f.fileno())
+    os.replace(partial, final)
+    try:
+        directory = os.open(final.parent, os.O_RDONLY)
+    except OSError:
+        return  # directories cannot be opened for fsync on this platform
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+# Per-thread state of the worker converting a file (see Watchdog)
+_worker = threading.local()
+
+
+def spawn(args: List[str], **kwargs) -> subprocess.Popen:
+    """subprocess.Popen whose process is killed when the calling worker's Watchdog expires"""
+    process = subprocess.Popen(args, **kwargs)
+    watchdog = getattr(_worker, 'watchdog', None)
+    if watchdog is not None:
+        watchdog.track(process)
+    return process
+
+
+class Watchdog:
+    """Wall-clock limit for one file on a worker thread.
+
+    Processes started with spawn() while the watchdog is active are killed
+    when the time runs out, so a hung ffmpeg fails its encode and frees the
+    worker. A timeout of None never expires. killed tells whether expiring
+    actually stopped a process, as opposed to running out while the worker
+    was busy in Python. expire_all() stops every active watchdog at once,
+    for shutting down.
+    """
+
+    _active: Set['Watchdog'] = set()
+    _active_lock = threading.Lock()
+
+    def __init__(self, timeout: Optional[float]):
+        self.timeout = timeout
+        self.expired = False
+        self.killed = False
+        self._processes: List[subprocess.Popen] = []
+        self._lock = threading.Lock()
+        self._timer = None
+        if timeout is not None:
+            self._timer = threading.Timer(timeout, self.expire)
+            self._timer.daemon = True
+
+    def __enter__(self):
+        _worker.watchdog = self
+        with Watchdog._active_lock:
+            Watchdog._active.add(self)
+        if self._timer is not None:
+            self._timer.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._timer is not None:
+            self._timer.cancel()
+        with Watchdog._active_lock:
+            Watchdog._active.discard(self)
+        _worker.watchdog = None
+
+    @classmethod
+    def expire_all(cls):
+        """Expire every active watchdog, killing the processes of all workers"""
+        with cls._active_lock:
+            active = list(cls._active)
+        for watchdog in active:
+            watchdog.expire()
+
+    def track(self, process: subprocess.Popen):
+        with self._lock:
+            self._processes.append(process)
+            if self.expired:
+                self.killed |= self._kill(process)
+
+    def expire(self):
+        with self._lock:
+            self.expired = True
+            for process in self._processes:
+                self.killed |= self._kill(process)
+
+    @staticmethod
+    def _kill(process: subprocess.Popen) -> bool:
+        # Not Popen.kill(): its poll() could reap the child under the worker waiting on it
+        if process.returncode is None:
+            try:
+                os.kill(process.pid, signal.SIGKILL)
+                return True
+            except ProcessLookupError:
+                pass
+        return False
+
+
+def exit_on_sigterm(signum, frame):
+    """SIGTERM handler: exit through SystemExit so finally blocks clean up, as on Ctrl+C"""
+    raise SystemExit(128 + signum)
+
+
+# Why a file failed decides what happens next: only timeouts and transient
+# system errors are retried, and only failures down to the input itself
+# (including hangs) get it quarantined.
+TRANSIENT_ERRNOS = {errno.EAGAIN, errno.EINTR, errno.EBUSY, errno.ENOMEM, errno.EMFILE, errno.ENFILE, errno.ETXTBSY}
+ENVIRONMENT_ERRNOS = {errno.ENOSPC, errno.EDQUOT, errno.EACCES, errno.EPERM, errno.EROFS, errno.ENOENT}
+RETRY_CAUSES = ('timeout', 'transient')
+QUARANTINE_CAUSES = ('timeout', 'input')
+QUARANTINE_AFTER = 2
+
+
+def failure_cause(error: BaseException) -> str:
+    """Classify a conversion error as 'transient', 'environment' (disk, permissions) or 'input'.
+
+    ffmpeg failures arrive as RuntimeErrors holding its last stderr line,
+    so their message is matched against the same errno texts.
+    """
+    if isinstance(error, OSError) and error.errno is not None:
+        return 'transient' if error.errno in TRANSIENT_ERRNOS else 'environment'
+    message = str(error)
+    for cause, errnos in (('transient', TRANSIENT_ERRNOS), ('environment', ENVIRONMENT_ERRNOS)):
+        if any(os.strerror(number) in message for number in errnos):
+            return cause
+    return 'input'
+
+
+def wait_with_usage(process: subprocess.Popen) -> Dict:
+    """Wait for a child process and return its CPU seconds and peak RSS (KB).
+
+    Uses wait4() so the numbers belong to this child alone, even when other
+    workers' processes finish concurrently. Where wait4() is unavailable the
+    values are None.
+    """
+    if not hasattr(os, 'wait4'):
+        process.wait()
+        return {'cpu_time': None, 'peak_rss_kb': None}
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    scale = 1024 if sys.platform == 'darwin' else 1  # macOS reports bytes
+    return {'cpu_time': usage.ru_utime + usage.ru_stime, 'peak_rss_kb': usage.ru_maxrss // scale}
+
+
+def new_stage_metrics(**values) -> Dict:
+    """Per-file stage metrics (seconds, KB); None means not measurable"""
+    metrics = {'probe_time': 0.0, 'decode_time': None, 'encode_time': 0.0, 'queue_wait': 0.0,
+               'cpu_time': 0.0, 'peak_rss_kb': 0}
+    metrics.update(values)
+    return metrics
+
+
+def add_process_usage(metrics: Dict, usage: Dict):
+    """Fold one ffmpeg process's CPU time and peak RSS into metrics"""
+    if usage['cpu_time'] is None or metrics['cpu_time'] is None:
+        metrics['cpu_time'] = metrics['peak_rss_kb'] = None
+        return
+    metrics['cpu_time'] += usage['cpu_time']
+    metrics['peak_rss_kb'] = max(metrics['peak_rss_kb'], usage['peak_rss_kb'])
+
+
+def add_stage_metrics(total: Dict, metrics: Dict):
+    """Accumulate metrics from another encode pass (times add, peak RSS maxes)"""
+    for key in ('decode_time', 'encode_time', 'cpu_time'):
+        total[key] = None if total[key] is None or metrics[key] is None else total[key] + metrics[key]
+    if total['peak_rss_kb'] is None or metrics['peak_rss_kb'] is None:
+        total['peak_rss_kb'] = None
+    else:
+        total['peak_rss_kb'] = max(total['peak_rss_kb'], metrics['peak_rss_kb'])
+
+
+def stage_totals(results: List[Dict]) -> Dict:
+    """Aggregate per-file stage metrics; a stage is None if no file measured it"""
+    measured = [r['metrics'] for r in results if r.get('metrics')]
+    totals: Dict = {'files': len(measured)}
+    for key in ('probe_time', 'decode_time', 'encode_time', 'queue_wait', 'cpu_time'):
+        values = [m[key] for m in measured if m.get(key) is not None]
+        totals[key] = sum(values) if values else None
+    peaks = [m['peak_rss_kb'] for m in measured if m.get('peak_rss_kb') is not None]
+    totals['peak_rss_kb'] = max(peaks) if peaks else None
+    return totals
+
+
+def prometheus_metrics(results: List[Dict]) -> str:
+    """Render batch metrics in the Prometheus text exposition format"""
+    totals = stage_totals(results)
+    lines = [
+        "# HELP converter_files_total Files processed in the last batch by status.",
+        "# TYPE converter_files_total gauge",
+    ]
+    statuses: Dict[str, int] = {}
+    for result in results:
+        statuses[result['status']] = statuses.get(result['status'], 0) + 1
+    lines += [f'converter_files_total{{status="{status}"}} {count}' for status, count in sorted(statuses.items())]
+
+    lines += [
+        "# HELP converter_stage_seconds Wall time spent per pipeline stage in the last batch.",
+        "# TYPE converter_stage_seconds gauge",
+    ]
+    for stage in ('probe', 'decode', 'encode', 'queue_wait'):
+        value = totals['queue_wait' if stage == 'queue_wait' else f"{stage}_time"]
+        if value is not None:
+            lines.append(f'converter_stage_seconds{{stage="{stage}"}} {value:.6f}')
+
+    if totals['cpu_time'] is not None:
+        lines += [
+            "# HELP converter_ffmpeg_cpu_seconds CPU time used by ffmpeg processes in the last batch.",
+            "# TYPE converter_ffmpeg_cpu_seconds gauge",
+            f"converter_ffmpeg_cpu_seconds {totals['cpu_time']:.6f}",
+        ]
+    if totals['peak_rss_kb'] is not None:
+        lines += [
+            "# HELP converter_ffmpeg_peak_rss_bytes Largest ffmpeg resident set size in the last batch.",
+            "# TYPE converter_ffmpeg_peak_rss_bytes gauge",
+            f"converter_ffmpeg_peak_rss_bytes {totals['peak_rss_kb'] * 1024}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def user_cache_dir() -> Path:
+    """Per-user directory for results that outlive a run"""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(cache_home) / 'audio-converter'
+
+
+def write_cache_file(path: Path, data: Dict):
+    """Atomically replace a JSON cache file; a read-only cache directory is ignored"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_suffix(f".{os.getpid()}.tmp")
+        temp.write_text(json.dumps(data))
+        os.replace(temp, path)
+    except OSError:
+        pass  # read-only home: just measure again next time
+
+
+def ffmpeg_check_cache_path() -> Path:
+    """Where a successful ffmpeg check is remembered between runs"""
+    return user_cache_dir() / 'ffmpeg-check.json'
+
+
+def ffmpeg_binary() -> Optional[Dict]:
+    """Resolved path, size and mtime of the ffmpeg on PATH, or None if there is none"""
+    path = shutil.which('ffmpeg')
+    if path is None:
+        return None
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+    return {'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def ffmpeg_check_cached(binary: Dict) -> bool:
+    """True if this exact binary (same path, size and mtime) already passed the check"""
+    try:
+        cached = json.loads(ffmpeg_check_cache_path().read_text())
+    except (OSError, ValueError):
+        return False
+    return isinstance(cached, dict) and all(cached.get(key) == value for key, value in binary.items())
+
+
+def remember_ffmpeg_check(binary: Dict, version: str):
+    """Cache a successful check; failures are never cached so a fixed install is picked up"""
+    write_cache_file(ffmpeg_check_cache_path(), dict(binary, version=version))
+
+
+class InotifyWatcher:
+    """Minimal Linux inotify wrapper used to wake the watch loop when files land"""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+
+    def __init__(self, directory: Path):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+
+    @classmethod
+    def create(cls, directory: Path) -> Optional["InotifyWatcher"]:
+        """Return a watcher, or None where inotify is unavailable (use polling)"""
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            return cls(directory)
+        except (OSError, AttributeError):
+            return None
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """Block until events arrive or timeout expires; True if anything happened"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ProbeCache:
+    """Memoizes probe results per file, keyed on path, mtime and size"""
+
+    def __init__(self):
+        self._entries: Dict[tuple, Dict] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(file_path: Path) -> tuple:
+        """Cache key that changes whenever the file is replaced or rewritten"""
+        stat = file_path.stat()
+        return (str(file_path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+    def get(self, file_path: Path, loader, variant: str = "") -> Dict:
+        """Return cached info for file_path, calling loader(file_path) on a miss.
+
+        variant separates results of different analyses of the same file.
+        """
+        key = self.key(file_path) + (variant,)
+        with self._lock:
+            info = self._entries.get(key)
+            if info is not None:
+                self.hits += 1
+                return dict(info)
+            self.misses += 1
+
+        # Probe outside the lock so workers don't serialize on slow files
+        info = loader(file_path)
+        with self._lock:
+            self._entries[key] = info
+        return dict(info)
+
+    def discard(self, file_path: Path, variant: str = ""):
+        """Forget the cached info for file_path (e.g. a probe that was killed)"""
+        try:
+            key = self.key(file_path) + (variant,)
+        except OSError:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def peek(self, file_path: Path, variant: str = "") -> Optional[Dict]:
+        """Cached info for file_path without loading or counting, or None"""
+        key = self.key(file_path) + (variant,)
+        with self._lock:
+            info = self._entries.get(key)
+        return dict(info) if info is not None else None
+
+    def clear(self):
+        """Drop all cached entries and reset counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        """Return hit/miss counters"""
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+def read_wav_header(file_path: Path) -> Optional[Dict]:
+    """Read layout and duration from RIFF/WAVE 'fmt ' and 'data' chunk headers"""
+    with open(file_path, 'rb') as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+            return None
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                return None
+            kind, size = struct.unpack('<4sI', header)
+            if kind == b'fmt ':
+                body = f.read(size)
+                if len(body) < 16:
+                    return None
+                fmt = struct.unpack('<HHIIHH', body[:16])
+                f.seek(size % 2, 1)
+            elif kind == b'data':
+                if fmt is None:
+                    return None
+                audio_format, channels, sample_rate, byte_rate, _, bits = fmt
+                if not byte_rate:
+                    return None
+                codec = {1: f"pcm_s{bits}le" if bits > 8 else "pcm_u8", 3: f"pcm_f{bits}le"}.get(audio_format, 'wav')
+                return {
+                    'duration': size / byte_rate,
+                    'codec': codec,
+                    'channels': channels,
+                    'frame_rate': sample_rate,
+                    'sample_width': max(bits // 8, 1),
+                }
+            else:
+                f.seek(size + size % 2, 1)
+
+
+ADTS_SAMPLE_RATES = (96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000, 7350)
+
+
+def read_adts_header(file_path: Path) -> Optional[Dict]:
+    """Count raw AAC (ADTS) frames by walking their 7-byte headers, 1024 samples each"""
+    frames = 0
+    sample_rate = channels = None
+    with open(file_path, 'rb') as f:
+        head = f.read(10)
+        if head[:3] == b'ID3' and len(head) == 10:
+            f.seek(10 + ((head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]))
+        else:
+            f.seek(0)
+        while True:
+            header = f.read(7)
+            if len(header) < 7 or header[0] != 0xFF or header[1] & 0xF6 != 0xF0:
+                break
+            if sample_rate is None:
+                index = (header[2] >> 2) & 0xF
+                if index >= len(ADTS_SAMPLE_RATES):
+                    return None
+                sample_rate = ADTS_SAMPLE_RATES[index]
+                channels = ((header[2] & 0x1) << 2) | (header[3] >> 6)
+            length = ((header[3] & 0x3) << 11) | (header[4] << 3) | (header[5] >> 5)
+            if length < 7:
+                break
+            frames += (header[6] & 0x3) + 1
+            f.seek(length - 7, 1)
+    if not frames or not sample_rate or not channels:
+        return None
+    return {
+        'duration': frames * 1024 / sample_rate,
+        'codec': 'aac',
+        'channels': channels,
+        'frame_rate': sample_rate,
+        'sample_width': 2,
+    }
+
+
+def read_flac_header(file_path: Path) -> Optional[Dict]:
+    """Read layout and duration from the FLAC STREAMINFO block"""
+    with open(file_path, 'rb') as f:
+        head = f.read(10)
+        # Skip a leading ID3v2 tag (syncsafe size)
+        if head[:3] == b'ID3' and len(head) == 10:
+            size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+            f.seek(10 + size)
+            head = f.read(4)
+        else:
+            f.seek(4)
+            head = head[:4]
+        if head != b'fLaC':
+            return None
+        block = f.read(4 + 34)
+        if len(block) < 38 or block[0] & 0x7F != 0:
+            return None
+        packed = int.from_bytes(block[4 + 10:4 + 18], 'big')
+        sample_rate = packed >> 44
+        channels = ((packed >> 41) & 0x7) + 1
+        bits = ((packed >> 36) & 0x1F) + 1
+        total_samples = packed & 0xFFFFFFFFF
+        if not sample_rate or not total_samples:
+            return None
+        return {
+            'duration': total_samples / sample_rate,
+            'codec': 'flac',
+            'channels': channels,
+            'frame_rate': sample_rate,
+            'sample_width': max(bits // 8, 1),
+        }
+
+
+def read_ogg_header(file_path: Path) -> Optional[Dict]:
+    """Read Opus/Vorbis layout from the first Ogg page and duration from the last page's granule"""
+    with open(file_path, 'rb') as f:
+        first = f.read(4096)
+        if first[:4] != b'OggS' or len(first) < 28:
+            return None
+        packet = first[27 + first[26]:]
+        if packet[:8] == b'OpusHead' and len(packet) >= 16:
+            channels, pre_skip = packet[9], struct.unpack('<H', packet[10:12])[0]
+            codec, rate, sample_rate = 'opus', 48000, struct.unpack('<I', packet[12:16])[0] or 48000
+        elif packet[:7] == b'\x01vorbis' and len(packet) >= 16:
+            channels, pre_skip = packet[11], 0
+            rate = sample_rate = struct.unpack('<I', packet[12:16])[0]
+            codec = 'vorbis'
+        else:
+            return None
+
+        size = f.seek(0, 2)
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+        last = tail.rfind(b'OggS')
+        if last < 0 or last + 14 > len(tail) or not rate:
+            return None
+        granule = struct.unpack('<q', tail[last + 6:last + 14])[0]
+        if granule <= 0:
+            return None
+        return {
+            'duration': max(granule - pre_skip, 0) / rate,
+            'codec': codec,
+            'channels': channels,
+            'frame_rate': sample_rate,
+            'sample_width': 2,
+        }
+
+
+class InputFormat(NamedTuple):
+    """How to recognise, probe and decode one family of input files"""
+    name: str
+    extensions: Tuple[str, ...]
+    demuxer: Optional[str]                 # ffmpeg/pydub format name; None lets ffmpeg detect it
+    header_reader: Optional[Callable]      # fast metadata reader; None goes straight to ffprobe
+    video: bool = False                    # container may carry video; only audio is extracted
+
+
+# Extension (lower case, with dot) → InputFormat
+INPUT_FORMATS: Dict[str, InputFormat] = {}
+
+
+def register_input_format(input_format: InputFormat):
+    """Make an input format available to the scanner, probe and decoders"""
+    for extension in input_format.extensions:
+        INPUT_FORMATS[extension.lower()] = input_format
+
+
+def input_format_for(file_path: Path) -> Optional[InputFormat]:
+    """Registered input format for a path, by extension"""
+    return INPUT_FORMATS.get(file_path.suffix.lower())
+
+
+register_input_format(InputFormat('m4a', ('.m4a', '.m4b'), 'm4a', read_mp4_header))
+register_input_format(InputFormat('aac', ('.aac',), 'aac', read_adts_header))
+register_input_format(InputFormat('wav', ('.wav',), 'wav', read_wav_header))
+register_input_format(InputFormat('flac', ('.flac',), 'flac', read_flac_header))
+register_input_format(InputFormat('ogg', ('.ogg', '.oga', '.opus'), 'ogg', read_ogg_header))
+register_input_format(InputFormat('mp4', ('.mp4', '.m4v', '.mov'), None, read_mp4_header, video=True))
+register_input_format(InputFormat('matroska', ('.mkv', '.webm'), None, None, video=True))
+
+
+def run_analysis(args: List[str]) -> str:
+    """Run an ffmpeg analysis pass and return its stderr, where filters print their results"""
+    process = spawn(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    _, stderr = process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(last_stderr_line(stderr) or f"ffmpeg exited with {process.returncode}")
+    return stderr.decode(errors='replace')
+
+
+async def run_analysis_async(args: List[str]) -> str:
+    """run_analysis as an asyncio subprocess; the process is killed if the task is cancelled"""
+    import asyncio
+
+    process = await asyncio.create_subprocess_exec(
+        *args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    try:
+        _, stderr = await process.communicate()
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+    if process.returncode != 0:
+        raise RuntimeError(last_stderr_line(stderr) or f"ffmpeg exited with {process.returncode}")
+    return stderr.decode(errors='replace')
+
+
+async def to_thread_killable(func: Callable, *args):
+    """asyncio.to_thread under a Watchdog, for blocking work on the asyncio core.
+
+    If the awaiting task is cancelled, processes func started with spawn()
+    are killed and the thread is waited for, so func never outlives it.
+    """
+    import asyncio
+
+    watchdog = Watchdog(None)
+
+    def call():
+        with watchdog:
+            return func(*args)
+
+    task = asyncio.ensure_future(asyncio.to_thread(call))
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        watchdog.expire()
+        await asyncio.gather(task, return_exceptions=True)
+        raise
+
+
+def silence_command(file_path: Path, threshold_db: float, min_duration: float) -> List[str]:
+    """ffmpeg silencedetect pass over the audio of file_path"""
+    return ['ffmpeg', '-hide_banner', '-nostdin', '-nostats', '-i', str(file_path), '-vn',
+            '-af', f"silencedetect=noise={threshold_db}dB:duration={min_duration}", '-f', 'null', '-']
+
+
+def parse_silence(stderr: str) -> List[Tuple[float, Optional[float]]]:
+    """(start, end) pairs from silencedetect output; end is None for a silence still open at EOF"""
+    silences = []
+    start = None
+    for match in re.finditer(r"silence_(start|end): (-?[\d.]+)", stderr):
+        if match.group(1) == 'start':
+            start = max(0.0, float(match.group(2)))
+        elif start is not None:
+            silences.append((start, float(match.group(2))))
+            start = None
+    if start is not None:
+        silences.append((start, None))
+    return silences
+
+
+def detect_silence(file_path: Path, threshold_db: float, min_duration: float) -> List[Tuple[float, Optional[float]]]:
+    """(start, end) of every silence of at least min_duration, via ffmpeg silencedetect"""
+    return parse_silence(run_analysis(silence_command(file_path, threshold_db, min_duration)))
+
+
+def loudness_command(file_path: Path) -> List[str]:
+    """ffmpeg ebur128 pass (with true peak) over the audio of file_path"""
+    return ['ffmpeg', '-hide_banner', '-nostdin', '-nostats', '-i', str(file_path), '-vn',
+            '-af', 'ebur128=peak=true:framelog=quiet', '-f', 'null', '-']
+
+
+def parse_loudness(stderr: str) -> Dict:
+    """Integrated loudness, loudness range and true peak from the ebur128 summary"""
+    # The summary comes last; take the final value of each field
+    values = {}
+    for field, key in (('I', 'integrated'), ('LRA', 'range'), ('Peak', 'true_peak')):
+        matches = re.findall(rf"^\s*{field}:\s+(-?(?:[\d.]+|inf))", stderr, re.MULTILINE)
+        value = float(matches[-1]) if matches else None
+        values[key] = value if value is not None and abs(value) != float('inf') else None
+    if values['integrated'] is not None and values['integrated'] <= -70:
+        values['integrated'] = None  # below the absolute gate: nothing but silence
+    return values
+
+
+def measure_loudness(file_path: Path) -> Dict:
+    """Integrated loudness (LUFS), loudness range (LU) and true peak (dBTP) via ffmpeg ebur128.
+
+    Values the meter cannot measure (silent input) are None.
+    """
+    return parse_loudness(run_analysis(loudness_command(file_path)))
+
+
+def trimmed_duration(duration: float, silences: List[Tuple[float, Optional[float]]], max_silence: float) -> float:
+    """Duration left after silenceremove drops leading silence and cuts pauses to max_silence"""
+    removed = 0.0
+    for start, end in silences:
+        end = duration if end is None else end
+        if start <= 0.01:
+            removed += end - start
+        else:
+            removed += max(0.0, end - start - max_silence)
+    return max(0.0, duration - removed)
+
+
+class OutputTarget(NamedTuple):
+    """One rendition written for every input: a quality preset encoded with a given codec"""
+    quality: str
+    codec: str = 'mp3'
+
+
+# Built-in quality presets, in the same shape as a --presets file's [presets] table.
+# Target size is max_size_mb * compression_factor (or target_mb when given).
+DEFAULT_PRESETS = {
+    'small': {
+        'title': 'Small File (High Compression)',
+        'compression_factor': 0.7,  # 30% of original size target
+        'description': 'Maximum compression, smaller file size',
+        'use_case': 'Mobile, web, storage constrained',
+        'quality': 'Good',
+        'bitrate': [48, 96],
+        'mode': 'vbr',
+        'vbr_quality': 6,   # Lower quality, higher compression
+    },
+    'medium': {
+        'title': 'Medium File (Balanced)',
+        'compression_factor': 0.8,  # 20% of original size target
+        'description': 'Balanced size and quality',
+        'use_case': 'General use, podcasts, music',
+        'quality': 'Very Good',
+        'bitrate': [64, 160],
+        'mode': 'vbr',
+        'vbr_quality': 4,   # Good balance
+    },
+    'large': {
+        'title': 'Large File (High Quality)',
+        'compression_factor': 0.9,  # 10% of original size target
+        'description': 'High quality, larger file size',
+        'use_case': 'Archiving, high-fidelity audio',
+        'quality': 'Excellent',
+        'bitrate': [96, 256],
+        'mode': 'vbr',
+        'vbr_quality': 2,   # Higher quality, less compression
+    },
+}
+
+# Size limit the built-in presets' compression factors apply to
+DEFAULT_MAX_SIZE_MB = 16
+
+
+class Preset(NamedTuple):
+    """A compiled quality preset: everything needed to pick a bitrate and configure the encoder"""
+    name: str
+    title: str
+    description: str
+    use_case: str
+    quality: str
+    target_bytes: int
+    max_size_bytes: int
+    min_bitrate: int
+    max_bitrate: int
+    mode: str                   # 'vbr' or 'cbr'
+    vbr_quality: str            # libmp3lame -q:a used in VBR mode
+    sample_rate: Optional[int]  # resample outputs; None keeps the source rate
+    channels: Optional[int]     # downmix outputs; None keeps the source layout
+    threads: Optional[int]      # encoder threads; None lets ffmpeg decide
+    trim_silence: bool          # drop leading silence and shorten long pauses
+    silence_threshold_db: float # level below which audio counts as silence
+    max_silence: float          # pauses longer than this are cut down to it (seconds)
+
+
+def compile_preset(name: str, definition: Dict, max_size_mb: float = DEFAULT_MAX_SIZE_MB) -> Preset:
+    """Validate one preset definition and turn it into a Preset; raises ValueError"""
+    def number(key, kind=int, default=None, low=None, high=None):
+        value = definition.get(key, default)
+        if value is None:
+            return None
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"preset '{name}': {key} must be a number")
+        if (low is not None and value < low) or (high is not None and value > high):
+            raise ValueError(f"preset '{name}': {key} must be between {low} and {high}")
+        return kind(value)
+
+    max_size_mb = number('max_size_mb', float, max_size_mb, low=0.001)
+    if 'target_mb' in definition:
+        target_mb = number('target_mb', float, low=0.001, high=max_size_mb)
+    elif 'compression_factor' in definition:
+        target_mb = max_size_mb * number('compression_factor', float, low=0.01, high=1)
+    else:
+        raise ValueError(f"preset '{name}': needs target_mb or compression_factor")
+
+    bitrate = definition.get('bitrate')
+    if (not isinstance(bitrate, (list, tuple)) or len(bitrate) != 2
+            or not all(isinstance(b, int) and not isinstance(b, bool) for b in bitrate)
+            or not 8 <= bitrate[0] <= bitrate[1] <= 320):
+        raise ValueError(f"preset '{name}': bitrate must be [min, max] kbps within 8-320")
+
+    trim_silence = definition.get('trim_silence', False)
+    if not isinstance(trim_silence, bool):
+        raise ValueError(f"preset '{name}': trim_silence must be true or false")
+
+    mode = definition.get('mode', 'vbr')
+    if mode not in ('vbr', 'cbr'):
+        raise ValueError(f"preset '{name}': mode must be 'vbr' or 'cbr'")
+
+    return Preset(
+        name=name,
+        title=str(definition.get('title', name.title())),
+        description=str(definition.get('description', '')),
+        use_case=str(definition.get('use_case', '')),
+        quality=str(definition.get('quality', '')),
+        target_bytes=int(target_mb * 1024 * 1024),
+        max_size_bytes=int(max_size_mb * 1024 * 1024),
+        min_bitrate=bitrate[0],
+        max_bitrate=bitrate[1],
+        mode=mode,
+        vbr_quality=str(number('vbr_quality', int, 4, low=0, high=9)),
+        sample_rate=number('sample_rate', int, low=8000, high=192000),
+        channels=number('channels', int, low=1, high=8),
+        threads=number('threads', int, low=0, high=64),
+        trim_silence=trim_silence,
+        silence_threshold_db=number('silence_threshold_db', float, -50.0, low=-90, high=0),
+        max_silence=number('max_silence', float, 1.0, low=0.1, high=60),
+    )
+
+
+def compile_presets(definitions: Dict[str, Dict], max_size_mb: float = DEFAULT_MAX_SIZE_MB) -> Dict[str, Preset]:
+    """Compile preset definitions into a name → Preset lookup table"""
+    if not definitions:
+        raise ValueError("no presets defined")
+    return {name: compile_preset(name, definition, max_size_mb) for name, definition in definitions.items()}
+
+
+def load_presets(path: Path) -> Dict[str, Preset]:
+    """Load presets from a TOML or JSON file on top of the built-in ones.
+
+    The file has an optional top-level max_size_mb and a [presets] table
+    with one table per preset. A preset named like a built-in one only
+    overrides the keys it sets; replace = true drops the built-in presets.
+    Raises ValueError for unreadable or invalid files.
+    """
+    path = Path(path)
+    try:
+        if path.suffix == '.toml':
+            try:
+                import tomllib
+            except ImportError:  # Python < 3.11
+                try:
+                    import tomli as tomllib
+                except ImportError:
+                    raise ValueError("TOML presets need Python 3.11+ or the tomli package") from None
+            with open(path, 'rb') as f:
+                data = tomllib.load(f)
+        else:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"cannot read presets from {path}: {e}") from e
+
+    if not isinstance(data, dict) or not isinstance(data.get('presets'), dict):
+        raise ValueError(f"{path}: expected a 'presets' table")
+    definitions = {} if data.get('replace') else {name: dict(d) for name, d in DEFAULT_PRESETS.items()}
+    for name, definition in data['presets'].items():
+        if not isinstance(definition, dict):
+            raise ValueError(f"{path}: preset '{name}' must be a table")
+        definitions.setdefault(name, {}).update(definition)
+    return compile_presets(definitions, data.get('max_size_mb', DEFAULT_MAX_SIZE_MB))
+
+
+# Presets used unless a --presets file is given
+PRESETS = compile_presets(DEFAULT_PRESETS)
+
+
+class EncoderBackend(NamedTuple):
+    """A way of encoding one input to a batch of outputs, selectable with --backend"""
+    name: str
+    description: str
+    encode: Callable[..., Dict]             # (converter, input_path, [(output_path, bitrate, target)]) -> stage metrics
+    available: Callable[[], bool]           # installed on this host?
+    codecs: Tuple[str, ...] = ('mp3', 'aac', 'opus')
+
+
+ENCODER_BACKENDS: Dict[str, EncoderBackend] = {}
+
+
+def register_encoder_backend(backend: EncoderBackend):
+    """Add (or replace) an encoder backend"""
+    ENCODER_BACKENDS[backend.name] = backend
+
+
+def available_backends(codecs: Iterable[str] = ()) -> List[str]:
+    """Names of the installed backends that can write every codec in codecs"""
+    codecs = set(codecs)
+    return [name for name, backend in ENCODER_BACKENDS.items()
+            if codecs <= set(backend.codecs) and backend.available()]
+
+
+def binary_available(name: str) -> Callable[[], bool]:
+    return lambda: shutil.which(name) is not None
+
+
+def module_available(name: str) -> Callable[[], bool]:
+    return lambda: importlib.util.find_spec(name) is not None
+
+
+def partial_digest(file_path: Path, sample_size: int = 64 * 1024) -> str:
+    """Cheap prefilter hash over the size, first and last sample_size bytes"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        size = f.seek(0, 2)
+        digest.update(size.to_bytes(8, 'little'))
+        f.seek(0)
+        digest.update(f.read(sample_size))
+        if size > sample_size:
+            f.seek(max(sample_size, size - sample_size))
+            digest.update(f.read(sample_size))
+    return digest.hexdigest()
+
+
+def file_digest(file_path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Hash file contents in fixed-size chunks (BLAKE2b, 128-bit)"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MetadataIndex:
+    """Persistent JSON-lines index of probe metadata and conversion results.
+
+    Records are appended as they change and the last line for a path wins,
+    so a crash can lose at most the line being written. A record is only
+    trusted while the file's mtime and size still match.
+    """
+
+    FILENAME = ".converter-index.jsonl"
+
+    def __init__(self, path: Path, read_only: bool = False):
+        self.path = Path(path)
+        self.read_only = read_only
+        self._records: Dict[str, Dict] = {}
+        self._lines = 0
+        self._handle = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self._load()
+
+    def _load(self):
+        """Load existing records, skipping lines that were cut off mid-write"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    self._records[record['path']] = record
+                    self._lines += 1
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+    @staticmethod
+    def _stat_key(file_path: Path) -> tuple:
+        stat = file_path.stat()
+        return str(file_path.resolve()), stat.st_mtime_ns, stat.st_size
+
+    def get(self, file_path: Path) -> Optional[Dict]:
+        """Return the record for file_path if it is still up to date"""
+        path, mtime_ns, size = self._stat_key(file_path)
+        record = self._records.get(path)
+        if record is None or record.get('mtime_ns') != mtime_ns or record.get('size') != size:
+            return None
+        return record
+
+    def get_info(self, file_path: Path) -> Optional[Dict]:
+        """Return indexed probe info for file_path if it is still up to date"""
+        record = self.get(file_path)
+        if record is None or 'info' not in record:
+            return None
+        with self._lock:
+            self.hits += 1
+        return dict(record['info'], size=record['size'])
+
+    def get_analysis(self, file_path: Path, key: str) -> Optional[Dict]:
+        """Return a cached analysis result for file_path if it is still up to date"""
+        record = self.get(file_path)
+        if record is None or key not in record.get('analysis', {}):
+            return None
+        return dict(record['analysis'][key])
+
+    def update_analysis(self, file_path: Path, key: str, result: Dict):
+        """Store an analysis result next to the file's probe metadata"""
+        record = self.get(file_path) or {}
+        self.update(file_path, analysis=dict(record.get('analysis', {}), **{key: result}))
+
+    def update(self, file_path: Path, **fields):
+        """Merge fields into the record for file_path and append it to disk"""
+        path, mtime_ns, size = self._stat_key(file_path)
+        with self._lock:
+            record = self._records.get(path)
+            if record is None or record.get('mtime_ns') != mtime_ns or record.get('size') != size:
+                record = {'path': path, 'mtime_ns': mtime_ns, 'size': size}
+            record = dict(record, **fields)
+            self._records[path] = record
+            if self.read_only:
+                return
+            if self._handle is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._handle = open(self.path, 'a', encoding='utf-8')
+            self._handle.write(json.dumps(record, separators=(',', ':')) + "\n")
+            self._handle.flush()
+            self._lines += 1
+
+    def close(self):
+        """Close the index, compacting it when superseded lines dominate"""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        if self.read_only or self._lines <= 2 * len(self._records) + 100:
+            return
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in self._records.values():
+                f.write(json.dumps(record, separators=(',', ':')) + "\n")
+        commit_file(tmp_path, self.path)
+        self._lines = len(self._records)
+
+
+class JobJournal:
+    """Append-only JSON-lines journal of the files a batch has finished, read by --resume.
+
+    Each line is flushed and fsynced once the file's outputs are in place,
+    so after a crash it lists exactly the files that need no more work. An
+    entry only counts while the input's size and mtime are unchanged, its
+    outputs still exist and were made with the requested settings.
+    """
+
+    FILENAME = ".converter-journal.jsonl"
+    DONE = ('OK', 'OVER_LIMIT', 'DEDUPED', 'SKIPPED')
+
+    def __init__(self, path: Path, resume: bool = False):
+        self.path = Path(path)
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        if resume:
+            self._load()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # A fresh batch starts a fresh journal
+        self._handle = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+
+    def _load(self):
+        """Load entries, skipping a last line cut off mid-write"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self._entries[entry['filename']] = entry
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+    def completed(self, filename: str, file_path: Path, signatures: List[str]) -> Optional[Dict]:
+        """The journaled result for a file that needs no more work, else None"""
+        entry = self._entries.get(filename)
+        if entry is None or entry['result'].get('status') not in self.DONE:
+            return None
+        stat = file_path.stat()
+        if (entry['size'], entry['mtime_ns']) != (stat.st_size, stat.st_mtime_ns):
+            return None
+        if not set(signatures) <= set(entry['signatures']):
+            return None
+        if not all(Path(output['output']).exists() for output in entry['result'].get('outputs', [])):
+            return None
+        return entry['result']
+
+    def record(self, filename: str, file_path: Path, signatures: List[str], result: Dict):
+        """Durably append the outcome for one input file"""
+        stat = file_path.stat()
+        entry = {'filename': filename, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                 'signatures': signatures, 'result': result}
+        line = json.dumps(entry, separators=(',', ':')) + "\n"
+        with self._lock:
+            self._entries[filename] = entry
+            self._handle.write(line)
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+
+    def close(self):
+        self._handle.close()
+
+
 class AudioConverter:
     """Main audio converter class with visual feedback and quality options"""
 
-    # Quality levels with compression factors
-    QUALITY_LEVELS = {
-        'small': {
-            'name': 'Small File (High Compression)',
-            'compression_factor': 0.7,  # 30% of original size target
-            'description': 'Maximum compression, smaller file size',
-            'use_case': 'Mobile, web, storage constrained',
-            'quality': 'Good',
-            'bitrate_range': '48-96 kbps'
-        },
-        'medium': {
-            'name': 'Medium File (Balanced)',
-            'compression_factor': 0.8,  # 20% of original size target
-            'description': 'Balanced size and quality',
-            'use_case': 'General use, podcasts, music',
-            'quality': 'Very Good',
-            'bitrate_range': '64-160 kbps'
-        },
-        'large': {
-            'name': 'Large File (High Quality)',
-            'compression_factor': 0.9,  # 10% of original size target
-            'description': 'High quality, larger file size',
-            'use_case': 'Archiving, high-fidelity audio',
-            'quality': 'Excellent',
-            'bitrate_range': '96-256 kbps'
-        }
+    # Output codecs selectable with --codec: ffmpeg encoder, file extension and muxer
+    CODECS = {
+        'mp3': {'encoder': 'libmp3lame', 'extension': '.mp3', 'muxer': 'mp3', 'mime': 'audio/mpeg'},
+        'aac': {'encoder': 'aac', 'extension': '.m4a', 'muxer': 'ipod', 'mime': 'audio/mp4'},
+        'opus': {'encoder': 'libopus', 'extension': '.opus', 'muxer': 'opus', 'mime': 'audio/ogg'},
     }
 
+    # Default --normalize target (LUFS) and the true peak ceiling its gain must respect (dBTP)
+    LOUDNESS_TARGET = -16.0
+    TRUE_PEAK_LIMIT = -1.0
+
+    # Output formats selectable with --report
+    REPORT_FORMATS = ('text', 'json', 'ndjson')
+
+    # Maximum encodes per file when --strict-size has to re-encode an overshoot
+    MAX_SIZE_PASSES = 3
+
+    # Synthesized clip used to time the backends for --backend auto
+    BENCHMARK_SECONDS = 10
+
     def __init__(
         self,
         input_dir: str = "input",
@@ -57,136 +1355,485 @@ class AudioConverter:
         dry_run: bool = False,
         quality_locked: bool = False,
         convert_all: bool = False,
+        use_index: bool = True,
+        jobs: Optional[int] = None,
+        backend: str = "ffmpeg",
+        buffer_size: int = 256 * 1024,
+        strict_size: bool = False,
+        incremental: bool = False,
+        dedup: bool = False,
+        watch: bool = False,
+        poll_interval: float = 2.0,
+        settle_seconds: float = 5.0,
+        metrics_path: Optional[str] = None,
+        report: str = "text",
+        recursive: bool = False,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        formats: Optional[List[str]] = None,
+        qualities: Optional[List[str]] = None,
+        codecs: Optional[List[str]] = None,
+        presets: Optional[Dict[str, Preset]] = None,
+        trim_silence: bool = False,
+        normalize: Optional[float] = None,
+        use_async: bool = False,
+        job_timeout: Optional[float] = None,
+        resume: bool = False,
+        retries: int = 0,
+        retry_backoff: float = 2.0,
+        quarantine_dir: Optional[str] = None,
     ):
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
+        self.presets = presets or PRESETS
+        self.trim_silence = trim_silence
+        self.normalize = normalize
+        self.use_async = use_async
+        self.job_timeout = job_timeout
+        self.resume = resume
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.quarantine_dir = Path(quarantine_dir) if quarantine_dir else None
+        self.journal: Optional[JobJournal] = None
+        self._aborting = threading.Event()
         self.quality = quality
+        self.codecs = list(codecs or ['mp3'])
+        self.set_targets(list(qualities or [quality]))
         self.dry_run = dry_run
         self.quality_locked = quality_locked
         self.convert_all = convert_all
-        self.max_size_mb = 16
-        self.max_size_bytes = self.max_size_mb * 1024 * 1024
-        self.compression_factor = self.QUALITY_LEVELS[quality]['compression_factor']
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        self.backend = backend
+        self._backend_lock = threading.Lock()
+        self.buffer_size = buffer_size
+        self.strict_size = strict_size
+        self.incremental = incremental
+        self.dedup = dedup
+        self.watch_mode = watch
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.metrics_path = metrics_path
+        self.report = report
+        self.recursive = recursive
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.formats = set(formats or [])
+        # Inputs whose outputs keep the source extension (see note_stem_collisions)
+        self.stem_collisions: Set[Path] = set()
+        self._report: Dict = {}
+        self._report_lock = threading.Lock()
+        if report != 'text':
+            # Machine-readable output owns stdout; skip Rich rendering entirely
+            console.quiet = True
+        self.probe_cache = ProbeCache()
+        self.analysis_cache = ProbeCache()
 
         # Ensure directories exist
         self.input_dir.mkdir(exist_ok=True)
         self.output_dir.mkdir(exist_ok=True)
 
+        # Persistent metadata index (read-only during dry runs)
+        self.index = MetadataIndex(self.output_dir / MetadataIndex.FILENAME, read_only=dry_run) if use_index else None
+
+    def close(self):
+        """Flush persistent state"""
+        if self.index is not None:
+            self.index.close()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
     def show_welcome(self):
         """Display simple welcome banner"""
         console.print("[bold blue]🎵 M4A to MP3 Converter[/bold blue] [dim]v3.0[/dim]")
-        console.print("[green]Smart compression under 16MB[/green]")
+        max_size_mb = max(preset.max_size_bytes for preset in self.presets.values()) / (1024 * 1024)
+        console.print(f"[green]Smart compression under {max_size_mb:g}MB[/green]")
         console.print()
 
     def check_ffmpeg(self) -> bool:
-        """Verify ffmpeg is available before processing."""
+        """Verify ffmpeg is available before processing.
+
+        `ffmpeg -version` only runs when the binary on PATH changed since the
+        last successful check (see ffmpeg_check_cache_path).
+        """
+        binary = ffmpeg_binary()
+        if binary is not None and ffmpeg_check_cached(binary):
+            return True
         try:
-            subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True, check=True)
+            if binary is None:
+                raise FileNotFoundError('ffmpeg')
+            result = subprocess.run([binary['path'], '-version'], capture_output=True, text=True, check=True)
+            remember_ffmpeg_check(binary, result.stdout.split('\n')[0])
             return True
         except (FileNotFoundError, subprocess.CalledProcessError):
-            console.print("[red]❌ FFmpeg not found. Please install it first.[/red]")
-            console.print("[dim]macOS: brew install ffmpeg[/dim]")
-            console.print("[dim]Ubuntu/Debian: sudo apt install ffmpeg[/dim]")
+            self.show_ffmpeg_missing()
             return False
 
-    def find_m4a_files(self) -> List[Path]:
-        """Find all M4A files in input directory"""
-        return list(self.input_dir.glob("*.m4a"))
+    async def check_ffmpeg_async(self) -> bool:
+        """check_ffmpeg without blocking the event loop"""
+        import asyncio
 
-    def get_audio_info(self, file_path: Path) -> Dict:
-        """Get audio file information using pydub"""
+        binary = ffmpeg_binary()
+        if binary is not None and ffmpeg_check_cached(binary):
+            return True
+        if binary is not None:
+            process = await asyncio.create_subprocess_exec(
+                binary['path'], '-version', stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+            stdout, _ = await process.communicate()
+            if process.returncode == 0:
+                remember_ffmpeg_check(binary, stdout.decode(errors='replace').split('\n')[0])
+                return True
+        self.show_ffmpeg_missing()
+        return False
+
+    @staticmethod
+    def show_ffmpeg_missing():
+        console.print("[red]❌ FFmpeg not found. Please install it first.[/red]")
+        console.print("[dim]macOS: brew install ffmpeg[/dim]")
+        console.print("[dim]Ubuntu/Debian: sudo apt install ffmpeg[/dim]")
+
+    def find_audio_files(self) -> List[Path]:
+        """Find all supported audio files in input directory"""
+        return list(self.iter_input_files())
+
+    def iter_input_files(self) -> Iterator[Path]:
+        """Lazily yield files with a registered input extension (any case) under input_dir.
+
+        Uses os.scandir without materialising the tree, so callers can start
+        converting before the scan finishes. Subdirectories are walked when
+        recursive is set (symlinked directories are not followed, and the
+        output directory is skipped). Include/exclude globs match either the
+        path relative to input_dir or the bare file name.
+        """
+        output_dir = os.path.realpath(self.output_dir)
+        stack = [self.input_dir]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as scan:
+                    entries = sorted(scan, key=lambda entry: entry.name)
+            except OSError:
+                continue
+
+            files = []
+            subdirectories = []
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if self.recursive and os.path.realpath(entry.path) != output_dir:
+                            subdirectories.append(Path(entry.path))
+                        continue
+                    if not entry.is_file() or not self.accepts(entry.name):
+                        continue
+                except OSError:
+                    continue
+                file_path = Path(entry.path)
+                if self.matches_patterns(file_path):
+                    files.append(file_path)
+            # Outputs only collide within a directory, so it is checked before any of its files is handed out
+            self.note_stem_collisions(files)
+            yield from files
+            # Files of a directory come first, then its subdirectories in name order
+            stack.extend(reversed(subdirectories))
+
+    def note_stem_collisions(self, files: Iterable[Path]):
+        """Make inputs that only differ in extension (talk.m4a, talk.wav) keep it in their output name.
+
+        Otherwise both would be written to talk.mp3. Colliding inputs get
+        talk.m4a.mp3 and talk.wav.mp3 instead; names are compared without case.
+        """
+        by_output: Dict[str, List[Path]] = {}
+        for file_path in files:
+            by_output.setdefault(os.path.splitext(self.relative_name(file_path))[0].casefold(), []).append(file_path)
+        for same_output in by_output.values():
+            new = [file_path for file_path in same_output if file_path not in self.stem_collisions]
+            if len(same_output) < 2 or not new:
+                continue
+            self.stem_collisions.update(same_output)
+            console.print(f"[yellow]⚠️  {', '.join(self.relative_name(f) for f in same_output)} share an output name; "
+                          f"keeping their extensions (e.g. {self.output_path_for(same_output[0]).name})[/yellow]")
+
+    def accepts(self, filename: str) -> bool:
+        """True if the file name has a registered extension in an enabled format"""
+        input_format = INPUT_FORMATS.get(os.path.splitext(filename)[1].lower())
+        return input_format is not None and (not self.formats or input_format.name in self.formats)
+
+    def matches_patterns(self, file_path: Path) -> bool:
+        """Apply --include/--exclude globs to a path under input_dir"""
+        relative = self.relative_name(file_path)
+        name = file_path.name
+
+        def matches(pattern: str) -> bool:
+            return fnmatch.fnmatch(relative, pattern) or fnmatch.fnmatch(name, pattern)
+
+        if self.include and not any(matches(p) for p in self.include):
+            return False
+        return not any(matches(p) for p in self.exclude)
+
+    def relative_name(self, file_path: Path) -> str:
+        """Path relative to input_dir (POSIX style), or the file name if outside it"""
         try:
-            audio = AudioSegment.from_file(str(file_path), format="m4a")
-            duration_seconds = len(audio) / 1000
-            file_size = file_path.stat().st_size
+            return file_path.relative_to(self.input_dir).as_posix()
+        except ValueError:
+            return file_path.name
 
-            return {
-                'duration': duration_seconds,
-                'size': file_size,
-                'channels': audio.channels,
-                'frame_rate': audio.frame_rate,
-                'sample_width': audio.sample_width
-            }
-        except Exception as e:
-            console.print(f"[red]Error reading {file_path.name}: {e}[/red]")
-            return {
-                'duration': 0,
-                'size': file_path.stat().st_size,
-                'channels': 2,
-                'frame_rate': 44100,
-                'sample_width': 2
-            }
+    def get_audio_info(self, file_path: Path) -> Dict:
+        """Get audio file information, probing each file at most once per run"""
+        return self.probe_cache.get(file_path, self._load_audio_info)
+
+    def _load_audio_info(self, file_path: Path) -> Dict:
+        """Load audio info from the persistent index, probing on a miss"""
+        start = time.perf_counter()
+        if self.index is not None:
+            info = self.index.get_info(file_path)
+            if info is not None:
+                info['probe_time'] = time.perf_counter() - start
+                return info
+
+        info = self.probe_audio_info(file_path)
+        info['probe_time'] = time.perf_counter() - start
+        if self.index is not None and info['duration'] > 0:
+            self.index.update(file_path, info={k: v for k, v in info.items() if k not in ('size', 'probe_time')})
+        return info
+
+    def get_analysis(self, file_path: Path, key: str, analyzer: Callable[[Path], Dict]) -> Dict:
+        """Result of analyzer(file_path), cached in memory and in the metadata index under key"""
+        def load(path: Path) -> Dict:
+            if self.index is not None:
+                cached = self.index.get_analysis(path, key)
+                if cached is not None:
+                    return cached
+            result = analyzer(path)
+            if self.index is not None:
+                self.index.update_analysis(path, key, result)
+            return result
+        return self.analysis_cache.get(file_path, load, variant=key)
+
+    def trims_silence(self, quality: Optional[str] = None) -> bool:
+        """True if outputs of this preset get silence trimmed"""
+        return self.trim_silence or self.presets[quality or self.quality].trim_silence
+
+    @staticmethod
+    def silence_key(preset: Preset) -> str:
+        """Analysis cache key for a preset's silence detection settings"""
+        return f"silence:{preset.silence_threshold_db:g}:{preset.max_silence:g}"
+
+    def analyses_for(self, file_path: Path, qualities: Iterable[str]) -> Dict[str, tuple]:
+        """Analysis passes these presets need: cache key → (ffmpeg command, stderr parser)"""
+        jobs = {}
+        for quality in qualities:
+            preset = self.presets[quality]
+            if self.trims_silence(quality):
+                jobs[self.silence_key(preset)] = (
+                    silence_command(file_path, preset.silence_threshold_db, preset.max_silence),
+                    lambda stderr: {'silences': [list(s) for s in parse_silence(stderr)]},
+                )
+        if self.normalize is not None:
+            jobs['loudness'] = (loudness_command(file_path), parse_loudness)
+        return jobs
+
+    async def analyze_async(self, file_path: Path, qualities: Iterable[str]):
+        """Run the analysis passes these presets need as asyncio subprocesses, filling the caches"""
+        for key, (command, parser) in self.analyses_for(file_path, qualities).items():
+            cached = self.analysis_cache.peek(file_path, key)
+            if cached is None and self.index is not None:
+                cached = self.index.get_analysis(file_path, key)
+            result = cached if cached is not None else parser(await run_analysis_async(command))
+            self.get_analysis(file_path, key, lambda path, result=result: result)
+
+    def output_duration(self, file_path: Path, info: Dict, quality: Optional[str] = None) -> float:
+        """Duration the encoded output will have: shortened when silence is trimmed.
+
+        The silence analysis decodes the whole file once; its result is
+        cached with the probe metadata, so other presets and re-runs reuse it.
+        """
+        preset = self.presets[quality or self.quality]
+        if not self.trims_silence(preset.name):
+            return info['duration']
+        analysis = self.get_analysis(file_path, self.silence_key(preset), lambda path: {
+            'silences': [list(s) for s in detect_silence(path, preset.silence_threshold_db, preset.max_silence)]
+        })
+        return trimmed_duration(info['duration'], analysis['silences'], preset.max_silence) or info['duration']
+
+    def loudness_gain(self, file_path: Path) -> float:
+        """Gain (dB) bringing file_path to the --normalize target without exceeding the peak limit.
+
+        The loudness measurement is cached with the probe metadata, so other
+        presets and re-encodes reuse it.
+        """
+        loudness = self.get_analysis(file_path, "loudness", measure_loudness)
+        if loudness['integrated'] is None:
+            return 0.0
+        gain = self.normalize - loudness['integrated']
+        if loudness['true_peak'] is not None:
+            gain = min(gain, self.TRUE_PEAK_LIMIT - loudness['true_peak'])
+        return round(gain, 2)
+
+    def probe_audio_info(self, file_path: Path) -> Dict:
+        """Probe audio file information from container metadata.
+
+        Tries the format's own header reader first (MP4 atoms, WAV chunks,
+        FLAC STREAMINFO, Ogg pages), then ffprobe, and only decodes the
+        whole file with FFmpeg when neither yields a usable duration. Both
+        run through spawn(), so the worker's Watchdog can kill them.
+        """
+        file_size = file_path.stat().st_size
+        input_format = input_format_for(file_path)
+
+        readers = [('ffprobe', read_ffprobe_info), ('decode', read_decoded_info)]
+        if input_format is not None and input_format.header_reader is not None:
+            readers.insert(0, ('header', input_format.header_reader))
+        for method, reader in readers:
+            try:
+                info = reader(file_path)
+            except (OSError, struct.error, ValueError):
+                info = None
+            if info:
+                info.update({'size': file_size, 'probe': method})
+                return info
+
+        console.print(f"[red]Error reading {file_path.name}: no audio stream could be measured[/red]")
+        return {
+            'duration': 0,
+            'size': file_size,
+            'channels': 2,
+            'frame_rate': 44100,
+            'sample_width': 2
+        }
+
+    @staticmethod
+    def pydub_format(file_path: Path) -> Optional[str]:
+        """Format hint for pydub; None lets ffmpeg detect the container"""
+        input_format = input_format_for(file_path)
+        return input_format.demuxer if input_format is not None else None
 
-    def calculate_optimal_bitrate(self, duration_seconds: float) -> int:
+    def calculate_optimal_bitrate(self, duration_seconds: float, quality: Optional[str] = None) -> int:
         """Calculate optimal bitrate based on selected quality level"""
-        # Apply compression factor to target size
-        target_bytes = int(self.max_size_bytes * self.compression_factor)
-        bitrate_bps = (target_bytes * 8) / duration_seconds
+        preset = self.presets[quality or self.quality]
+        bitrate_bps = (preset.target_bytes * 8) / duration_seconds
         bitrate_kbps = int(bitrate_bps / 1000)
-
-        # Quality-specific bitrate ranges
-        quality_ranges = {
-            'small': (48, 96),
-            'medium': (64, 160),
-            'large': (96, 256)
-        }
-
-        min_bitrate, max_bitrate = quality_ranges[self.quality]
-        return max(min_bitrate, min(max_bitrate, bitrate_kbps))
+        return max(preset.min_bitrate, min(preset.max_bitrate, bitrate_kbps))
 
     def estimate_output_bytes(self, duration_seconds: float) -> int:
-        """Estimate output size in bytes for a given duration."""
-        bitrate = self.calculate_optimal_bitrate(duration_seconds)
-        return int((bitrate * 1000 * duration_seconds) / 8)
+        """Estimate output size in bytes for a given duration, summed over all targets."""
+        return sum(
+            int((self.calculate_optimal_bitrate(duration_seconds, target.quality) * 1000 * duration_seconds) / 8)
+            for target in self.targets
+        )
 
     def show_quality_info(self):
         """Display information about all quality levels"""
         console.print("\n[bold]🎵 Quality Levels & Compression Options:[/bold]")
         console.print()
 
-        for key, level in self.QUALITY_LEVELS.items():
+        for key, preset in self.presets.items():
             current = " ← [green]CURRENT[/green]" if key == self.quality else ""
-            console.print(f"[bold cyan]{key.upper()}: {level['name']}[/bold cyan]{current}")
-            console.print(f"  [yellow]📏 Target Size:[/yellow] ~{int(self.max_size_mb * level['compression_factor'])}MB ({int((1-level['compression_factor'])*100)}% compression)")
-            console.print(f"  [yellow]🎯 Quality:[/yellow] {level['quality']}")
-            console.print(f"  [yellow]🎵 Bitrate:[/yellow] {level['bitrate_range']}")
-            console.print(f"  [yellow]📱 Use Case:[/yellow] {level['use_case']}")
-            console.print(f"  [yellow]📝 Note:[/yellow] {level['description']}")
+            compression = round((1 - preset.target_bytes / preset.max_size_bytes) * 100)
+            extras = [f"{preset.mode.upper()}"]
+            if preset.sample_rate:
+                extras.append(f"{preset.sample_rate / 1000:g} kHz")
+            if preset.channels:
+                extras.append({1: "mono", 2: "stereo"}.get(preset.channels, f"{preset.channels} ch"))
+            console.print(f"[bold cyan]{key.upper()}: {preset.title}[/bold cyan]{current}")
+            console.print(f"  [yellow]📏 Target Size:[/yellow] ~{int(preset.target_bytes / (1024 * 1024))}MB ({compression}% compression)")
+            if preset.quality:
+                console.print(f"  [yellow]🎯 Quality:[/yellow] {preset.quality}")
+            console.print(f"  [yellow]🎵 Bitrate:[/yellow] {preset.min_bitrate}-{preset.max_bitrate} kbps ({', '.join(extras)})")
+            if preset.use_case:
+                console.print(f"  [yellow]📱 Use Case:[/yellow] {preset.use_case}")
+            if preset.description:
+                console.print(f"  [yellow]📝 Note:[/yellow] {preset.description}")
             console.print()
 
+    def default_quality(self) -> str:
+        """Preset used when none is chosen: medium if defined, else the first one"""
+        return 'medium' if 'medium' in self.presets else next(iter(self.presets))
+
     def select_quality(self) -> str:
         """Let user select compression quality level"""
+        # Single-letter shortcuts for presets whose first letter is unique
+        initials = [name[0] for name in self.presets]
+        shortcuts = {name[0]: name for name in self.presets if initials.count(name[0]) == 1}
+        default = self.default_quality()
+
         console.print("\n[bold]🎯 Select Compression Quality:[/bold]")
-        console.print("  [S] Small File (High Compression) - ~11MB, Good quality")
-        console.print("  [M] Medium File (Balanced) - ~13MB, Very Good quality")
-        console.print("  [L] Large File (High Quality) - ~14MB, Excellent quality")
+        for name, preset in self.presets.items():
+            key = name[0].upper() if name[0] in shortcuts else name
+            quality = f", {preset.quality} quality" if preset.quality else ""
+            console.print(f"  [{key}] {preset.title} - ~{int(preset.target_bytes / (1024 * 1024))}MB{quality}")
         console.print()
 
+        keys = "/".join(k.upper() for k in shortcuts) or "/".join(self.presets)
         try:
-            choice = input("Choose quality [S/M/L] or press Enter for Medium: ").strip().lower()
+            choice = input(f"Choose quality [{keys}] or press Enter for {default.title()}: ").strip().lower()
         except KeyboardInterrupt:
-            console.print("\n[yellow]→ Using Medium quality (default)[/yellow]")
-            return "medium"
+            console.print(f"\n[yellow]→ Using {default.title()} quality (default)[/yellow]")
+            return default
 
-        if choice in ['s', 'small']:
-            return "small"
-        elif choice in ['l', 'large']:
-            return "large"
-        else:
-            return "medium"  # Default
+        if choice in self.presets:
+            return choice
+        return shortcuts.get(choice, default)  # Default
 
     def update_quality(self, quality: str):
         """Update converter quality settings"""
-        if quality in self.QUALITY_LEVELS:
-            self.quality = quality
-            self.compression_factor = self.QUALITY_LEVELS[quality]['compression_factor']
-            console.print(f"[green]→ Quality set to: {self.QUALITY_LEVELS[quality]['name']}[/green]")
+        if quality in self.presets:
+            self.set_targets([quality])
+            console.print(f"[green]→ Quality set to: {self.quality_label()}[/green]")
         else:
             console.print("[red]❌ Invalid quality level[/red]")
 
+    def set_targets(self, qualities: List[str]):
+        """Encode every input once per (quality, codec); the first quality is the primary one"""
+        self.qualities = qualities
+        self.targets = [OutputTarget(quality, codec) for quality in qualities for codec in self.codecs]
+        self.quality = qualities[0]
+
+    def quality_label(self) -> str:
+        """Human-readable names of the selected presets and, if not plain MP3, codecs"""
+        label = " + ".join(self.presets[quality].title for quality in self.qualities)
+        if self.codecs != ['mp3']:
+            label += f" as {', '.join(codec.upper() for codec in self.codecs)}"
+        return label
+
+    def describe_file(self, file_path: Path) -> Dict:
+        """Probe info and size estimate for one input, as used by machine-readable reports"""
+        info = self.get_audio_info(file_path)
+        known = info['duration'] > 0
+        return {
+            'filename': self.relative_name(file_path),
+            'path': str(file_path),
+            'size': info['size'],
+            'duration': info['duration'] if known else None,
+            'codec': info.get('codec'),
+            'bitrate': self.calculate_optimal_bitrate(info['duration']) if known else None,
+            'estimated_size': self.estimate_output_bytes(info['duration']) if known else None,
+        }
+
+    def emit(self, event: str, **data):
+        """Send a machine-readable report event (no-op for text reports).
+
+        ndjson writes one line per event as it happens; json collects events
+        and prints a single document when the run ends.
+        """
+        if self.report == 'ndjson':
+            with self._report_lock:
+                sys.stdout.write(json.dumps(dict(event=event, **data)) + "\n")
+                sys.stdout.flush()
+        elif self.report == 'json':
+            with self._report_lock:
+                if event == 'result':
+                    self._report.setdefault('results', []).append(data)
+                else:
+                    self._report[event] = data
+
     def show_files(self, files: List[Path]) -> None:
         """Show files in a clean, simple list"""
-        console.print(f"[bold]📁 Found {len(files)} M4A file(s):[/bold]")
+        if self.report != 'text':
+            self.emit('files', files=[self.describe_file(f) for f in files])
+            return
+
+        console.print(f"[bold]📁 Found {len(files)} audio file(s):[/bold]")
         console.print()
 
         for i, file_path in enumerate(files, 1):
@@ -201,17 +1848,15 @@ class AudioConverter:
             else:
                 duration_str = "Unknown"
 
-            # Estimate MP3 size based on selected quality
+            # Estimate output size based on selected quality (all targets together)
             if info['duration'] > 0:
-                bitrate = self.calculate_optimal_bitrate(info['duration'])
-                estimated_seconds = info['duration']
-                estimated_bytes = (bitrate * 1000 * estimated_seconds) / 8
+                estimated_bytes = self.estimate_output_bytes(info['duration'])
                 estimated_mp3_mb = estimated_bytes / (1024 * 1024)
                 estimated_str = f"~{estimated_mp3_mb:.1f}MB"
             else:
                 estimated_str = "Unknown"
 
-            console.print(f"  {i}. [cyan]{file_path.name}[/cyan]")
+            console.print(f"  {i}. [cyan]{self.relative_name(file_path)}[/cyan]")
             console.print(f"     [red]{size_mb:.1f}MB[/red] → [green]{estimated_str}[/green] | Duration: [blue]{duration_str}[/blue]")
             console.print()
 
@@ -288,7 +1933,7 @@ class AudioConverter:
                 console.print(f"[green]→ Selected {len(selected_files)} file(s) for conversion[/green]")
                 # Show selected files
                 for i, file in enumerate(selected_files, 1):
-                    console.print(f"  {i}. [cyan]{file.name}[/cyan]")
+                    console.print(f"  {i}. [cyan]{self.relative_name(file)}[/cyan]")
                 return selected_files
             else:
                 console.print("[yellow]→ No valid files selected, converting all files[/yellow]")
@@ -298,30 +1943,52 @@ class AudioConverter:
             console.print("\n[yellow]→ Selection cancelled, converting all files[/yellow]")
             return files
 
+    def emit_settings(self, files: Optional[List[Path]] = None):
+        """The 'settings' report event; files is None while a recursive scan still streams them in"""
+        described = [self.describe_file(f) for f in files] if files is not None else None
+        self.emit(
+            'settings',
+            files=len(files) if files is not None else None,
+            quality=self.quality,
+            targets=[f"{target.quality}/{target.codec}" for target in self.targets],
+            backend=self.backend,
+            jobs=min(self.jobs, len(files)) if files is not None else self.jobs,
+            output_dir=str(self.output_dir),
+            total_input_size=sum(d['size'] for d in described) if described is not None else None,
+            estimated_output_size=sum(d['estimated_size'] or 0 for d in described) if described is not None else None,
+        )
+
     def show_conversion_settings(self, files: List[Path]) -> None:
         """Show conversion settings (no confirmation needed)"""
         if len(files) == 0:
             return
 
-        total_size = sum(self.get_audio_info(f)['size'] for f in files)
-        total_size_mb = total_size / (1024 * 1024)
+        if self.report != 'text':
+            self.emit_settings(files)
+            return
 
-        # Calculate estimated output based on selected quality
+        # Calculate total input and estimated output based on selected quality
+        total_size = 0
         estimated_total = 0
         for f in files:
             info = self.get_audio_info(f)
+            total_size += info['size']
             if info['duration'] > 0:
-                bitrate = self.calculate_optimal_bitrate(info['duration'])
-                estimated_bytes = (bitrate * 1000 * info['duration']) / 8
-                estimated_total += estimated_bytes
+                estimated_total += self.estimate_output_bytes(info['duration'])
 
+        total_size_mb = total_size / (1024 * 1024)
         estimated_total_mb = estimated_total / (1024 * 1024)
 
         console.print(f"\n[bold]🚀 Starting conversion of {len(files)} file(s):[/bold]")
         console.print(f"📏 Total input: [red]{total_size_mb:.1f}MB[/red]")
         console.print(f"🎯 Estimated output: [green]{estimated_total_mb:.1f}MB[/green]")
-        console.print(f"🎵 Quality Level: [cyan]{self.QUALITY_LEVELS[self.quality]['name']}[/cyan]")
-        console.print(f"📁 Output directory: [cyan]{self.output_dir}[/cyan]")
+        console.print(f"🎵 Quality Level: [cyan]{self.quality_label()}[/cyan]")
+        if self.split_outputs:
+            console.print(f"📁 Output directory: [cyan]{self.output_dir}[/cyan] ({', '.join(self.qualities)} subdirectories)")
+        else:
+            console.print(f"📁 Output directory: [cyan]{self.output_dir}[/cyan]")
+        engine = "asyncio core" if self.use_async else f"{self.backend} backend"
+        console.print(f"⚙️  Parallel jobs: [cyan]{min(self.jobs, len(files))}[/cyan] ({engine})")
         console.print()
 
     def show_dry_run_summary(self, files: List[Path]) -> None:
@@ -329,6 +1996,11 @@ class AudioConverter:
         if len(files) == 0:
             return
 
+        if self.report != 'text':
+            described = [self.describe_file(f) for f in files]
+            self.emit('dry_run', files=described, estimated_output_size=sum(d['estimated_size'] or 0 for d in described))
+            return
+
         console.print("\n[bold yellow]🧪 Dry run only (no files will be written)[/bold yellow]")
         total_estimated = 0
         for file_path in files:
@@ -337,63 +2009,598 @@ class AudioConverter:
                 estimated_bytes = self.estimate_output_bytes(info['duration'])
                 total_estimated += estimated_bytes
                 estimated_mb = estimated_bytes / (1024 * 1024)
-                console.print(f"  [cyan]{file_path.name}[/cyan] → ~{estimated_mb:.1f}MB")
+                console.print(f"  [cyan]{self.relative_name(file_path)}[/cyan] → ~{estimated_mb:.1f}MB")
             else:
-                console.print(f"  [cyan]{file_path.name}[/cyan] → Unknown duration")
+                console.print(f"  [cyan]{self.relative_name(file_path)}[/cyan] → Unknown duration")
 
         total_estimated_mb = total_estimated / (1024 * 1024)
         console.print(f"\n[green]Estimated total output: {total_estimated_mb:.1f}MB[/green]")
         console.print("[dim]Run without --dry-run to perform conversion.[/dim]")
 
-    def convert_file(self, input_path: Path, output_path: Path, progress_callback=None) -> Dict:
-        """Convert single file with progress tracking"""
+    def convert_file(self, input_path: Path, output_path: Optional[Path] = None, progress_callback=None,
+                     outputs: Optional[Dict[OutputTarget, Path]] = None) -> Dict:
+        """Convert single file to every output target with one decode.
+
+        outputs maps targets to output files; by default every target is
+        written to output_path_for(), or only the primary target to
+        output_path when that is given.
+        """
+        if outputs is None:
+            if output_path is not None:
+                outputs = {self.targets[0]: output_path}
+            else:
+                outputs = {target: self.output_path_for(input_path, target) for target in self.targets}
+        steps = self.conversion_steps(input_path, outputs)
         try:
-            # Get audio info
-            info = self.get_audio_info(input_path)
-
-            if info['duration'] == 0:
-                console.print(f"[red]❌ Cannot determine duration for {input_path.name}[/red]")
-                return {'success': False, 'error': 'Unknown duration'}
-
-            # Calculate optimal bitrate
-            bitrate = self.calculate_optimal_bitrate(info['duration'])
-
-            # Load audio
-            audio = AudioSegment.from_file(str(input_path), format="m4a")
+            batch = next(steps)
+            while True:
+                batch = steps.send(self.encode(input_path, batch))
+        except StopIteration as done:
+            return done.value
+        except Exception as e:
+            return {'success': False, 'error': str(e), 'cause': failure_cause(e)}
+        finally:
+            steps.close()  # removes partial outputs of a failed encode
+
+    async def convert_file_async(self, input_path: Path, outputs: Dict[OutputTarget, Path],
+                                 on_progress: Optional[Callable[[float], None]] = None,
+                                 timeout: Optional[float] = None) -> Dict:
+        """convert_file on the asyncio core: analysis passes and encodes run as asyncio subprocesses.
+
+        timeout bounds the whole conversion (all passes); running ffmpeg
+        processes are killed on timeout or cancellation.
+        """
+        import asyncio
+
+        async def run() -> Dict:
+            # Probing, planning and finishing outputs block, so they run in a thread
+            await to_thread_killable(self.get_audio_info, input_path)
+            await self.analyze_async(input_path, {target.quality for target in outputs})
+            steps = self.conversion_steps(input_path, outputs)
+
+            def advance(metrics: Optional[Dict]):
+                try:
+                    return False, steps.send(metrics)
+                except StopIteration as done:
+                    return True, done.value
+
+            try:
+                done, value = await to_thread_killable(advance, None)
+                while not done:
+                    metrics = await self.encode_async(input_path, value, on_progress)
+                    done, value = await to_thread_killable(advance, metrics)
+                return value
+            finally:
+                steps.close()
 
-            # Export with compression based on quality level
-            vbr_quality = {
-                'small': "6",   # Lower quality, higher compression
-                'medium': "4",  # Good balance
-                'large': "2"    # Higher quality, less compression
-            }
+        try:
+            return await asyncio.wait_for(run(), timeout)
+        except asyncio.TimeoutError:
+            self.probe_cache.discard(input_path)  # the info may come from a killed ffprobe
+            return {'success': False, 'error': f"Timed out after {timeout:g}s", 'cause': 'timeout'}
+        except Exception as e:
+            return {'success': False, 'error': str(e), 'cause': failure_cause(e)}
+
+    def conversion_steps(self, input_path: Path, outputs: Dict[OutputTarget, Path]):
+        """Plan and check the encodes for one file, independent of how they are run.
+
+        A generator: it yields lists of (output_path, bitrate, target) to
+        encode together, expects the encode's stage metrics to be sent back,
+        and returns the result dict that convert_file reports.
+        """
+        # Get audio info
+        info = self.get_audio_info(input_path)
+
+        if info['duration'] == 0:
+            console.print(f"[red]❌ Cannot determine duration for {input_path.name}[/red]")
+            return {'success': False, 'error': 'Unknown duration', 'cause': 'input'}
+
+        gain_db = self.loudness_gain(input_path) if self.normalize is not None else None
+
+        # Calculate optimal bitrate per target, from the duration left after preprocessing
+        pending = {}
+        durations = {}
+        for target in outputs:
+            durations[target] = self.output_duration(input_path, info, target.quality)
+            bitrate = self.calculate_optimal_bitrate(durations[target], target.quality)
+            if self.strict_size:
+                bitrate = self.strict_bitrate(bitrate, durations[target], target.quality)
+            pending[target] = bitrate
+
+        # Encode all targets in one pass, then re-encode (together) at a lower
+        # CBR rate only the targets that still miss a strict size budget.
+        # Encoders write partial files that only replace the outputs once
+        # every pass is done, so an interrupted run never leaves truncated files.
+        partials = {}
+        metrics = None
+        encoded = {}
+        try:
+            for target, output_path in outputs.items():
+                partials[target] = make_partial_path(output_path)
+            while pending:
+                pass_metrics = yield [(partials[t], bitrate, t) for t, bitrate in pending.items()]
+                if metrics is None:
+                    metrics = dict(pass_metrics, probe_time=info.get('probe_time', 0.0))
+                else:
+                    add_stage_metrics(metrics, pass_metrics)
+
+                retry = {}
+                for target, bitrate in pending.items():
+                    output_size = partials[target].stat().st_size
+                    target_bytes = self.target_bytes(target.quality)
+                    passes = encoded.get(target, {}).get('passes', 0) + 1
+                    encoded[target] = {
+                        'quality': target.quality,
+                        'codec': target.codec,
+                        'output': str(outputs[target]),
+                        'output_size': output_size,
+                        'duration': durations[target],
+                        'bitrate': bitrate,
+                        'passes': passes,
+                        'status': "OK" if output_size <= target_bytes else "OVER_LIMIT",
+                    }
+                    if (self.strict_size and output_size > target_bytes
+                            and passes < self.MAX_SIZE_PASSES and bitrate > MP3_BITRATES[0]):
+                        retry[target] = snap_mp3_bitrate(min(bitrate * target_bytes / output_size * 0.97, bitrate - 1))
+                pending = retry
+            for target, output_path in outputs.items():
+                commit_file(partials[target], output_path)
+        finally:
+            for partial in partials.values():
+                partial.unlink(missing_ok=True)
+
+        results = [encoded[target] for target in outputs]
+        output_size = sum(r['output_size'] for r in results)
+        return {
+            'success': True,
+            'input_size': info['size'],
+            'output_size': output_size,
+            'duration': info['duration'],
+            'bitrate': results[0]['bitrate'],
+            'passes': max(r['passes'] for r in results),
+            'compression_ratio': (1 - output_size / info['size']) * 100,
+            'gain_db': gain_db,
+            'outputs': results,
+            'metrics': metrics
+        }
 
+    def target_bytes(self, quality: Optional[str] = None) -> int:
+        """Output size budget for a quality level (the primary one by default)"""
+        return self.presets[quality or self.quality].target_bytes
+
+    def strict_bitrate(self, bitrate: int, duration_seconds: float, quality: Optional[str] = None) -> int:
+        """Largest standard CBR bitrate that fits the size budget for this duration"""
+        budget_kbps = self.target_bytes(quality) * 8 / duration_seconds / 1000
+        return snap_mp3_bitrate(min(bitrate, budget_kbps))
+
+    def encode_mode(self, quality: Optional[str] = None) -> str:
+        """'cbr' for CBR presets and in strict size mode, else 'vbr'"""
+        return 'cbr' if self.strict_size else self.presets[quality or self.quality].mode
+
+    def encoder_options(self, bitrate: int, target: Optional[OutputTarget] = None,
+                        input_path: Optional[Path] = None) -> Dict:
+        """ffmpeg output options for one target's encoder.
+
+        VBR presets pair the target bitrate with the encoder's VBR mode
+        (-q:a for MP3); CBR presets and strict size mode encode CBR at
+        exactly the given rate. Silence trimming, loudness gain (needs
+        input_path), the preset's sample rate (resample), channel count
+        (downmix) and encoder threads are applied when set.
+        """
+        target = target or self.targets[0]
+        preset = self.presets[target.quality]
+        vbr = self.encode_mode(target.quality) == 'vbr'
+        options = {'acodec': self.CODECS[target.codec]['encoder'], 'audio_bitrate': f"{bitrate}k"}
+        if target.codec == 'mp3' and vbr:
+            options['q:a'] = preset.vbr_quality
+        elif target.codec == 'opus':
+            options['vbr'] = 'on' if vbr else 'off'
+        filters = []
+        if self.trims_silence(preset.name):
+            filters.append(self.silence_filter(preset))
+        if self.normalize is not None and input_path is not None:
+            filters.append(f"volume={self.loudness_gain(input_path):g}dB")
+        if filters:
+            options['af'] = ",".join(filters)
+        if preset.sample_rate:
+            options['ar'] = preset.sample_rate
+        if preset.channels:
+            options['ac'] = preset.channels
+        if preset.threads is not None:
+            options['threads'] = preset.threads
+        return options
+
+    @staticmethod
+    def silence_filter(preset: Preset) -> str:
+        """silenceremove filter dropping leading silence and cutting pauses to max_silence"""
+        threshold = f"{preset.silence_threshold_db:g}dB"
+        return (f"silenceremove=start_periods=1:start_threshold={threshold}"
+                f":stop_periods=-1:stop_duration={preset.max_silence:g}:stop_threshold={threshold}:detection=peak")
+
+    def output_args(self, source, outputs: List[tuple], input_path: Path):
+        """ffmpeg-python graph encoding one decoded source to every (path, bitrate, target) output"""
+        import ffmpeg
+
+        return ffmpeg.merge_outputs(*(
+            source.output(str(output_path), vn=None, **self.encoder_options(bitrate, target, input_path))
+            for output_path, bitrate, target in outputs
+        )).overwrite_output()
+
+    def encode(self, input_path: Path, outputs: List[tuple]) -> Dict:
+        """Encode to every (output_path, bitrate, target) with the selected backend.
+
+        The ffmpeg, stream and pydub backends decode the input once per call
+        however many outputs there are. Returns the stage metrics.
+        """
+        return ENCODER_BACKENDS[self.resolve_backend()].encode(self, input_path, outputs)
+
+    def resolve_backend(self) -> str:
+        """The backend to encode with, replacing 'auto' by the fastest one for the current targets"""
+        with self._backend_lock:
+            if self.backend == 'auto':
+                self.backend = self.choose_backend()
+        return self.backend
+
+    def choose_backend(self) -> str:
+        """Fastest installed backend for the current targets, measured once and cached.
+
+        The choice is cached per user (see user_cache_dir), keyed on the
+        targets' output signatures, the candidate backends and the ffmpeg
+        binary, so changing a preset, installing lame or upgrading ffmpeg
+        measures again.
+        """
+        candidates = available_backends(target.codec for target in self.targets)
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else 'ffmpeg'
+
+        key = json.dumps({
+            'targets': [self.output_signature(target) for target in self.targets],
+            'candidates': candidates,
+            'ffmpeg': ffmpeg_binary(),
+        }, sort_keys=True)
+        cache_path = user_cache_dir() / 'backend-choice.json'
+        try:
+            cache = json.loads(cache_path.read_text())
+        except (OSError, ValueError):
+            cache = {}
+        cached = cache.get(key) if isinstance(cache, dict) else None
+        if cached and cached.get('backend') in candidates:
+            return cached['backend']
+
+        console.print(f"[dim]⏱️  Timing encoder backends ({', '.join(candidates)})...[/dim]")
+        timings = self.benchmark_backends(candidates)
+        if not timings:
+            return 'ffmpeg'
+        choice = min(timings, key=timings.get)
+        console.print(f"[green]⚡ Fastest backend for {self.quality_label()}: {choice}[/green] [dim]("
+                      + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in sorted(timings.items(), key=lambda i: i[1]))
+                      + ")[/dim]")
+        cache[key] = {'backend': choice, 'seconds': timings}
+        write_cache_file(cache_path, cache)
+        return choice
+
+    def benchmark_backends(self, candidates: List[str]) -> Dict[str, float]:
+        """Seconds each backend takes to encode a synthesized clip to the current targets (best of two).
+
+        Runs on a scratch converter with the same settings, so the clip
+        never reaches the metadata index. Backends that fail are left out.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            scratch = AudioConverter(
+                Path(tmp) / "in", Path(tmp) / "out", self.quality, use_index=False, buffer_size=self.buffer_size,
+                strict_size=self.strict_size, qualities=self.qualities, codecs=self.codecs, presets=self.presets,
+                trim_silence=self.trim_silence, normalize=self.normalize,
+            )
+            clip = scratch.input_dir / "clip.wav"
+            try:
+                subprocess.run([
+                    'ffmpeg', '-nostdin', '-v', 'error', '-f', 'lavfi',
+                    '-i', f"anoisesrc=color=pink:sample_rate=44100:seed=42:duration={self.BENCHMARK_SECONDS}",
+                    '-ac', '2', str(clip)
+                ], check=True)
+            except (subprocess.CalledProcessError, OSError) as e:
+                # No lavfi/anoisesrc in this ffmpeg build: nothing to time, the default backend is used
+                console.print(f"[yellow]→ Could not synthesize the benchmark clip ({e}); using the default backend[/yellow]")
+                return {}
+
+            timings = {}
+            for name in candidates:
+                outputs = [
+                    (scratch.output_dir / f"{name}-{i}{self.CODECS[target.codec]['extension']}",
+                     scratch.calculate_optimal_bitrate(self.BENCHMARK_SECONDS, target.quality), target)
+                    for i, target in enumerate(self.targets)
+                ]
+                try:
+                    runs = []
+                    for _ in range(2):
+                        start = time.perf_counter()
+                        ENCODER_BACKENDS[name].encode(scratch, clip, outputs)
+                        runs.append(time.perf_counter() - start)
+                    timings[name] = min(runs)
+                except Exception as e:
+                    console.print(f"[yellow]→ {name} backend failed its benchmark: {e}[/yellow]")
+        return timings
+
+    def pcm_decoder_args(self, input_path: Path, target: OutputTarget) -> Tuple[List[str], int, int]:
+        """ffmpeg command decoding to s16le PCM with the target's filters, sample rate and channels.
+
+        Returns the command, the PCM sample rate and the channel count
+        (at most two, which is all LAME encodes).
+        """
+        import ffmpeg
+
+        info = self.get_audio_info(input_path)
+        options = self.encoder_options(0, target, input_path)
+        rate = options.get('ar') or info['frame_rate']
+        channels = min(options.get('ac') or info['channels'], 2)
+        filters = {'af': options['af']} if 'af' in options else {}
+        args = ffmpeg.input(str(input_path)).output(
+            'pipe:', format='s16le', acodec='pcm_s16le', ar=rate, ac=channels, vn=None, **filters
+        ).global_args('-nostdin', '-v', 'error').compile()
+        return args, rate, channels
+
+    def encode_with_lame(self, input_path: Path, outputs: List[tuple]) -> Dict:
+        """Encode MP3s with the standalone lame binary, fed PCM by an ffmpeg decoder.
+
+        The decoder's stdout is lame's stdin, so no audio passes through
+        Python. Each output gets its own decoder (filters and sample rates
+        can differ per preset).
+        """
+        metrics = new_stage_metrics()
+        start = time.perf_counter()
+        for output_path, bitrate, target in outputs:
+            args, rate, channels = self.pcm_decoder_args(input_path, target)
+            if self.encode_mode(target.quality) == 'vbr':
+                rate_control = ['-V', str(self.presets[target.quality].vbr_quality)]
+            else:
+                rate_control = ['-b', str(bitrate), '--cbr']
+            lame_args = ['lame', '--quiet', '-r', '--bitwidth', '16', '--signed', '--little-endian',
+                         '-s', f"{rate / 1000:g}", '-m', 'm' if channels == 1 else 'j', *rate_control,
+                         '-', str(output_path)]
+
+            with tempfile.TemporaryFile() as stderr:
+                decoder = spawn(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr)
+                try:
+                    encoder = spawn(lame_args, stdin=decoder.stdout, stdout=subprocess.DEVNULL, stderr=stderr)
+                except OSError:
+                    decoder.kill()
+                    decoder.wait()
+                    raise
+                finally:
+                    decoder.stdout.close()  # lame holds the read end now
+                add_process_usage(metrics, wait_with_usage(encoder))
+                add_process_usage(metrics, wait_with_usage(decoder))
+                if decoder.returncode != 0 or encoder.returncode != 0:
+                    failed = "decoder" if decoder.returncode != 0 else "lame"
+                    raise RuntimeError(read_stderr_tail(stderr) or f"{failed} exited with an error")
+        metrics['encode_time'] = time.perf_counter() - start
+        return metrics
+
+    def encode_with_lameenc(self, input_path: Path, outputs: List[tuple]) -> Dict:
+        """Encode MP3s in-process with the lameenc binding, reading PCM from an ffmpeg decoder.
+
+        decode_time is the time spent waiting on the decoder for PCM. The
+        encoder runs in this process, so its CPU time is not in cpu_time.
+        """
+        import lameenc
+
+        metrics = new_stage_metrics(decode_time=0.0)
+        start = time.perf_counter()
+        for output_path, bitrate, target in outputs:
+            args, rate, channels = self.pcm_decoder_args(input_path, target)
+            encoder = lameenc.Encoder()
+            encoder.set_in_sample_rate(rate)
+            encoder.set_channels(channels)
+            encoder.set_quality(2)
+            if self.encode_mode(target.quality) == 'vbr':
+                encoder.set_vbr(lameenc.VBR_MTRH)
+                encoder.set_vbr_quality(int(self.presets[target.quality].vbr_quality))
+            else:
+                encoder.set_bit_rate(bitrate)
+            chunk_bytes = max(2 * channels, self.buffer_size - self.buffer_size % (2 * channels))
+
+            with tempfile.TemporaryFile() as stderr, open(output_path, 'wb') as output:
+                decoder = spawn(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr)
+                try:
+                    while True:
+                        read_start = time.perf_counter()
+                        chunk = decoder.stdout.read(chunk_bytes)
+                        metrics['decode_time'] += time.perf_counter() - read_start
+                        if not chunk:
+                            break
+                        output.write(encoder.encode(chunk))
+                    output.write(encoder.flush())
+                    add_process_usage(metrics, wait_with_usage(decoder))
+                finally:
+                    if decoder.returncode is None:
+                        decoder.kill()
+                        decoder.wait()
+                    decoder.stdout.close()
+                if decoder.returncode != 0:
+                    raise RuntimeError(read_stderr_tail(stderr) or f"decoder exited with {decoder.returncode}")
+        metrics['encode_time'] = time.perf_counter() - start - metrics['decode_time']
+        return metrics
+
+    def encode_with_pydub(self, input_path: Path, outputs: List[tuple]) -> Dict:
+        """Decode to PCM in memory with pydub, then export each output through another ffmpeg.
+
+        pydub owns its ffmpeg processes, so CPU time and RSS are not reported.
+        """
+        from pydub import AudioSegment
+
+        # Load audio
+        start = time.perf_counter()
+        audio = AudioSegment.from_file(str(input_path), format=self.pydub_format(input_path))
+        decoded = time.perf_counter()
+
+        for output_path, bitrate, target in outputs:
+            options = self.encoder_options(bitrate, target, input_path)
+            parameters = [arg for key in options if key not in ('acodec', 'audio_bitrate')
+                          for arg in (f"-{key}", str(options[key]))]
             audio.export(
                 str(output_path),
-                format="mp3",
-                bitrate=f"{bitrate}k",
-                parameters=["-q:a", vbr_quality[self.quality]]
+                format=self.CODECS[target.codec]['muxer'],
+                codec=options['acodec'],
+                bitrate=options['audio_bitrate'],
+                parameters=parameters or None
             )
-
-            # Check output size
-            output_size = output_path.stat().st_size
-            output_size_mb = output_size / (1024 * 1024)
-
-            return {
-                'success': True,
-                'input_size': info['size'],
-                'output_size': output_size,
-                'duration': info['duration'],
-                'bitrate': bitrate,
-                'compression_ratio': (1 - output_size / info['size']) * 100
-            }
-
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
-
-    def convert_files(self, files: List[Path]) -> List[Dict]:
-        """Convert all selected files with clean progress monitoring"""
-        results = []
+        return new_stage_metrics(decode_time=decoded - start, encode_time=time.perf_counter() - decoded,
+                                 cpu_time=None, peak_rss_kb=None)
+
+    def encode_with_ffmpeg(self, input_path: Path, outputs: List[tuple]) -> Dict:
+        """Transcode in a single ffmpeg process; no PCM passes through Python.
+
+        ffmpeg decodes once and feeds every output's encoder. Decode and
+        encode happen in the same process, so all time counts as encode.
+        """
+        import ffmpeg
+
+        args = self.output_args(ffmpeg.input(str(input_path)), outputs, input_path).global_args('-nostdin', '-v', 'error').compile()
+
+        metrics = new_stage_metrics()
+        start = time.perf_counter()
+        with tempfile.TemporaryFile() as stderr:
+            process = spawn(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=stderr)
+            add_process_usage(metrics, wait_with_usage(process))
+            if process.returncode != 0:
+                raise RuntimeError(read_stderr_tail(stderr) or f"ffmpeg exited with {process.returncode}")
+        metrics['encode_time'] = time.perf_counter() - start
+        return metrics
+
+    async def encode_async(self, input_path: Path, outputs: List[tuple],
+                           on_progress: Optional[Callable[[float], None]] = None) -> Dict:
+        """encode_with_ffmpeg as an asyncio subprocess, reporting progress.
+
+        ffmpeg's -progress output is read from stdout and on_progress is
+        called with the fraction of the expected output duration written.
+        The process is killed if the task is cancelled. CPU time and RSS are
+        not reported: the event loop reaps its own children.
+        """
+        import asyncio
+        import ffmpeg
+
+        info = self.get_audio_info(input_path)
+        duration = max(self.output_duration(input_path, info, target.quality) for _, _, target in outputs)
+        args = self.output_args(ffmpeg.input(str(input_path)), outputs, input_path).global_args(
+            '-nostdin', '-v', 'error', '-nostats', '-progress', 'pipe:1'
+        ).compile()
+
+        metrics = new_stage_metrics(cpu_time=None, peak_rss_kb=None)
+        start = time.perf_counter()
+        with tempfile.TemporaryFile() as stderr:
+            process = await asyncio.create_subprocess_exec(
+                *args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr
+            )
+            try:
+                async for line in process.stdout:
+                    key, _, value = line.decode(errors='replace').strip().partition('=')
+                    if on_progress is None:
+                        continue
+                    if key == 'out_time_us' and value.isdigit() and duration > 0:
+                        on_progress(min(1.0, int(value) / 1e6 / duration))
+                    elif key == 'progress' and value == 'end':
+                        on_progress(1.0)
+                await process.wait()
+            finally:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+            if process.returncode != 0:
+                raise RuntimeError(read_stderr_tail(stderr) or f"ffmpeg exited with {process.returncode}")
+        metrics['encode_time'] = time.perf_counter() - start
+        return metrics
+
+    def iter_pcm_chunks(self, input_path: Path, info: Dict, metrics: Optional[Dict] = None):
+        """Decode input_path with ffmpeg and yield raw s16le PCM in buffer_size chunks.
+
+        Only one chunk is held in Python at a time, so memory stays bounded
+        no matter how long the recording is. When metrics is given, the
+        decoder's CPU time and peak RSS are added to it.
+        """
+        frame_bytes = 2 * info['channels']
+        chunk_bytes = max(frame_bytes, self.buffer_size - self.buffer_size % frame_bytes)
+        import ffmpeg
+
+        args = ffmpeg.input(str(input_path)).output(
+            'pipe:', format='s16le', acodec='pcm_s16le', ac=info['channels'], ar=info['frame_rate'], vn=None
+        ).global_args('-nostdin', '-v', 'error').compile()
+
+        with tempfile.TemporaryFile() as stderr:
+            decoder = spawn(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr)
+            try:
+                while True:
+                    chunk = decoder.stdout.read(chunk_bytes)
+                    if not chunk:
+                        break
+                    yield chunk
+                usage = wait_with_usage(decoder)
+                if metrics is not None:
+                    add_process_usage(metrics, usage)
+                if decoder.returncode != 0:
+                    raise RuntimeError(read_stderr_tail(stderr) or f"decoder exited with {decoder.returncode}")
+            finally:
+                if decoder.returncode is None:
+                    decoder.kill()
+                    decoder.wait()
+                decoder.stdout.close()
+
+    def encode_with_stream(self, input_path: Path, outputs: List[tuple]) -> Dict:
+        """Pipe PCM from a decoder to one encoder process in fixed-size chunks.
+
+        The encoder process writes every output from the shared PCM stream.
+        decode_time is the time spent waiting on the decoder for PCM.
+        """
+        import ffmpeg
+
+        info = self.get_audio_info(input_path)
+        source = ffmpeg.input('pipe:', format='s16le', ac=info['channels'], ar=info['frame_rate'])
+        args = self.output_args(source, outputs, input_path).global_args('-v', 'error').compile()
+
+        metrics = new_stage_metrics(decode_time=0.0)
+        start = time.perf_counter()
+        with tempfile.TemporaryFile() as stderr:
+            encoder = spawn(args, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=stderr)
+            chunks = self.iter_pcm_chunks(input_path, info, metrics)
+            try:
+                while True:
+                    read_start = time.perf_counter()
+                    chunk = next(chunks, None)
+                    metrics['decode_time'] += time.perf_counter() - read_start
+                    if chunk is None:
+                        break
+                    encoder.stdin.write(chunk)
+                encoder.stdin.close()
+            except BrokenPipeError:
+                # Encoder died; its own error message is more useful
+                pass
+            finally:
+                chunks.close()  # stops the decoder if the encoder died first
+                if not encoder.stdin.closed:
+                    try:
+                        encoder.stdin.close()
+                    except BrokenPipeError:
+                        pass
+                add_process_usage(metrics, wait_with_usage(encoder))
+                if encoder.returncode != 0:
+                    raise RuntimeError(read_stderr_tail(stderr) or f"encoder exited with {encoder.returncode}")
+        metrics['encode_time'] = time.perf_counter() - start - metrics['decode_time']
+        return metrics
+
+    def convert_files(self, files: Iterable[Path]) -> List[Dict]:
+        """Convert all selected files with clean progress monitoring.
+
+        Files are converted by a pool of self.jobs worker threads; each worker
+        blocks on its own ffmpeg subprocess, so encodes run on separate cores.
+        files may be a lazy iterator: work is queued as paths arrive, with at
+        most a few files per worker waiting. Results are returned in the same
+        order as files.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeRemainingColumn
+
+        results: List[Optional[Dict]] = []
+        if isinstance(files, (list, tuple)):
+            self.note_stem_collisions(files)
 
         # Show simple progress bar for overall conversion
         with Progress(
@@ -403,53 +2610,576 @@ class AudioConverter:
             TextColumn("[bold yellow]{task.completed}/{task.total} files"),
             TimeRemainingColumn(),
             console=console,
-            refresh_per_second=4
+            refresh_per_second=4,
+            disable=self.report != 'text'
         ) as progress:
 
-            overall_task = progress.add_task("Converting files", total=len(files))
-
-            for file_path in files:
-                filename = file_path.name
-                output_path = self.output_dir / f"{file_path.stem}.mp3"
+            total = len(files) if isinstance(files, (list, tuple)) else None
+            overall_task = progress.add_task("Converting files", total=total)
 
+            def on_start(filename: str):
                 # Update progress description with current file
                 progress.update(overall_task, description=f"Converting: {filename}")
 
-                # Convert file (without verbose output)
-                result = self.convert_file(file_path, output_path)
-
-                if result['success']:
-                    output_size_mb = result['output_size'] / (1024 * 1024)
-                    status = "OK" if result['output_size'] <= int(self.max_size_bytes * self.compression_factor) else "OVER_LIMIT"
-
-                    results.append({
-                        'filename': filename,
-                        'input_size': result['input_size'],
-                        'output_size': result['output_size'],
-                        'duration': result['duration'],
-                        'bitrate': result['bitrate'],
-                        'compression_ratio': result['compression_ratio'],
-                        'status': status
-                    })
-                else:
-                    results.append({
-                        'filename': filename,
-                        'error': result['error'],
-                        'status': 'FAILED'
-                    })
+            # Identical inputs are encoded once; the rest reuse that output
+            duplicates: Dict[Path, Path] = {}
+            if self.dedup:
+                files = list(files)
+                duplicates = self.find_duplicates(files)
+
+            completed: queue.SimpleQueue = queue.SimpleQueue()
+            positions: Dict[Path, int] = {}
+            in_flight = 0
+
+            def collect():
+                # Block until one conversion finishes and store its result
+                position, future = completed.get()
+                results[position] = future.result()
+                self.emit('result', **results[position])
 
                 # Update progress
                 progress.update(overall_task, advance=1)
 
+            self._aborting.clear()
+            pool = ThreadPoolExecutor(max_workers=self.jobs)
+            try:
+                for position, file_path in enumerate(files):
+                    results.append(None)
+                    positions[file_path] = position
+                    if total is None:
+                        progress.update(overall_task, total=position + 1)
+                    if file_path in duplicates:
+                        continue
+                    while in_flight >= self.jobs * 4:
+                        collect()
+                        in_flight -= 1
+                    future = pool.submit(self.convert_one, file_path, on_start, time.perf_counter())
+                    future.add_done_callback(lambda f, position=position: completed.put((position, f)))
+                    in_flight += 1
+                for _ in range(in_flight):
+                    collect()
+            except BaseException:
+                # Ctrl+C or SIGTERM: kill running encodes (their partial outputs are removed) and drop queued files
+                self.abort()
+                raise
+            finally:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+            for file_path, original in duplicates.items():
+                results[positions[file_path]] = self.link_duplicate(file_path, original, results[positions[original]])
+                self.emit('result', **results[positions[file_path]])
+                progress.update(overall_task, advance=1)
+
         return results
 
+    async def convert_many(self, files: Iterable[Path],
+                           on_progress: Optional[Callable[[str, float], None]] = None,
+                           on_result: Optional[Callable[[Dict], None]] = None,
+                           timeout: Optional[float] = None) -> List[Dict]:
+        """Convert files on the asyncio core, at most self.jobs at a time, without threads.
+
+        on_progress(filename, fraction) reports encode progress and
+        on_result(result) is called as each file finishes. timeout bounds
+        each file's conversion (default: job_timeout). Cancelling the task
+        kills every running ffmpeg process. Results keep the order of files.
+        """
+        import asyncio
+
+        files = list(files)
+        self.note_stem_collisions(files)
+        timeout = timeout if timeout is not None else self.job_timeout
+        duplicates = await asyncio.to_thread(self.find_duplicates, files) if self.dedup else {}
+        semaphore = asyncio.Semaphore(self.jobs)
+
+        def finished(result: Dict) -> Dict:
+            self.emit('result', **result)
+            if on_result is not None:
+                on_result(result)
+            return result
+
+        async def convert(file_path: Path) -> Dict:
+            submitted_at = time.perf_counter()
+            async with semaphore:
+                result = await self.convert_one_async(file_path, on_progress, timeout, submitted_at)
+            return finished(result)
+
+        converted = await asyncio.gather(*(convert(f) for f in files if f not in duplicates))
+        results = dict(zip([f for f in files if f not in duplicates], converted))
+        for file_path, original in duplicates.items():
+            linked = await asyncio.to_thread(self.link_duplicate, file_path, original, results[original])
+            results[file_path] = finished(linked)
+        return [results[file_path] for file_path in files]
+
+    def convert_files_async(self, files: List[Path]) -> List[Dict]:
+        """Run convert_many from the CLI, with a progress bar per running file"""
+        import asyncio
+        from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeRemainingColumn
+
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[bold blue]{task.description}"),
+            BarColumn(complete_style="green", finished_style="green"),
+            TextColumn("[bold yellow]{task.fields[detail]}"),
+            TimeRemainingColumn(),
+            console=console,
+            refresh_per_second=4,
+            disable=self.report != 'text'
+        ) as progress:
+            overall_task = progress.add_task("Converting files", total=len(files), detail=f"0/{len(files)} files")
+            file_tasks: Dict[str, int] = {}
+
+            def on_progress(filename: str, fraction: float):
+                if filename not in file_tasks:
+                    file_tasks[filename] = progress.add_task(f"  {filename}", total=100, detail="0%")
+                progress.update(file_tasks[filename], completed=fraction * 100, detail=f"{fraction:.0%}")
+
+            def on_result(result: Dict):
+                task = file_tasks.pop(result['filename'], None)
+                if task is not None:
+                    progress.remove_task(task)
+                progress.advance(overall_task)
+                done = int(progress.tasks[overall_task].completed)
+                progress.update(overall_task, detail=f"{done}/{len(files)} files")
+
+            return asyncio.run(self.convert_many(files, on_progress=on_progress, on_result=on_result))
+
+    def content_hash(self, file_path: Path) -> str:
+        """Full content hash, reused from the metadata index when still valid"""
+        record = self.index.get(file_path) if self.index is not None else None
+        if record and 'hash' in record:
+            return record['hash']
+        digest = file_digest(file_path)
+        if self.index is not None:
+            self.index.update(file_path, hash=digest)
+        return digest
+
+    def find_duplicates(self, files: List[Path]) -> Dict[Path, Path]:
+        """Map each duplicate input to the first file with identical content.
+
+        Only files sharing a size are hashed, and only files that also share
+        a partial (head + tail) hash get a full content hash.
+        """
+        by_size: Dict[int, List[Path]] = {}
+        for file_path in files:
+            by_size.setdefault(file_path.stat().st_size, []).append(file_path)
+
+        duplicates: Dict[Path, Path] = {}
+        for same_size in by_size.values():
+            if len(same_size) < 2:
+                continue
+            by_partial: Dict[str, List[Path]] = {}
+            for file_path in same_size:
+                by_partial.setdefault(partial_digest(file_path), []).append(file_path)
+            for candidates in by_partial.values():
+                if len(candidates) < 2:
+                    continue
+                originals: Dict[str, Path] = {}
+                for file_path in candidates:
+                    original = originals.setdefault(self.content_hash(file_path), file_path)
+                    if original != file_path:
+                        duplicates[file_path] = original
+        return duplicates
+
+    def link_duplicate(self, file_path: Path, original: Path, original_result: Dict) -> Dict:
+        """Hardlink (or copy) the output of original to the output of a duplicate input"""
+        result = self._link_duplicate(file_path, original, original_result)
+        self.journal_result(file_path, result)
+        return result
+
+    def _link_duplicate(self, file_path: Path, original: Path, original_result: Dict) -> Dict:
+        """link_duplicate without journaling"""
+        if 'error' in original_result:
+            return self.failed_result(file_path, original_result['error'], original_result['cause'],
+                                      original_result['attempts'])
+
+        outputs = []
+        for output in original_result['outputs']:
+            target = OutputTarget(output['quality'], output['codec'])
+            source = self.output_path_for(original, target)
+            output_path = self.output_path_for(file_path, target)
+            try:
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                if output_path.exists() or output_path.is_symlink():
+                    output_path.unlink()
+                try:
+                    os.link(source, output_path)
+                except OSError:
+                    shutil.copy2(source, output_path)
+            except OSError as e:
+                return self.failed_result(file_path, str(e), failure_cause(e))
+            outputs.append(dict(output, output=str(output_path), passes=0))
+
+        result = dict(original_result, filename=self.relative_name(file_path), status='DEDUPED', passes=0,
+                      duplicate_of=self.relative_name(original), outputs=outputs, metrics=None)
+        self.record_conversion(file_path, result)
+        return result
+
+    def open_journal(self):
+        """Start the batch journal; with resume, keep the entries of the interrupted run.
+
+        Resuming also removes the partial outputs the interrupted run left behind.
+        """
+        self.journal = JobJournal(self.output_dir / JobJournal.FILENAME, resume=self.resume)
+        if self.resume:
+            for partial in self.output_dir.rglob('.*.partial.*'):
+                try:
+                    partial.unlink()
+                except OSError:
+                    pass
+
+    def abort(self):
+        """Stop running conversions now: kill their processes and record nothing for them"""
+        self._aborting.set()
+        Watchdog.expire_all()
+
+    def journal_result(self, file_path: Path, result: Dict):
+        """Durably note that file_path is finished (or failed) in this batch"""
+        if self.journal is None:
+            return
+        signatures = [self.output_signature(OutputTarget(output['quality'], output['codec']))
+                      for output in result.get('outputs', [])]
+        self.journal.record(self.relative_name(file_path), file_path, signatures, result)
+
+    def unjournaled(self, files: Iterable[Path], resumed: List[Dict]) -> Iterator[Path]:
+        """Files still to convert on --resume; results journaled as done are appended to resumed"""
+        signatures = [self.output_signature(target) for target in self.targets]
+        for file_path in files:
+            result = self.journal.completed(self.relative_name(file_path), file_path, signatures) if self.journal else None
+            if result is None:
+                yield file_path
+            else:
+                resumed.append(result)
+                self.emit('result', **dict(result, resumed=True))
+
+    def convert_one(self, file_path: Path, on_start=None, submitted_at: Optional[float] = None) -> Dict:
+        """Convert one input file and build the result dict used by show_summary.
+
+        submitted_at is the time.perf_counter() value when the file was queued.
+        """
+        queue_wait = time.perf_counter() - submitted_at if submitted_at is not None else 0.0
+        try:
+            outputs = self.prepare_outputs(file_path)
+            if not outputs:
+                result = self.skipped_result(file_path, self.current_outputs(file_path))
+                self.journal_result(file_path, result)
+                return result
+
+            if on_start is not None:
+                on_start(self.relative_name(file_path))
+
+            # Convert file (without verbose output)
+            result = self.convert_with_retries(file_path, outputs)
+            return self.finish_one(file_path, result, queue_wait)
+        except OSError as e:
+            # The input vanished or became unreadable outside the encode; other files carry on
+            return self.failed_result(file_path, str(e), failure_cause(e), queue_wait=queue_wait)
+
+    async def convert_one_async(self, file_path: Path, on_progress: Optional[Callable[[str, float], None]] = None,
+                                timeout: Optional[float] = None, submitted_at: Optional[float] = None) -> Dict:
+        """convert_one on the asyncio core; on_progress(filename, fraction) reports encode progress.
+
+        Index, journal and file system work runs in threads, off the event loop.
+        """
+        import asyncio
+
+        queue_wait = time.perf_counter() - submitted_at if submitted_at is not None else 0.0
+        try:
+            outputs = await asyncio.to_thread(self.prepare_outputs, file_path)
+            if not outputs:
+                current = await asyncio.to_thread(self.current_outputs, file_path)
+                result = await asyncio.to_thread(self.skipped_result, file_path, current)
+                await asyncio.to_thread(self.journal_result, file_path, result)
+                return result
+
+            filename = self.relative_name(file_path)
+            report = (lambda fraction: on_progress(filename, fraction)) if on_progress is not None else None
+            for attempt in range(1, self.retries + 2):
+                result = await self.convert_file_async(file_path, outputs, report, timeout)
+                if result['success'] or attempt > self.retries or result['cause'] not in RETRY_CAUSES:
+                    break
+                await asyncio.sleep(self.retry_delay(file_path, result['error'], attempt))
+            return await asyncio.to_thread(self.finish_one, file_path, dict(result, attempts=attempt), queue_wait)
+        except OSError as e:
+            # The input vanished or became unreadable outside the encode; other files carry on
+            return self.failed_result(file_path, str(e), failure_cause(e), queue_wait=queue_wait)
+
+    def convert_with_retries(self, file_path: Path, outputs: Dict[OutputTarget, Path]) -> Dict:
+        """convert_file under the job_timeout watchdog, retried with exponential backoff.
+
+        Only timeouts and transient system errors are retried; a broken
+        input or a full disk fails the same way on every attempt.
+        """
+        for attempt in range(1, self.retries + 2):
+            with Watchdog(self.job_timeout) as watchdog:
+                result = self.convert_file(file_path, outputs=outputs)
+            if self._aborting.is_set() and not result['success']:
+                return {'success': False, 'error': "Interrupted", 'cause': 'interrupted', 'attempts': attempt}
+            # Only a killed process makes a timeout; a file that ran long in Python keeps its own result
+            if watchdog.killed and not result['success']:
+                self.probe_cache.discard(file_path)  # the info may come from a killed ffprobe
+                result = {'success': False, 'error': f"Timed out after {self.job_timeout:g}s", 'cause': 'timeout'}
+            if result['success'] or attempt > self.retries or result['cause'] not in RETRY_CAUSES:
+                return dict(result, attempts=attempt)
+            time.sleep(self.retry_delay(file_path, result['error'], attempt))
+
+    def retry_delay(self, file_path: Path, error: str, attempt: int) -> float:
+        """Announce a retry and return the backoff before it: retry_backoff doubled per attempt"""
+        delay = self.retry_backoff * 2 ** (attempt - 1)
+        filename = self.relative_name(file_path)
+        self.emit('retry', filename=filename, attempt=attempt, error=error, delay=delay)
+        console.print(f"[yellow]↻ {filename} failed ({error}); retrying in {delay:g}s[/yellow]")
+        return delay
+
+    def quarantine(self, file_path: Path, error: str) -> Optional[Path]:
+        """Move an input that kept failing into quarantine_dir, with its last error beside it"""
+        destination = self.quarantine_dir / self.relative_name(file_path)
+        try:
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(file_path), destination)
+            destination.with_name(destination.name + ".error").write_text(error + "\n", encoding='utf-8')
+        except OSError as e:
+            console.print(f"[red]❌ Could not quarantine {file_path.name}: {e}[/red]")
+            return None
+        return destination
+
+    def prepare_outputs(self, file_path: Path) -> Dict[OutputTarget, Path]:
+        """Output files to write for file_path, with their directories created.
+
+        In incremental mode targets whose output is still current are left
+        out, so an empty dict means the input is up to date.
+        """
+        targets = self.targets
+        if self.incremental:
+            current = self.current_outputs(file_path)
+            # Only re-encode the targets whose output is missing or stale
+            targets = [target for target in targets if target not in current]
+
+        outputs = {target: self.output_path_for(file_path, target) for target in targets}
+        for output_path in outputs.values():
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+        return outputs
+
+    def finish_one(self, file_path: Path, result: Dict, queue_wait: float) -> Dict:
+        """Build the result dict used by show_summary from convert_file's result and record it"""
+        filename = self.relative_name(file_path)
+        if result['success']:
+            status = "OVER_LIMIT" if any(o['status'] == 'OVER_LIMIT' for o in result['outputs']) else "OK"
+
+            summary = {
+                'filename': filename,
+                'input_size': result['input_size'],
+                'output_size': result['output_size'],
+                'duration': result['duration'],
+                'bitrate': result['bitrate'],
+                'passes': result['passes'],
+                'compression_ratio': result['compression_ratio'],
+                'status': status,
+                'gain_db': result['gain_db'],
+                'outputs': result['outputs'],
+                'attempts': result.get('attempts', 1),
+                'metrics': dict(result['metrics'], queue_wait=queue_wait)
+            }
+        else:
+            summary = self.failed_result(file_path, result['error'], result['cause'],
+                                         result.get('attempts', 1), queue_wait)
+
+        if summary.get('cause') == 'interrupted':
+            return summary  # neither done nor failed: a resumed run converts it again
+        failures = self.previous_failures(file_path) + summary['attempts'] if summary['status'] == 'FAILED' else 0
+        self.record_conversion(file_path, summary, failures)
+        self.journal_result(file_path, summary)
+        if (summary['status'] == 'FAILED' and self.quarantine_dir is not None
+                and summary['cause'] in QUARANTINE_CAUSES and failures >= QUARANTINE_AFTER):
+            quarantined = self.quarantine(file_path, summary['error'])
+            if quarantined is not None:
+                summary['quarantined'] = str(quarantined)
+        return summary
+
+    def failed_result(self, file_path: Path, error: str, cause: str, attempts: int = 1,
+                      queue_wait: float = 0.0) -> Dict:
+        """FAILED result dict used by show_summary, with the cause deciding retries and quarantine"""
+        return {
+            'filename': self.relative_name(file_path),
+            'error': error,
+            'cause': cause,
+            'status': 'FAILED',
+            'attempts': attempts,
+            'metrics': new_stage_metrics(queue_wait=queue_wait, probe_time=None, encode_time=None,
+                                         cpu_time=None, peak_rss_kb=None)
+        }
+
+    def previous_failures(self, file_path: Path) -> int:
+        """Failed attempts recorded in the index for this exact input by earlier runs"""
+        try:
+            record = self.index.get(file_path) if self.index is not None else None
+        except OSError:
+            return 0
+        conversion = (record or {}).get('conversion', {})
+        if conversion.get('status') != 'FAILED':
+            return 0
+        return conversion.get('failures', 1)
+
+    @property
+    def split_outputs(self) -> bool:
+        """True when several presets are written, each into its own subdirectory"""
+        return len(self.qualities) > 1
+
+    def output_path_for(self, input_path: Path, target: Optional[OutputTarget] = None) -> Path:
+        """Output file for a given input and target, mirroring its place under input_dir"""
+        target = target or self.targets[0]
+        base = self.output_dir / target.quality if self.split_outputs else self.output_dir
+        extension = self.CODECS[target.codec]['extension']
+        if input_path in self.stem_collisions:
+            return base / (self.relative_name(input_path) + extension)
+        return (base / self.relative_name(input_path)).with_suffix(extension)
+
+    def output_signature(self, target: Optional[OutputTarget] = None) -> str:
+        """Identifies the encoder settings an output was produced with.
+
+        Readable settings come first; the trailing digest covers the rest of
+        the preset (size target and limit, bitrate bounds, VBR quality), so
+        editing a preset in place makes its outputs stale.
+        """
+        target = target or self.targets[0]
+        preset = self.presets[target.quality]
+        sizing = (preset.target_bytes, preset.max_size_bytes, preset.min_bitrate, preset.max_bitrate, preset.vbr_quality)
+        digest = hashlib.blake2b(repr(sizing).encode(), digest_size=4).hexdigest()
+        codec = "" if target.codec == 'mp3' else f"{target.codec}:"
+        layout = (f":{preset.sample_rate}hz" if preset.sample_rate else "") + (f":{preset.channels}ch" if preset.channels else "")
+        if self.trims_silence(preset.name):
+            layout += f":trim{preset.silence_threshold_db:g}/{preset.max_silence:g}"
+        if self.normalize is not None:
+            layout += f":norm{self.normalize:g}"
+        return f"{target.quality}:{codec}{self.encode_mode(target.quality)}{layout}:p{digest}"
+
+    def recorded_outputs(self, record: Optional[Dict]) -> Dict[str, Dict]:
+        """Outputs recorded in an index record, keyed by output signature"""
+        conversion = (record or {}).get('conversion', {})
+        if 'outputs' in conversion:
+            return conversion['outputs']
+        # Records written before multi-target output held a single output inline
+        return {conversion['signature']: conversion} if 'signature' in conversion else {}
+
+    def current_outputs(self, input_path: Path) -> Dict[OutputTarget, Dict]:
+        """Targets whose output is still current for input_path, with their index entries.
+
+        An output is current when it is newer than the input and the index
+        records a successful conversion of this exact input (same mtime and
+        size) to that file, with the same settings and the same output size.
+        """
+        if self.index is None:
+            return {}
+        try:
+            record = self.index.get(input_path)
+        except OSError:
+            return {}  # the input is gone: nothing of it is current
+        if record is None:
+            return {}
+        recorded = self.recorded_outputs(record)
+        current = {}
+        for target in self.targets:
+            entry = recorded.get(self.output_signature(target), {})
+            output_path = self.output_path_for(input_path, target)
+            try:
+                output_stat = output_path.stat()
+            except OSError:
+                continue
+            if (entry.get('status') in ('OK', 'OVER_LIMIT', 'DEDUPED')
+                    and entry.get('output') == str(output_path)
+                    and entry.get('output_size') == output_stat.st_size
+                    and output_stat.st_mtime_ns >= record['mtime_ns']):
+                current[target] = entry
+        return current
+
+    def skipped_result(self, input_path: Path, current: Dict[OutputTarget, Dict]) -> Dict:
+        """SKIPPED result for an input whose outputs are all up to date"""
+        record = self.index.get(input_path)
+        outputs = [
+            {'quality': target.quality, 'codec': target.codec, 'output': entry['output'],
+             'output_size': entry['output_size'], 'bitrate': entry.get('bitrate'), 'passes': 0, 'status': 'SKIPPED'}
+            for target, entry in current.items()
+        ]
+        output_size = sum(o['output_size'] for o in outputs)
+        return {
+            'filename': self.relative_name(input_path),
+            'input_size': record['size'],
+            'output_size': output_size,
+            'duration': record.get('info', {}).get('duration', 0),
+            'bitrate': outputs[0]['bitrate'],
+            'passes': 0,
+            'compression_ratio': (1 - output_size / record['size']) * 100 if record['size'] else 0,
+            'status': 'SKIPPED',
+            'outputs': outputs,
+        }
+
+    def record_conversion(self, input_path: Path, result: Dict, failures: int = 0):
+        """Store the outcome of a conversion in the persistent index.
+
+        Outputs of other targets recorded earlier are kept, so an input
+        converted to one preset stays current when another is added.
+        failures counts the failed attempts so far, across runs.
+        """
+        if self.index is None:
+            return
+        try:
+            record = self.index.get(input_path)
+            outputs = dict(self.recorded_outputs(record))
+            for output in result.get('outputs', []):
+                target = OutputTarget(output['quality'], output['codec'])
+                outputs[self.output_signature(target)] = {
+                    'status': result['status'] if result['status'] == 'DEDUPED' else output['status'],
+                    'output': output['output'],
+                    'output_size': output['output_size'],
+                    'bitrate': output['bitrate'],
+                }
+            conversion = {
+                'status': result['status'],
+                'qualities': self.qualities,
+                'converted_at': time.time(),
+                'outputs': outputs,
+            }
+            if 'error' in result:
+                conversion.update(error=result['error'], cause=result['cause'], failures=failures)
+            fields = {'conversion': conversion}
+            if 'hash' not in (record or {}):
+                fields['hash'] = file_digest(input_path)
+            self.index.update(input_path, **fields)
+        except OSError:
+            pass
+
+    def summarize_results(self, results: List[Dict]) -> Dict:
+        """Batch totals for machine-readable reports"""
+        converted = [r for r in results if 'error' not in r and r['status'] != 'SKIPPED']
+        statuses: Dict[str, int] = {}
+        for result in results:
+            statuses[result['status']] = statuses.get(result['status'], 0) + 1
+        total_input = sum(r['input_size'] for r in converted)
+        total_output = sum(r['output_size'] for r in converted)
+        return {
+            'files': len(results),
+            'statuses': statuses,
+            'total_input_size': total_input,
+            'total_output_size': total_output,
+            'compression_ratio': (1 - total_output / total_input) * 100 if total_input else 0,
+            'extra_passes': sum(r.get('passes', 1) - 1 for r in converted if r.get('passes', 1) > 1),
+            'stages': stage_totals(results),
+        }
+
     def show_summary(self, results: List[Dict]):
         """Show clean conversion summary"""
-        successful = [r for r in results if 'error' not in r]
+        if self.report != 'text':
+            self.emit('summary', **self.summarize_results(results))
+            return
+
+        successful = [r for r in results if 'error' not in r and r['status'] != 'SKIPPED']
+        skipped = [r for r in results if r['status'] == 'SKIPPED']
         failed = [r for r in results if 'error' in r]
 
         console.print(f"\n[bold green]🎉 Conversion Complete![/bold green]")
 
+        if skipped:
+            console.print(f"[blue]⏭️  Already up to date (skipped): {len(skipped)} file(s)[/blue]")
+
         if successful:
             total_original = sum(r['input_size'] for r in successful)
             total_converted = sum(r['output_size'] for r in successful)
@@ -460,28 +3190,227 @@ class AudioConverter:
             console.print(f"[green]✅ Successfully converted: {len(successful)} file(s)[/green]")
             console.print(f"📊 Total saved: [green]{total_compression:.1f}%[/green] ([red]{total_original_mb:.1f}MB[/red] → [blue]{total_converted_mb:.1f}MB[/blue])")
 
+            deduped = [r for r in successful if r['status'] == 'DEDUPED']
+            if deduped:
+                deduped_mb = sum(r['input_size'] for r in deduped) / (1024 * 1024)
+                console.print(f"🔗 Deduplicated: [green]{len(deduped)} identical input(s)[/green] reused an existing encode ([red]{deduped_mb:.1f}MB[/red] not re-encoded)")
+
+            trimmed = sum(r['duration'] - min(o.get('duration', r['duration']) for o in r['outputs'])
+                          for r in successful if r.get('outputs'))
+            if trimmed >= 1:
+                console.print(f"✂️  Silence trimmed: [green]{trimmed / 60:.1f} min[/green] removed before encoding")
+
+            normalized = [r for r in successful if r.get('gain_db') is not None]
+            if normalized:
+                gains = [r['gain_db'] for r in normalized]
+                console.print(f"🔊 Normalized to {self.normalize:g} LUFS: [green]{len(normalized)} file(s)[/green] (gain {min(gains):+.1f} to {max(gains):+.1f} dB)")
+
+            reencoded = [r for r in successful if r.get('passes', 1) > 1]
+            if reencoded:
+                extra_passes = sum(r['passes'] - 1 for r in reencoded)
+                console.print(f"🔁 Re-encoded to fit the size budget: [yellow]{len(reencoded)} file(s)[/yellow] ({extra_passes} extra pass(es))")
+
             # Show individual results for failed files only
             if len(successful) <= 5:
                 for result in successful:
                     converted_mb = result['output_size'] / (1024 * 1024)
-                    status = "✅" if result['status'] == 'OK' else "⚠️"
-                    console.print(f"  {status} {result['filename']}: [blue]{converted_mb:.1f}MB[/blue]")
+                    status = {"OK": "✅", "DEDUPED": "🔗"}.get(result['status'], "⚠️")
+                    passes = f" [dim]({result['passes']} passes)[/dim]" if result.get('passes', 1) > 1 else ""
+                    if len(result.get('outputs', [])) > 1:
+                        sizes = " · ".join(
+                            f"{o['quality']}{'' if o['codec'] == 'mp3' else '/' + o['codec']} {o['output_size'] / (1024 * 1024):.1f}MB"
+                            for o in result['outputs']
+                        )
+                        console.print(f"  {status} {result['filename']}: [blue]{sizes}[/blue]{passes}")
+                    else:
+                        console.print(f"  {status} {result['filename']}: [blue]{converted_mb:.1f}MB[/blue]{passes}")
 
         if failed:
             console.print(f"\n[red]❌ Failed conversions: {len(failed)} file(s)[/red]")
             for result in failed:
-                console.print(f"  [red]✗ {result['filename']}: {result['error']}[/red]")
+                notes = [f"{result['attempts']} attempts"] if result.get('attempts', 1) > 1 else []
+                if result.get('quarantined'):
+                    notes.append(f"moved to {result['quarantined']}")
+                suffix = f" [dim]({', '.join(notes)})[/dim]" if notes else ""
+                console.print(f"  [red]✗ {result['filename']}: {result['error']}[/red]{suffix}")
+
+        totals = stage_totals(results)
+        if totals['files']:
+            stages = " · ".join(
+                f"{label} {totals[key]:.1f}s" for label, key in
+                (("probe", 'probe_time'), ("decode", 'decode_time'), ("encode", 'encode_time'), ("queue wait", 'queue_wait'))
+                if totals[key] is not None
+            )
+            resources = []
+            if totals['cpu_time'] is not None:
+                resources.append(f"ffmpeg CPU {totals['cpu_time']:.1f}s")
+            if totals['peak_rss_kb'] is not None:
+                resources.append(f"peak ffmpeg RSS {totals['peak_rss_kb'] / 1024:.0f}MB")
+            console.print(f"\n[dim]⏱️  Stages: {stages}" + (f" | {' · '.join(resources)}" if resources else "") + "[/dim]")
+
+    def export_metrics(self, results: List[Dict], path: Path):
+        """Write per-file metrics as JSON lines, or Prometheus text for *.prom files"""
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            if path.suffix == '.prom':
+                f.write(prometheus_metrics(results))
+            else:
+                for result in results:
+                    record = {'filename': result['filename'], 'status': result['status']}
+                    record.update(result.get('metrics') or {})
+                    f.write(json.dumps(record) + "\n")
+        # Replace atomically so collectors never read a half-written file
+        os.replace(tmp_path, path)
+
+    def show_probe_stats(self):
+        """Show how many files were probed versus served from the cache"""
+        stats = self.probe_cache.stats()
+        index_hits = self.index.hits if self.index is not None else 0
+        probed = stats['misses'] - index_hits
+        console.print(f"[dim]🔍 Probed {probed} file(s), {index_hits} from index, {stats['hits']} cache hit(s)[/dim]")
+
+    def watch(self, poll_interval: float = 2.0, settle_seconds: float = 5.0):
+        """Convert files as they appear in input_dir until interrupted.
+
+        A file is queued once its size and mtime have stayed unchanged for
+        settle_seconds, so recordings still being copied are left alone.
+        inotify wakes the loop on Linux; elsewhere input_dir is polled.
+        Already converted inputs are skipped via the metadata index.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.incremental = True
+        watcher = InotifyWatcher.create(self.input_dir)
+        mode = "inotify" if watcher is not None else f"polling every {poll_interval:g}s"
+        console.print(f"[bold]👀 Watching {self.input_dir} ({mode}, {self.jobs} worker(s))[/bold]")
+        console.print("[dim]Press Ctrl+C to stop.[/dim]")
+
+        self._aborting.clear()
+        pending: Dict[Path, tuple] = {}   # path -> (size, mtime_ns, first seen unchanged)
+        handled: Dict[Path, tuple] = {}   # path -> (size, mtime_ns) already queued
+        running = {}
+        results = []
+
+        pool = ThreadPoolExecutor(max_workers=self.jobs)
+        try:
+            while True:
+                for file_path in self.watch_scan(pending, handled, time.monotonic(), settle_seconds):
+                    running[pool.submit(self.convert_one, file_path, None, time.perf_counter())] = file_path
+
+                for result in self.watch_results(running):
+                    results.append(result)
+                    self.emit('result', **result)
+                    self.show_watch_result(result)
+
+                # Sleep until the next file event; keep ticking while work is in flight
+                # (inotify only watches the top directory, so recursive mode keeps polling too)
+                timeout = poll_interval if (pending or running or watcher is None or self.recursive) else None
+                if watcher is not None:
+                    watcher.wait(timeout)
+                else:
+                    time.sleep(timeout)
+        except KeyboardInterrupt:
+            console.print("\n[yellow]→ Stopping watch, waiting for running conversions...[/yellow]")
+        except SystemExit:
+            self.abort()  # SIGTERM: no time to wait for running conversions
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            if watcher is not None:
+                watcher.close()
+
+        results.extend(self.watch_results(running))
+        if results:
+            self.show_summary(results)
+            if self.metrics_path:
+                self.export_metrics(results, self.metrics_path)
+
+    def watch_scan(self, pending: Dict[Path, tuple], handled: Dict[Path, tuple], now: float,
+                   settle_seconds: float) -> List[Path]:
+        """One pass of watch() over input_dir; returns the files that have just settled.
+
+        pending and handled are updated in place, and entries for files
+        that no longer exist are dropped so a long-running watch stays small.
+        """
+        ready = []
+        seen = set()
+        for file_path in self.find_audio_files():
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+            seen.add(file_path)
+            key = (stat.st_size, stat.st_mtime_ns)
+            if handled.get(file_path) == key:
+                continue
+            if pending.get(file_path, (None, None))[:2] != key:
+                pending[file_path] = key + (now,)
+            elif now - pending[file_path][2] >= settle_seconds:
+                del pending[file_path]
+                handled[file_path] = key
+                ready.append(file_path)
+        for entries in (pending, handled):
+            for file_path in [path for path in entries if path not in seen]:
+                del entries[file_path]
+        return ready
+
+    def watch_results(self, running: Dict) -> List[Dict]:
+        """Results of the finished futures in running (future -> input path), removed from it.
+
+        A conversion that raised becomes a FAILED result, so one bad input
+        never stops the watch.
+        """
+        results = []
+        for future in [f for f in running if f.done()]:
+            file_path = running.pop(future)
+            if future.cancelled():
+                continue
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(self.failed_result(file_path, str(e), failure_cause(e)))
+        return results
+
+    def show_watch_result(self, result: Dict):
+        """Print a one-line outcome for a file converted in watch mode"""
+        if 'error' in result:
+            console.print(f"  [red]✗ {result['filename']}: {result['error']}[/red]")
+        elif result['status'] == 'SKIPPED':
+            console.print(f"  [blue]⏭️  {result['filename']}: already up to date[/blue]")
+        else:
+            output_mb = result['output_size'] / (1024 * 1024)
+            console.print(f"  [green]✅ {result['filename']}[/green] → [blue]{output_mb:.1f}MB[/blue]")
 
     def run(self):
         """Complete conversion process with quality selection"""
+        try:
+            self._run()
+        finally:
+            if self.report == 'json':
+                sys.stdout.write(json.dumps(self._report, indent=2) + "\n")
+                sys.stdout.flush()
+
+    def _run(self):
         self.show_welcome()
 
-        if not self.check_ffmpeg():
+        # Dry runs only read headers (ffprobe is tried per file if needed)
+        if not self.dry_run and not self.check_ffmpeg():
+            self.emit('error', message="FFmpeg not found")
             return
 
+        if self.watch_mode:
+            console.print(f"[green]→ Quality set to: {self.quality_label()}[/green]")
+            self.watch(self.poll_interval, self.settle_seconds)
+            return
+
+        if not self.dry_run:
+            self.open_journal()
+        resumed: List[Dict] = []
+
         # Step 1: Quality Selection
         if self.quality_locked or self.convert_all:
-            console.print(f"[green]→ Quality set to: {self.QUALITY_LEVELS[self.quality]['name']}[/green]")
+            console.print(f"[green]→ Quality set to: {self.quality_label()}[/green]")
         else:
             console.print("\n[dim]First, let's choose your compression quality:[/dim]")
             selected_quality = self.select_quality()
@@ -493,14 +3422,49 @@ class AudioConverter:
             if show_info == 'y':
                 self.show_quality_info()
 
-        # Find M4A files in input directory
-        files = self.find_m4a_files()
+        # Time the backends now rather than under the progress bar
+        if not self.dry_run and not self.use_async:
+            self.resolve_backend()
+
+        # Large recursive batches: convert while scanning instead of listing first
+        if self.recursive and self.convert_all and not self.dry_run and not self.dedup and not self.use_async:
+            console.print(f"[bold]📁 Scanning {self.input_dir} and converting files as they are found[/bold]")
+            # Reports get the same events as a listed batch: settings up front, files once the scan is done
+            self.emit_settings()
+            scanned: List[Path] = []
+
+            def scan() -> Iterator[Path]:
+                for file_path in self.unjournaled(self.iter_input_files(), resumed):
+                    scanned.append(file_path)
+                    yield file_path
+
+            results = self.convert_files(scan())
+            if self.report != 'text':
+                self.emit('files', files=[self.describe_file(f) for f in scanned if f.exists()])
+            if not results and not resumed:
+                console.print(f"[yellow]📁 No audio files found in {self.input_dir}[/yellow]")
+                return
+            if resumed:
+                console.print(f"[green]↩️  {len(resumed)} file(s) were already finished by the interrupted run[/green]")
+            self.finish(resumed + results)
+            return
+
+        # Find audio files in input directory
+        files = self.find_audio_files()
 
         if len(files) == 0:
-            console.print(f"[yellow]📁 No M4A files found in {self.input_dir}[/yellow]")
-            console.print("[dim]Place your .m4a files in the input/ directory and try again.[/dim]")
+            self.emit('files', files=[])
+            console.print(f"[yellow]📁 No audio files found in {self.input_dir}[/yellow]")
+            console.print(f"[dim]Place your audio files ({', '.join(sorted(INPUT_FORMATS))}) in the input/ directory and try again.[/dim]")
             return
 
+        if self.resume:
+            files = list(self.unjournaled(files, resumed))
+            console.print(f"[green]↩️  Resuming: {len(resumed)} file(s) already finished, {len(files)} left[/green]")
+            if not files:
+                self.finish(resumed)
+                return
+
         # Show files with updated size estimates
         self.show_files(files)
 
@@ -515,11 +3479,35 @@ class AudioConverter:
         self.show_conversion_settings(selected_files)
         if self.dry_run:
             self.show_dry_run_summary(selected_files)
+            self.show_probe_stats()
             return
-        results = self.convert_files(selected_files)
+        results = self.convert_files_async(selected_files) if self.use_async else self.convert_files(selected_files)
+        self.finish(resumed + results)
+
+    def finish(self, results: List[Dict]):
+        """Summarize a finished batch and export its metrics"""
         self.show_summary(results)
+        if self.metrics_path:
+            self.export_metrics(results, self.metrics_path)
 
         console.print("\n[bold green]🎵 Conversion finished![/bold green]")
+        self.show_probe_stats()
+
+
+register_encoder_backend(EncoderBackend(
+    'ffmpeg', "one ffmpeg process built from an ffmpeg-python graph (default)",
+    AudioConverter.encode_with_ffmpeg, binary_available('ffmpeg')))
+register_encoder_backend(EncoderBackend(
+    'pydub', "pydub decode/export", AudioConverter.encode_with_pydub, module_available('pydub')))
+register_encoder_backend(EncoderBackend(
+    'stream', "bounded-memory PCM pipe between two ffmpeg processes",
+    AudioConverter.encode_with_stream, binary_available('ffmpeg')))
+register_encoder_backend(EncoderBackend(
+    'lame', "ffmpeg decodes, the lame binary encodes",
+    AudioConverter.encode_with_lame, binary_available('lame'), codecs=('mp3',)))
+register_encoder_backend(EncoderBackend(
+    'lameenc', "ffmpeg decodes, the lameenc binding encodes in-process",
+    AudioConverter.encode_with_lameenc, module_available('lameenc'), codecs=('mp3',)))
 
 
 def main():
@@ -527,20 +3515,181 @@ def main():
     parser = argparse.ArgumentParser(description="M4A to MP3 Converter")
     parser.add_argument("--input", default="input", help="Input directory (default: input)")
     parser.add_argument("--output", default="output", help="Output directory (default: output)")
-    parser.add_argument("--quality", choices=["small", "medium", "large"], help="Quality preset")
+    parser.add_argument("--quality", metavar="PRESETS",
+                        help="Quality preset, or several comma-separated (e.g. small,medium,large) to encode "
+                             "each file once per preset into per-preset subdirectories")
+    parser.add_argument("--presets", metavar="FILE",
+                        help="TOML or JSON file defining or overriding quality presets")
+    parser.add_argument("--trim-silence", action="store_true",
+                        help="Drop leading silence and shorten long pauses before encoding (all presets)")
+    parser.add_argument("--normalize", nargs="?", type=float, const=AudioConverter.LOUDNESS_TARGET, metavar="LUFS",
+                        help="Measure loudness (EBU R128) and apply gain to reach LUFS "
+                             f"(default: {AudioConverter.LOUDNESS_TARGET:g}), keeping true peak under "
+                             f"{AudioConverter.TRUE_PEAK_LIMIT:g} dBTP")
+    parser.add_argument("--codec", default="mp3", metavar="CODECS",
+                        help=f"Output codec(s), comma-separated: {', '.join(AudioConverter.CODECS)} (default: mp3)")
     parser.add_argument("--dry-run", action="store_true", help="Estimate output sizes without encoding")
     parser.add_argument("--convert-all", action="store_true", help="Convert all input files without prompts")
+    parser.add_argument("--recursive", action="store_true",
+                        help="Scan subdirectories and mirror the source tree under the output directory")
+    parser.add_argument("--include", action="append", metavar="GLOB",
+                        help="Only convert files matching this glob (relative path or name; repeatable)")
+    parser.add_argument("--exclude", action="append", metavar="GLOB",
+                        help="Skip files matching this glob (relative path or name; repeatable)")
+    parser.add_argument("--formats", metavar="NAMES",
+                        help="Comma-separated input formats to pick up (default: all of "
+                             f"{','.join(sorted({f.name for f in INPUT_FORMATS.values()}))})")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Encode identical inputs once and hardlink the result to each output name")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and convert files as they arrive in the input directory")
+    parser.add_argument("--poll-interval", type=float, default=2.0, metavar="SECONDS",
+                        help="Watch mode rescan interval when inotify is unavailable (default: 2)")
+    parser.add_argument("--settle", type=float, default=5.0, metavar="SECONDS",
+                        help="Watch mode: wait until a file is unchanged this long before converting (default: 5)")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="Write per-file stage metrics as JSON lines, or Prometheus text if FILE ends in .prom")
+    parser.add_argument("--report", choices=AudioConverter.REPORT_FORMATS, default="text",
+                        help="Output format: Rich console text (default), one JSON document, "
+                             "or NDJSON events streamed per file (json/ndjson imply --convert-all)")
+    parser.add_argument("--no-index", action="store_true", help="Do not read or write the metadata index in the output directory")
+    parser.add_argument("--resume", action="store_true",
+                        help=f"Continue an interrupted batch, skipping files the journal (output/{JobJournal.FILENAME}) "
+                             "lists as finished")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Skip files whose output is newer than the input and was made with the same settings")
+    parser.add_argument("--backend", choices=[*ENCODER_BACKENDS, "auto"], default="ffmpeg",
+                        help="Encoder backend: "
+                             + "; ".join(f"{backend.name}: {backend.description}" for backend in ENCODER_BACKENDS.values())
+                             + "; auto: the fastest installed one for the chosen presets, timed once and cached")
+    parser.add_argument("--buffer-size", type=int, default=256, metavar="KB",
+                        help="PCM chunk size for the stream backend in KB (default: 256)")
+    parser.add_argument("--strict-size", action="store_true",
+                        help="Encode CBR and re-encode any file that overshoots its size budget")
+    parser.add_argument("--jobs", type=int, metavar="N", help="Files to convert in parallel (default: CPU count)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Run conversions as asyncio subprocesses with per-file progress (single-process ffmpeg)")
+    parser.add_argument("--timeout", type=float, metavar="SECONDS",
+                        help="Give up on a file after this long, killing its ffmpeg processes "
+                             "(not enforced inside the pydub backend)")
+    parser.add_argument("--retries", type=int, default=0, metavar="N",
+                        help="Retry a timed out file, or one that hit a transient system error, "
+                             "up to N times (default: 0)")
+    parser.add_argument("--retry-backoff", type=float, default=2.0, metavar="SECONDS",
+                        help="Wait before the first retry, doubled for each further one (default: 2)")
+    parser.add_argument("--quarantine", metavar="DIR",
+                        help="Move inputs that time out or are unreadable on a second attempt (in this run "
+                             "or an earlier one) here, with a .error note, so later runs skip them")
+    parser.add_argument("--serve", metavar="[HOST:]PORT",
+                        help="Run a local HTTP conversion service instead of converting the input directory "
+                             "(uploads are spooled under --input, results written to --output)")
+    parser.add_argument("--queue-size", type=int, default=16, metavar="N",
+                        help="Service mode: jobs waiting for a worker before uploads get 429 (default: 16)")
+    parser.add_argument("--job-ttl", type=float, default=3600, metavar="SECONDS",
+                        help="Service mode: forget finished jobs and remove their files after this long "
+                             "(default: 3600)")
     args = parser.parse_args()
 
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.buffer_size < 1:
+        parser.error("--buffer-size must be at least 1 KB")
+    if (args.incremental or args.watch) and args.no_index:
+        parser.error("--incremental and --watch need the metadata index; drop --no-index")
+    try:
+        presets = load_presets(args.presets) if args.presets else PRESETS
+    except ValueError as e:
+        parser.error(str(e))
+    qualities = [name for name in (args.quality or "").split(",") if name]
+    unknown = sorted(set(qualities) - set(presets))
+    if unknown:
+        parser.error(f"unknown quality preset(s): {', '.join(unknown)}")
+    codecs = [name for name in args.codec.split(",") if name]
+    unknown = sorted(set(codecs) - set(AudioConverter.CODECS))
+    if unknown or not codecs:
+        parser.error(f"unknown output codec(s): {', '.join(unknown) or '(none)'}")
+    formats = [name for name in (args.formats or "").split(",") if name]
+    unknown = sorted(set(formats) - {f.name for f in INPUT_FORMATS.values()})
+    if unknown:
+        parser.error(f"unknown input format(s): {', '.join(unknown)}")
+    if args.normalize is not None and not -70 < args.normalize < 0:
+        parser.error("--normalize target must be between -70 and 0 LUFS")
+    if args.timeout is not None and args.timeout <= 0:
+        parser.error("--timeout must be positive")
+    if args.retries < 0 or args.retry_backoff < 0:
+        parser.error("--retries and --retry-backoff cannot be negative")
+    if args.quarantine and Path(args.input).resolve() in (Path(args.quarantine).resolve(), *Path(args.quarantine).resolve().parents):
+        parser.error("--quarantine must be outside the input directory")
+    if (args.use_async or args.serve) and args.watch:
+        parser.error("--async and --serve cannot be combined with --watch")
+    if (args.use_async or args.serve) and args.backend != "ffmpeg":
+        parser.error("--async and --serve always use the single-process ffmpeg backend; drop --backend")
+    if args.serve:
+        host, _, port = args.serve.rpartition(":")
+        if not port.isdigit() or int(port) > 65535:
+            parser.error("--serve expects [HOST:]PORT")
+        if args.dry_run or args.report != "text":
+            parser.error("--serve cannot be combined with --dry-run or --report")
+    if args.resume and (args.dry_run or args.watch or args.serve):
+        parser.error("--resume cannot be combined with --dry-run, --watch or --serve")
+    if args.queue_size < 1:
+        parser.error("--queue-size must be at least 1")
+    if args.job_ttl <= 0:
+        parser.error("--job-ttl must be positive")
+    if args.backend != "auto":
+        backend = ENCODER_BACKENDS[args.backend]
+        unsupported = sorted(set(codecs) - set(backend.codecs))
+        if unsupported:
+            parser.error(f"--backend {backend.name} cannot write {', '.join(unsupported)}")
+        if not backend.available():
+            parser.error(f"--backend {backend.name} is not installed here")
+    if args.poll_interval <= 0 or args.settle < 0:
+        parser.error("--poll-interval must be positive and --settle non-negative")
+
     converter = AudioConverter(
         args.input,
         args.output,
-        args.quality or "medium",
+        qualities[0] if qualities else ('medium' if 'medium' in presets else next(iter(presets))),
         dry_run=args.dry_run,
-        quality_locked=bool(args.quality),
-        convert_all=args.convert_all,
+        quality_locked=bool(qualities),
+        convert_all=args.convert_all or args.watch or args.report != "text",
+        use_index=not args.no_index,
+        jobs=args.jobs,
+        backend=args.backend,
+        buffer_size=args.buffer_size * 1024,
+        strict_size=args.strict_size,
+        incremental=args.incremental,
+        dedup=args.dedup,
+        watch=args.watch,
+        poll_interval=args.poll_interval,
+        settle_seconds=args.settle,
+        metrics_path=args.metrics,
+        report=args.report,
+        recursive=args.recursive,
+        include=args.include,
+        exclude=args.exclude,
+        formats=formats,
+        qualities=list(dict.fromkeys(qualities)) or None,
+        codecs=list(dict.fromkeys(codecs)),
+        presets=presets,
+        trim_silence=args.trim_silence,
+        normalize=args.normalize,
+        use_async=args.use_async,
+        job_timeout=args.timeout,
+        resume=args.resume,
+        retries=args.retries,
+        retry_backoff=args.retry_backoff,
+        quarantine_dir=args.quarantine,
     )
-    converter.run()
+    signal.signal(signal.SIGTERM, exit_on_sigterm)
+    try:
+        if args.serve:
+            import service
+            service.serve(converter, host or "127.0.0.1", int(port), args.queue_size, args.job_ttl)
+        else:
+            converter.run()
+    finally:
+        converter.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+🌐 Local HTTP conversion service for the audio to MP3 converter
+Accepts uploads into a bounded job queue and converts them on the asyncio core
+"""
+
+import asyncio
+import json
+import secrets
+import shutil
+import time
+import unicodedata
+from http import HTTPStatus
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, quote, urlsplit
+
+from convert import AudioConverter, console, input_format_for
+
+
+class ConversionService:
+    """HTTP front end with a bounded job queue and a persistent pool of conversion workers.
+
+    Endpoints:
+      POST   /jobs?name=FILE          upload the request body as FILE; 202 with the job,
+                                      429 when the queue is full
+      GET    /jobs/ID                 job status, encode progress and result
+      GET    /jobs/ID/output          download the converted file (?quality=&codec= to pick
+                                      one when several presets or codecs are configured)
+      DELETE /jobs/ID                 forget a finished job and remove its files
+      GET    /health                  queue depth and worker count
+
+    Uploads are spooled to input_dir/ID/ and converted with the converter's
+    presets, so outputs land in output_dir/ID/ (per preset when several are set).
+    Finished jobs not deleted by the client expire after job_ttl seconds,
+    files included; None keeps them until the service stops.
+    """
+
+    MAX_UPLOAD_BYTES = 2 * 1024 ** 3
+    MAX_HEADERS = 100
+    CHUNK_SIZE = 256 * 1024
+    JANITOR_INTERVAL = 60
+
+    def __init__(self, converter: AudioConverter, workers: Optional[int] = None,
+                 queue_size: int = 16, timeout: Optional[float] = None, job_ttl: Optional[float] = 3600):
+        self.converter = converter
+        self.workers = max(1, workers or converter.jobs)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.timeout = timeout if timeout is not None else converter.job_timeout
+        self.job_ttl = job_ttl
+        self.jobs: Dict[str, Dict] = {}
+        self.server: Optional[asyncio.AbstractServer] = None
+        self._worker_tasks: List[asyncio.Task] = []
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8000) -> Tuple[str, int]:
+        """Check ffmpeg once, start the workers and listen; returns the bound address"""
+        if not await self.converter.check_ffmpeg_async():
+            raise RuntimeError("FFmpeg not found")
+        self._worker_tasks = [asyncio.create_task(self.worker()) for _ in range(self.workers)]
+        if self.job_ttl is not None:
+            self._worker_tasks.append(asyncio.create_task(self.janitor()))
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        """Stop listening and cancel the workers and janitor (running encodes are killed)"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    async def serve_forever(self, host: str, port: int):
+        """Run until cancelled"""
+        host, port = await self.start(host, port)
+        console.print(f"[bold blue]🌐 Conversion service on http://{host}:{port}[/bold blue] "
+                      f"[dim]({self.workers} worker(s), queue of {self.queue.maxsize})[/dim]")
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def worker(self):
+        """Convert queued jobs one at a time, for as long as the service runs"""
+        while True:
+            job = await self.queue.get()
+            job['status'] = 'running'
+            job['started_at'] = time.time()
+
+            def on_progress(filename: str, fraction: float, job=job):
+                job['progress'] = round(fraction, 3)
+
+            try:
+                result = await self.converter.convert_one_async(
+                    job['_input'], on_progress, self.timeout, job['_submitted_at']
+                )
+            except Exception as e:
+                result = {'filename': job['filename'], 'error': str(e), 'status': 'FAILED'}
+            finally:
+                self.queue.task_done()
+                # The upload is no longer needed once its outputs exist (or failed)
+                job['_input'].unlink(missing_ok=True)
+
+            job['result'] = result
+            job['finished_at'] = time.time()
+            if result['status'] == 'FAILED':
+                job['status'] = 'failed'
+                console.print(f"[red]❌ {job['id']} {job['filename']}: {result['error']}[/red]")
+            else:
+                job['status'] = 'done'
+                job['progress'] = 1.0
+                console.print(f"[green]✅ {job['id']} {job['filename']}[/green]")
+
+    async def janitor(self):
+        """Expire finished jobs periodically, for as long as the service runs"""
+        while True:
+            await asyncio.sleep(min(self.job_ttl, self.JANITOR_INTERVAL))
+            self.expire_jobs()
+
+    def expire_jobs(self, now: Optional[float] = None) -> int:
+        """Delete finished jobs older than job_ttl, with their files; returns how many"""
+        now = now if now is not None else time.time()
+        expired = [job for job in self.jobs.values()
+                   if job['status'] in ('done', 'failed') and now - job['finished_at'] >= self.job_ttl]
+        for job in expired:
+            self.delete(job)
+        return len(expired)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one request per connection"""
+        try:
+            status, payload = await self.respond(reader)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        except ValueError as e:
+            status, payload = 400, {'error': str(e)}
+        try:
+            await self.send(writer, status, payload)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, reader: asyncio.StreamReader) -> Tuple[int, Union[Dict, Path]]:
+        """Parse a request and route it; returns the status and a JSON payload or a file"""
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            raise ValueError("malformed request line")
+        method, target, _ = request_line
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line in ('\r\n', '\n', ''):
+                break
+            if len(headers) >= self.MAX_HEADERS:
+                raise ValueError("too many headers")
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split('/') if part]
+
+        if parts == ['health']:
+            return 200, {'status': 'ok', 'queued': self.queue.qsize(), 'workers': self.workers}
+        if parts == ['jobs'] and method == 'POST':
+            return await self.submit(reader, headers, query)
+        if len(parts) < 2 or parts[0] != 'jobs' or len(parts) > 3:
+            return 404, {'error': "not found"}
+
+        job = self.jobs.get(parts[1])
+        if job is None:
+            return 404, {'error': f"unknown job {parts[1]}"}
+        if len(parts) == 3 and parts[2] == 'output' and method == 'GET':
+            return self.output_for(job, query)
+        if len(parts) == 2 and method == 'GET':
+            return 200, self.job_status(job)
+        if len(parts) == 2 and method == 'DELETE':
+            return self.delete(job)
+        return 405, {'error': f"{method} not allowed here"}
+
+    async def submit(self, reader: asyncio.StreamReader, headers: Dict[str, str],
+                     query: Dict[str, str]) -> Tuple[int, Dict]:
+        """Spool an upload and queue it, or refuse it without reading the body"""
+        filename = Path(query.get('name') or headers.get('x-filename') or "").name
+        if any(unicodedata.category(char) == 'Cc' for char in filename):
+            return 400, {'error': "file name contains control characters"}
+        input_format = input_format_for(Path(filename))
+        if input_format is None or (self.converter.formats and input_format.name not in self.converter.formats):
+            return 415, {'error': f"unsupported input file name {filename!r}"}
+        if 'content-length' not in headers:
+            return 411, {'error': "Content-Length required"}
+        length = int(headers['content-length'])
+        if length < 0:
+            raise ValueError("negative Content-Length")
+        if length > self.MAX_UPLOAD_BYTES:
+            return 413, {'error': f"upload larger than {self.MAX_UPLOAD_BYTES} bytes"}
+        if self.queue.full():
+            return 429, {'error': "queue full", 'queued': self.queue.qsize()}
+
+        job_id = secrets.token_hex(8)
+        input_path = self.converter.input_dir / job_id / filename
+        input_path.parent.mkdir(parents=True)
+        try:
+            with open(input_path, 'wb') as f:
+                remaining = length
+                while remaining:
+                    chunk = await reader.readexactly(min(remaining, self.CHUNK_SIZE))
+                    f.write(chunk)
+                    remaining -= len(chunk)
+        except BaseException:
+            shutil.rmtree(input_path.parent, ignore_errors=True)
+            raise
+
+        job = {
+            'id': job_id,
+            'filename': filename,
+            'status': 'queued',
+            'progress': 0.0,
+            'submitted_at': time.time(),
+            '_input': input_path,
+            '_submitted_at': time.perf_counter(),
+        }
+        try:
+            # Another upload may have taken the last slot while this one was read
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            shutil.rmtree(input_path.parent, ignore_errors=True)
+            return 429, {'error': "queue full", 'queued': self.queue.qsize()}
+        self.jobs[job_id] = job
+        console.print(f"[cyan]📥 {job_id} {filename}[/cyan] [dim]({length / (1024 * 1024):.1f}MB queued)[/dim]")
+        return 202, self.job_status(job)
+
+    def job_status(self, job: Dict) -> Dict:
+        """Public view of a job (without internal fields)"""
+        return {key: value for key, value in job.items() if not key.startswith('_')}
+
+    def output_for(self, job: Dict, query: Dict[str, str]) -> Tuple[int, Union[Dict, Path]]:
+        """The output file matching the requested quality/codec of a finished job"""
+        if job['status'] != 'done':
+            return 409, dict(self.job_status(job), error=f"job is {job['status']}")
+        outputs = [
+            output for output in job['result']['outputs']
+            if query.get('quality', output['quality']) == output['quality']
+            and query.get('codec', output['codec']) == output['codec']
+        ]
+        if not outputs:
+            return 404, {'error': "no output for that quality/codec"}
+        return 200, Path(outputs[0]['output'])
+
+    def delete(self, job: Dict) -> Tuple[int, Dict]:
+        """Forget a finished job and remove its outputs"""
+        if job['status'] in ('queued', 'running'):
+            return 409, dict(self.job_status(job), error=f"job is {job['status']}")
+        for output in job['result'].get('outputs', []):
+            output_path = Path(output['output'])
+            output_path.unlink(missing_ok=True)
+            try:
+                output_path.parent.rmdir()
+            except OSError:
+                pass  # not empty: shared with other outputs
+        shutil.rmtree(job['_input'].parent, ignore_errors=True)
+        del self.jobs[job['id']]
+        return 200, {'id': job['id'], 'status': 'deleted'}
+
+    async def send(self, writer: asyncio.StreamWriter, status: int, payload: Union[Dict, Path]):
+        """Write the response: JSON, or a file streamed in chunks"""
+        if isinstance(payload, Path):
+            content_type = next((codec['mime'] for codec in AudioConverter.CODECS.values()
+                                 if codec['extension'] == payload.suffix), 'application/octet-stream')
+            headers = [
+                f"Content-Type: {content_type}",
+                f"Content-Length: {payload.stat().st_size}",
+                f"Content-Disposition: {content_disposition(payload.name)}",
+            ]
+        else:
+            body = json.dumps(payload).encode()
+            headers = ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+            if status == 429:
+                headers.append("Retry-After: 1")
+            elif status == 202:
+                headers.append(f"Location: /jobs/{payload['id']}")
+
+        head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", *headers, "Connection: close", "", ""]
+        writer.write("\r\n".join(head).encode('latin-1'))
+        if isinstance(payload, Path):
+            with open(payload, 'rb') as f:
+                while chunk := f.read(self.CHUNK_SIZE):
+                    writer.write(chunk)
+                    await writer.drain()
+        else:
+            writer.write(body)
+        await writer.drain()
+
+
+def content_disposition(name: str) -> str:
+    """attachment header value: an ASCII fallback name plus the exact name as RFC 5987 UTF-8"""
+    fallback = "".join(char if " " <= char <= "~" and char not in '"\\' else "_" for char in name)
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(name, safe='')}"
+
+
+def serve(converter: AudioConverter, host: str, port: int, queue_size: int = 16, job_ttl: Optional[float] = 3600):
+    """Run the conversion service in the foreground until interrupted"""
+    service = ConversionService(converter, queue_size=queue_size, job_ttl=job_ttl)
+    try:
+        asyncio.run(service.serve_forever(host, port))
+    except KeyboardInterrupt:
+        console.print("\n[yellow]→ Service stopped[/yellow]")
+    except RuntimeError as e:
+        console.print(f"[red]❌ {e}[/red]")
@@ -5,7 +5,10 @@ Validates the installation and basic functionality
 """
 
 import sys
+import json
 import os
+import struct
+import tempfile
 from pathlib import Path
 
 def test_imports():
@@ -74,6 +77,1115 @@ def test_converter_import():
         print(f"  ❌ Failed to import AudioConverter: {e}")
         return False
 
+def _atom(kind, payload):
+    """Build a single MP4 atom"""
+    return struct.pack('>I4s', 8 + len(payload), kind) + payload
+
+def _build_m4a(duration=90, timescale=1000, channels=2, sample_rate=44100):
+    """Build a minimal M4A file with the moov atom after mdat"""
+    mvhd = _atom(b'mvhd', bytes(12) + struct.pack('>II', timescale, duration * timescale) + bytes(80))
+    entry = (struct.pack('>I4s', 36, b'mp4a') + bytes(6) + struct.pack('>H', 1) + bytes(8)
+             + struct.pack('>HHHHI', channels, 16, 0, 0, sample_rate << 16))
+    stsd = _atom(b'stsd', bytes(4) + struct.pack('>I', 1) + entry)
+    trak = _atom(b'trak', _atom(b'mdia', _atom(b'minf', _atom(b'stbl', stsd))))
+    return _atom(b'ftyp', b'M4A ' + bytes(4)) + _atom(b'mdat', bytes(4096)) + _atom(b'moov', mvhd + trak)
+
+def _write_outputs(outputs, payload):
+    """Write payload (bytes, or a callable taking the bitrate) to every (output_path, bitrate, target)"""
+    for output_path, bitrate, target in outputs:
+        output_path.write_bytes(payload(bitrate) if callable(payload) else payload)
+
+def _fake_encoder(on_input=None, payload=bytes(1000)):
+    """Stand-in for AudioConverter.encode that writes payload to every output.
+
+    on_input(input_path, outputs) runs first and may record the call, raise
+    or block to simulate a failing or hung encoder.
+    """
+    from convert import new_stage_metrics
+
+    def encode(input_path, outputs):
+        if on_input is not None:
+            on_input(input_path, outputs)
+        _write_outputs(outputs, payload)
+        return new_stage_metrics()
+    return encode
+
+def _fake_encoder_async(on_input=None, payload=bytes(1000)):
+    """_fake_encoder for AudioConverter.encode_async: on_input is awaited, progress reported at 50% and 100%"""
+    from convert import new_stage_metrics
+
+    async def encode_async(input_path, outputs, on_progress=None):
+        if on_input is not None:
+            await on_input(input_path, outputs)
+        if on_progress is not None:
+            on_progress(0.5)
+        _write_outputs(outputs, payload)
+        if on_progress is not None:
+            on_progress(1.0)
+        return new_stage_metrics()
+    return encode_async
+
+def test_mp4_header_probe():
+    """Test that duration and stream layout are read from the MP4 header"""
+    print("\n🔬 Testing MP4 header probe...")
+
+    from convert import read_mp4_header
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sample.m4a"
+        path.write_bytes(_build_m4a(duration=90, channels=1, sample_rate=22050))
+        info = read_mp4_header(path)
+        assert info is not None, "header not parsed"
+        assert info['duration'] == 90
+        assert info['channels'] == 1
+        assert info['frame_rate'] == 22050
+        assert info['codec'] == 'aac'
+
+        path.write_bytes(_build_m4a()[:-20])
+        assert read_mp4_header(path) is None, "truncated header should not parse"
+
+    print("  ✅ Duration, channels and sample rate read without decoding")
+    return True
+
+def test_format_headers():
+    """Test WAV and FLAC header readers and the format registry"""
+    print("\n🎼 Testing format header readers...")
+
+    import struct
+    from convert import AudioConverter, input_format_for, read_flac_header, read_wav_header
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 2.5 s of 16-bit stereo 48 kHz PCM, with an extra chunk before 'data'
+        wav = Path(tmp) / "take.WAV"
+        data_size = 48000 * 4 * 5 // 2
+        fmt = struct.pack('<HHIIHH', 1, 2, 48000, 48000 * 4, 4, 16)
+        wav.write_bytes(b'RIFF' + struct.pack('<I', 0) + b'WAVE'
+                        + b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+                        + b'LIST' + struct.pack('<I', 3) + b'abc\x00'
+                        + b'data' + struct.pack('<I', data_size) + bytes(64))
+        info = read_wav_header(wav)
+        assert info == {'duration': 2.5, 'codec': 'pcm_s16le', 'channels': 2,
+                        'frame_rate': 48000, 'sample_width': 2}, info
+
+        # STREAMINFO: 44.1 kHz, mono, 24-bit, 441000 samples
+        flac = Path(tmp) / "take.flac"
+        packed = (44100 << 44) | (0 << 41) | (23 << 36) | 441000
+        streaminfo = bytes(10) + packed.to_bytes(8, 'big') + bytes(16)
+        flac.write_bytes(b'fLaC' + bytes([0x80, 0, 0, 34]) + streaminfo)
+        info = read_flac_header(flac)
+        assert info['duration'] == 10 and info['channels'] == 1 and info['sample_width'] == 3, info
+
+        assert read_wav_header(flac) is None and read_flac_header(wav) is None
+
+        assert input_format_for(wav).name == 'wav'
+        assert input_format_for(Path("clip.MOV")).video
+        assert input_format_for(Path("notes.txt")) is None
+        for name in ("a.mp3", "b.opus", "c.mkv"):
+            (Path(tmp) / name).write_bytes(b"x")
+        converter = AudioConverter(Path(tmp), Path(tmp) / "out", use_index=False)
+        assert [f.name for f in converter.find_audio_files()] == ["b.opus", "c.mkv", "take.WAV", "take.flac"]
+        converter.formats = {'wav'}
+        assert [f.name for f in converter.find_audio_files()] == ["take.WAV"]
+
+    print("  ✅ WAV/FLAC durations read from headers; scanner follows the registry")
+    return True
+
+def test_lazy_imports():
+    """Test that importing convert leaves the heavy dependencies unloaded"""
+    print("\n🪶 Testing lazy imports...")
+
+    import subprocess
+
+    probe = ("import convert, json, sys; "
+             "print(json.dumps([m for m in ('asyncio', 'ffmpeg', 'pydub', 'rich.progress') if m in sys.modules]))")
+    result = subprocess.run([sys.executable, '-c', probe], cwd=Path(__file__).parent,
+                            capture_output=True, text=True, check=True)
+    assert json.loads(result.stdout) == [], result.stdout
+
+    print("  ✅ asyncio, ffmpeg-python, pydub and rich.progress load on demand")
+    return True
+
+def test_ffmpeg_check_cache():
+    """Test that ffmpeg -version runs once per binary and again after it changes"""
+    print("\n🗂️  Testing cached ffmpeg check...")
+
+    from convert import AudioConverter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        calls = Path(tmp) / "calls"
+        binary = Path(tmp) / "bin" / "ffmpeg"
+        binary.parent.mkdir()
+        binary.write_text(f"#!/bin/sh\necho run >> {calls}\necho 'ffmpeg version test'\n")
+        binary.chmod(0o755)
+
+        saved = {key: os.environ.get(key) for key in ('PATH', 'XDG_CACHE_HOME')}
+        os.environ['PATH'] = str(binary.parent)
+        os.environ['XDG_CACHE_HOME'] = str(Path(tmp) / "cache")
+        try:
+            converter = AudioConverter(Path(tmp) / "in", Path(tmp) / "out", use_index=False)
+            assert converter.check_ffmpeg() and converter.check_ffmpeg()
+            assert calls.read_text().count("run") == 1, "second check should hit the cache"
+
+            os.utime(binary, ns=(0, 10 ** 18))
+            assert converter.check_ffmpeg()
+            assert calls.read_text().count("run") == 2, "a changed binary should be checked again"
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+
+    print("  ✅ Check skipped until the binary's mtime changes")
+    return True
+
+def test_probe_cache():
+    """Test that each file is probed once until it changes on disk"""
+    print("\n🗃️  Testing probe cache...")
+
+    from convert import ProbeCache
+
+    calls = []
+
+    def loader(path):
+        calls.append(path)
+        return {'duration': 1.0, 'size': path.stat().st_size}
+
+    cache = ProbeCache()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sample.m4a"
+        path.write_bytes(b"abc")
+        for _ in range(5):
+            cache.get(path, loader)
+        assert len(calls) == 1, f"expected 1 probe, got {len(calls)}"
+        assert cache.stats()['hits'] == 4
+
+        path.write_bytes(b"abcdef")
+        assert cache.get(path, loader)['size'] == 6, "changed file should be re-probed"
+        assert cache.stats()['misses'] == 2
+
+    print("  ✅ Repeated lookups served from cache, changes invalidate")
+    return True
+
+def test_metadata_index():
+    """Test that the on-disk index survives reloads and detects changed files"""
+    print("\n📇 Testing metadata index...")
+
+    from convert import MetadataIndex
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "sample.m4a"
+        path.write_bytes(b"abc")
+        index_path = Path(tmp) / MetadataIndex.FILENAME
+
+        index = MetadataIndex(index_path)
+        index.update(path, info={'duration': 12.5})
+        index.close()
+
+        reloaded = MetadataIndex(index_path)
+        assert reloaded.get_info(path) == {'duration': 12.5, 'size': 3}
+        assert reloaded.hits == 1
+
+        with open(index_path, 'a') as f:
+            f.write('{"path": "trunc')
+        assert MetadataIndex(index_path).get_info(path) is not None, "partial line should be skipped"
+
+        path.write_bytes(b"abcdef")
+        assert reloaded.get_info(path) is None, "changed file should invalidate the record"
+
+    print("  ✅ Records persist across runs and are invalidated by mtime/size")
+    return True
+
+def test_strict_size_reencode():
+    """Test that strict size mode re-encodes overshooting outputs below the budget"""
+    print("\n📐 Testing strict size targeting...")
+
+    from convert import AudioConverter, MP3_BITRATES
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "talk.m4a"
+        source.write_bytes(_build_m4a(duration=600))
+        converter = AudioConverter(Path(tmp) / "in", Path(tmp) / "out", strict_size=True, use_index=False)
+        bitrates = []
+        # Simulate an encoder that overshoots its nominal rate by 30%
+        converter.encode = _fake_encoder(lambda input_path, outputs: bitrates.extend(b for _, b, _ in outputs),
+                                         payload=lambda bitrate: bytes(int(bitrate * 1000 * 600 / 8 * 1.3)))
+        result = converter.convert_file(source, Path(tmp) / "out" / "talk.mp3")
+
+        assert result['success'], result
+        assert result['output_size'] <= converter.target_bytes()
+        assert result['passes'] == len(bitrates) == 2, bitrates
+        assert all(rate in MP3_BITRATES for rate in bitrates)
+
+    print("  ✅ Overshooting output re-encoded under budget in 2 passes")
+    return True
+
+def test_incremental_skip():
+    """Test that incremental mode only re-encodes new or changed inputs"""
+    print("\n⏭️  Testing incremental conversion...")
+
+    from convert import AudioConverter, PRESETS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "in" / "talk.m4a"
+        source.parent.mkdir()
+        source.write_bytes(_build_m4a(duration=60))
+        encodes = []
+
+        # The last two runs edit the small preset in place: the first of them re-encodes
+        edited = dict(PRESETS, small=PRESETS['small']._replace(max_bitrate=PRESETS['small'].max_bitrate - 8))
+        for quality, presets in (("medium", None), ("medium", None), ("small", None), ("small", edited), ("small", edited)):
+            converter = AudioConverter(source.parent, Path(tmp) / "out", quality, incremental=True, presets=presets)
+            converter.encode = _fake_encoder(lambda input_path, outputs: encodes.append(input_path))
+            result = converter.convert_one(source)
+            converter.close()
+
+        assert len(encodes) == 3, "unchanged runs should skip, preset changes should re-encode"
+        assert result['status'] == 'SKIPPED'
+
+    print("  ✅ Unchanged inputs skipped, changed settings re-encoded")
+    return True
+
+def test_multi_target_fanout():
+    """Test that several presets/codecs share one encode call and land in per-preset subdirectories"""
+    print("\n🪭 Testing multi-target output...")
+
+    from convert import AudioConverter, OutputTarget
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "in" / "talk.m4a"
+        source.parent.mkdir()
+        source.write_bytes(_build_m4a(duration=600))
+        calls = []
+        fake_encode = _fake_encoder(
+            lambda input_path, outputs: calls.append([(target, bitrate) for _, bitrate, target in outputs]),
+            payload=bytes)
+
+        def make(qualities):
+            converter = AudioConverter(source.parent, Path(tmp) / "out", qualities=qualities,
+                                       codecs=["mp3", "opus"], incremental=True)
+            converter.encode = fake_encode
+            return converter
+
+        converter = make(["small", "large"])
+        result = converter.convert_one(source)
+        converter.close()
+
+        assert len(calls) == 1 and len(calls[0]) == 4, calls
+        bitrates = dict(calls[0])
+        assert bitrates[OutputTarget("small", "mp3")] < bitrates[OutputTarget("large", "mp3")]
+        assert (Path(tmp) / "out/small/talk.mp3").exists() and (Path(tmp) / "out/large/talk.opus").exists()
+        assert [o['quality'] for o in result['outputs']] == ["small", "small", "large", "large"]
+        assert result['output_size'] == sum(o['output_size'] for o in result['outputs'])
+
+        # Adding a preset only encodes the missing one
+        converter = make(["small", "medium", "large"])
+        converter.convert_one(source)
+        converter.close()
+        assert {target.quality for target, _ in calls[1]} == {"medium"}, calls[1]
+
+    print("  ✅ One encode call per file, outputs split into preset subdirectories")
+    return True
+
+def test_presets():
+    """Test preset compilation, file overrides and encoder options"""
+    print("\n🎛️  Testing presets...")
+
+    from convert import AudioConverter, PRESETS, load_presets
+
+    assert PRESETS['medium'].target_bytes == int(16 * 0.8 * 1024 * 1024)
+    assert (PRESETS['small'].min_bitrate, PRESETS['small'].max_bitrate) == (48, 96)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "presets.json"
+        path.write_text(json.dumps({'presets': {
+            'medium': {'bitrate': [64, 128]},
+            'voice': {'target_mb': 4, 'bitrate': [32, 64], 'mode': 'cbr', 'sample_rate': 22050, 'channels': 1},
+        }}))
+        presets = load_presets(path)
+        assert list(presets) == ['small', 'medium', 'large', 'voice']
+        assert presets['medium'].max_bitrate == 128 and presets['medium'].vbr_quality == "4"
+
+        converter = AudioConverter(Path(tmp) / "in", Path(tmp) / "out", "voice", presets=presets, use_index=False)
+        assert converter.calculate_optimal_bitrate(60) == 64
+        assert converter.calculate_optimal_bitrate(7200) == 32
+        options = converter.encoder_options(64)
+        assert options['ar'] == 22050 and options['ac'] == 1 and 'q:a' not in options, options
+        assert converter.output_signature().startswith("voice:cbr:22050hz:1ch:p"), converter.output_signature()
+
+        path.write_text(json.dumps({'presets': {'bad': {'target_mb': 4, 'bitrate': [96, 48]}}}))
+        try:
+            load_presets(path)
+        except ValueError as e:
+            assert "bitrate" in str(e)
+        else:
+            raise AssertionError("invalid bitrate bounds should be rejected")
+
+    print("  ✅ Presets compile, merge over built-ins and drive the encoder")
+    return True
+
+def test_silence_trim():
+    """Test trimmed-duration prediction and that analyses are cached in the index"""
+    print("\n✂️  Testing silence trimming...")
+
+    from convert import AudioConverter, trimmed_duration
+
+    # Leading silence dropped, pauses over 1s cut to 1s, short pauses kept
+    silences = [(0.0, 4.0), (7.0, 9.5), (10.0, 10.8), (12.5, 16.5)]
+    assert abs(trimmed_duration(16.5, silences, 1.0) - 8.0) < 1e-9
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "in" / "talk.m4a"
+        source.parent.mkdir()
+        source.write_bytes(_build_m4a(duration=60))
+        calls = []
+
+        def analyzer(path):
+            calls.append(path)
+            return {'silences': [[0.0, 10.0]]}
+
+        for _ in range(2):
+            converter = AudioConverter(source.parent, Path(tmp) / "out", trim_silence=True)
+            assert converter.get_analysis(source, "silence:test", analyzer) == {'silences': [[0.0, 10.0]]}
+            assert converter.get_analysis(source, "silence:test", analyzer) == {'silences': [[0.0, 10.0]]}
+            converter.close()
+        assert len(calls) == 1, "analysis should be reused from memory and from the index"
+
+        options = converter.encoder_options(96)
+        assert options['af'].startswith("silenceremove="), options
+        assert "trim" in converter.output_signature()
+
+    print("  ✅ Shortened duration predicted, analysis cached with probe metadata")
+    return True
+
+def test_normalize_gain():
+    """Test loudness gain limits and that the measurement is cached"""
+    print("\n🔊 Testing loudness normalization...")
+
+    import convert
+    from convert import AudioConverter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "in" / "talk.m4a"
+        source.parent.mkdir()
+        source.write_bytes(_build_m4a(duration=60))
+        measured = []
+        original = convert.measure_loudness
+        convert.measure_loudness = lambda path: measured.append(path) or {'integrated': -30.0, 'range': 6.0, 'true_peak': -10.0}
+        try:
+            converter = AudioConverter(source.parent, Path(tmp) / "out", normalize=-16.0, use_index=False)
+            # +14 dB would reach the target, but the peak ceiling allows only +9 dB
+            assert converter.loudness_gain(source) == 9.0
+            assert converter.encoder_options(96, input_path=source)['af'] == "volume=9dB"
+            converter.normalize = -35.0
+            assert converter.loudness_gain(source) == -5.0
+            assert len(measured) == 1, "measurement should be cached"
+        finally:
+            convert.measure_loudness = original
+
+    print("  ✅ Gain reaches the target without exceeding the true peak limit")
+    return True
+
+def test_convert_many():
+    """Test the asyncio core: input order, progress callbacks and per-file timeouts"""
+    print("\n⚡ Testing async convert_many...")
+
+    import asyncio
+    import time
+    from convert import AudioConverter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = Path(tmp) / "in"
+        input_dir.mkdir()
+        files = []
+        for name, duration in (("slow", 120), ("fast", 60), ("stuck", 30)):
+            files.append(input_dir / f"{name}.m4a")
+            files[-1].write_bytes(_build_m4a(duration=duration))
+
+        async def delay(input_path, outputs):
+            # "stuck" never finishes; "slow" finishes after "fast"
+            await asyncio.sleep({'slow': 0.2, 'fast': 0.0, 'stuck': 60}[input_path.stem])
+
+        converter = AudioConverter(input_dir, Path(tmp) / "out", jobs=3, use_index=False, job_timeout=1.0)
+        converter.encode_async = _fake_encoder_async(delay)
+        progress, finished = [], []
+        results = asyncio.run(converter.convert_many(
+            files, on_progress=lambda name, fraction: progress.append((name, fraction)),
+            on_result=lambda result: finished.append(result['filename'])
+        ))
+
+        assert [r['filename'] for r in results] == ["slow.m4a", "fast.m4a", "stuck.m4a"]
+        assert finished == ["fast.m4a", "slow.m4a", "stuck.m4a"], finished
+        assert [r['status'] for r in results] == ["OK", "OK", "FAILED"]
+        assert "Timed out" in results[2]['error']
+        assert ("fast.m4a", 1.0) in progress and ("slow.m4a", 0.5) in progress
+
+        # Finishing a file (index, journal) runs in a thread, so the loop keeps ticking meanwhile
+        record_conversion = converter.record_conversion
+
+        def slow_record(*args):
+            time.sleep(0.5)
+            record_conversion(*args)
+
+        async def longest_stall():
+            converter.record_conversion = slow_record
+            task = asyncio.ensure_future(converter.convert_many(files[1:2]))
+            stalls, last = [], time.perf_counter()
+            while not task.done():
+                await asyncio.sleep(0.01)
+                stalls.append(time.perf_counter() - last)
+                last = time.perf_counter()
+            return await task, max(stalls)
+
+        (result,), stall = asyncio.run(longest_stall())
+        assert result['status'] == 'OK' and stall < 0.25, (result, stall)
+
+    print("  ✅ Results keep input order, a stuck file times out alone and the loop never stalls")
+    return True
+
+def test_service_queue():
+    """Test the HTTP service with a local client: submit, 429 backpressure, status and download"""
+    print("\n🌐 Testing conversion service...")
+
+    import asyncio
+    import urllib.error
+    import urllib.request
+    from urllib.parse import quote
+    from convert import AudioConverter
+    from service import ConversionService
+
+    with tempfile.TemporaryDirectory() as tmp:
+        converter = AudioConverter(Path(tmp) / "in", Path(tmp) / "out", use_index=False)
+        release = None
+
+        async def ffmpeg_available():
+            return True
+
+        converter.check_ffmpeg_async = ffmpeg_available
+        converter.encode_async = _fake_encoder_async(lambda input_path, outputs: release.wait(),
+                                                     payload=b"ID3" + bytes(997))
+
+        def request(method, url, data=None):
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, data=data, method=method)) as response:
+                    return response.status, response.read()
+            except urllib.error.HTTPError as e:
+                return e.code, e.read()
+
+        def download_header(url):
+            with urllib.request.urlopen(url) as response:
+                response.read()
+                return response.headers['Content-Disposition']
+
+        async def scenario():
+            nonlocal release
+            release = asyncio.Event()
+            service = ConversionService(converter, workers=1, queue_size=1)
+            host, port = await service.start("127.0.0.1", 0)
+            base = f"http://{host}:{port}"
+            call = lambda *args: asyncio.to_thread(request, *args)
+            try:
+                upload = _build_m4a(duration=60)
+                status, body = await call("POST", f"{base}/jobs?name=first.m4a", upload)
+                assert status == 202, body
+                first = json.loads(body)['id']
+                while service.jobs[first]['status'] == 'queued':
+                    await asyncio.sleep(0.01)
+
+                # One job running, one waiting: the third upload is refused
+                assert (await call("POST", f"{base}/jobs?name=second.m4a", upload))[0] == 202
+                assert (await call("POST", f"{base}/jobs?name=third.m4a", upload))[0] == 429
+                assert (await call("POST", f"{base}/jobs?name=notes.txt", b"x"))[0] == 415
+                assert (await call("GET", f"{base}/jobs/{first}/output"))[0] == 409
+
+                release.set()
+                await service.queue.join()
+                status, body = await call("GET", f"{base}/jobs/{first}")
+                assert status == 200 and json.loads(body)['status'] == 'done', body
+                status, body = await call("GET", f"{base}/jobs/{first}/output")
+                assert status == 200 and body.startswith(b"ID3") and len(body) == 1000
+                assert (await call("DELETE", f"{base}/jobs/{first}"))[0] == 200
+                assert (await call("GET", f"{base}/jobs/{first}"))[0] == 404
+
+                # The second job is left behind by its client: it expires with its files
+                second = next(iter(service.jobs.values()))
+                output = Path(second['result']['outputs'][0]['output'])
+                assert output.exists() and service.expire_jobs() == 0
+                assert service.expire_jobs(now=second['finished_at'] + service.job_ttl) == 1
+                assert not service.jobs and not output.exists()
+
+                # Non-Latin-1 names download with an RFC 5987 filename; CR/LF in a name is refused
+                status, body = await call("POST", f"{base}/jobs?name={quote('日本語.m4a')}", upload)
+                assert status == 202, body
+                await service.queue.join()
+                disposition = await asyncio.to_thread(download_header, f"{base}/jobs/{json.loads(body)['id']}/output")
+                assert disposition == "attachment; filename=\"___.mp3\"; filename*=UTF-8''" + quote('日本語.mp3'), disposition
+                status, body = await call("POST", f"{base}/jobs?name={quote('a' + chr(13) + chr(10) + 'X-Evil: 1.m4a')}", upload)
+                assert status == 400 and b"control characters" in body, body
+            finally:
+                await service.stop()
+
+        asyncio.run(scenario())
+
+    print("  ✅ Full queue answers 429; finished jobs download, delete and expire; names are safe in headers")
+    return True
+
+def test_atomic_resume():
+    """Test that failed encodes leave no output and --resume skips journaled files"""
+    print("\n↩️  Testing atomic outputs and resume...")
+
+    import signal
+    import threading
+    import time
+    import convert
+    from convert import AudioConverter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = Path(tmp) / "in"
+        input_dir.mkdir()
+        files = []
+        for name in ("a", "b", "c"):
+            files.append(input_dir / f"{name}.m4a")
+            files[-1].write_bytes(_build_m4a(duration=60))
+        written = []
+
+        def kill_b(input_path, outputs):
+            written.extend(output_path for output_path, _, _ in outputs)
+            if input_path.stem == "b":
+                _write_outputs(outputs, bytes(500))
+                raise RuntimeError("encoder killed")
+
+        converter = AudioConverter(input_dir, Path(tmp) / "out", use_index=False)
+        converter.encode = _fake_encoder(kill_b)
+        converter.open_journal()
+        results = [converter.convert_one(f) for f in files]
+        converter.close()
+
+        assert [r['status'] for r in results] == ["OK", "FAILED", "OK"]
+        assert all(path.name.startswith(".") and ".partial" in path.name for path in written), written
+        assert sorted(p.name for p in (Path(tmp) / "out").glob("*.mp3")) == ["a.mp3", "c.mp3"]
+        assert not list((Path(tmp) / "out").glob(".*.partial.*")), "partial files must be cleaned up"
+
+        # The failed file is retried; a finished file whose input changed is redone
+        os.utime(files[2], ns=(0, 10 ** 18))
+        stale = Path(tmp) / "out" / ".b.0badc0de.partial.mp3"
+        stale.write_bytes(bytes(500))
+        converter = AudioConverter(input_dir, Path(tmp) / "out", use_index=False, resume=True)
+        converter.open_journal()
+        resumed = []
+        remaining = list(converter.unjournaled(files, resumed))
+        converter.close()
+
+        assert remaining == [files[1], files[2]], remaining
+        assert [r['filename'] for r in resumed] == ["a.m4a"]
+        assert not stale.exists(), "resume should sweep partial files of the killed run"
+
+        # Up-to-date files skipped by --incremental are journaled as finished
+        for _ in range(2):
+            converter = AudioConverter(input_dir, Path(tmp) / "index-out", incremental=True)
+            converter.encode = _fake_encoder()
+            converter.open_journal()
+            skipped = converter.convert_one(files[0])
+            converter.close()
+        assert skipped['status'] == 'SKIPPED', skipped
+        converter = AudioConverter(input_dir, Path(tmp) / "index-out", resume=True)
+        converter.open_journal()
+        assert list(converter.unjournaled(files[:1], [])) == []
+        converter.close()
+
+        # SIGTERM kills running encodes instead of waiting for them, and journals nothing
+        def hang(input_path, outputs):
+            convert.spawn(['sleep', '30']).wait()
+            raise RuntimeError("ffmpeg killed")
+
+        converter = AudioConverter(input_dir, Path(tmp) / "term-out", use_index=False, jobs=2)
+        converter.encode = _fake_encoder(hang)
+        converter.open_journal()
+        previous = signal.signal(signal.SIGTERM, convert.exit_on_sigterm)
+        threading.Timer(0.5, os.kill, (os.getpid(), signal.SIGTERM)).start()
+        started = time.perf_counter()
+        try:
+            converter.convert_files(files)
+        except SystemExit as e:
+            assert e.code == 128 + signal.SIGTERM
+        else:
+            raise AssertionError("SIGTERM should stop the batch")
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+            converter.close()
+        assert time.perf_counter() - started < 5
+        assert not (Path(tmp) / "term-out" / ".converter-journal.jsonl").read_text()
+        assert not list((Path(tmp) / "term-out").glob(".*.partial.*"))
+
+    print("  ✅ Outputs appear only when complete; resume skips finished files; SIGTERM stops at once")
+    return True
+
+def test_report_formats():
+    """Test that --report json/ndjson print only JSON on stdout, through the CLI"""
+    print("\n🧾 Testing machine-readable reports...")
+
+    import subprocess
+
+    # The CLI in a child process, with ffmpeg stubbed out so no encode runs
+    script = """
+import sys
+import convert
+from convert import AudioConverter, new_stage_metrics
+
+def encode(self, input_path, outputs):
+    for output_path, _, _ in outputs:
+        output_path.write_bytes(bytes(1000))
+    return new_stage_metrics()
+
+AudioConverter.check_ffmpeg = lambda self: True
+AudioConverter.encode = encode
+sys.argv[0] = "convert.py"
+convert.main()
+"""
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = Path(tmp) / "in"
+        input_dir.mkdir()
+        for name in ("a", "b"):
+            (input_dir / f"{name}.m4a").write_bytes(_build_m4a(duration=60))
+
+        def run(report, *options):
+            result = subprocess.run(
+                [sys.executable, '-c', script, '--report', report, '--input', str(input_dir),
+                 '--output', str(Path(tmp) / report), '--backend', 'ffmpeg', '--no-index', *options],
+                cwd=Path(__file__).parent, capture_output=True, text=True, timeout=60)
+            assert result.returncode == 0, result.stderr
+            return result.stdout
+
+        document = json.loads(run("json"))  # one document and nothing else
+        assert set(document) >= {'files', 'settings', 'results', 'summary'}, list(document)
+        assert sorted(r['filename'] for r in document['results']) == ["a.m4a", "b.m4a"]
+        assert {r['status'] for r in document['results']} == {"OK"}
+        assert document['summary']['files'] == 2 and document['summary']['statuses'] == {"OK": 2}
+
+        events = [json.loads(line) for line in run("ndjson").splitlines()]  # every line is JSON
+        names = [event['event'] for event in events]
+        assert names[:2] == ["files", "settings"] and names[-1] == "summary", names
+        assert sorted(e['filename'] for e in events if e['event'] == 'result') == ["a.m4a", "b.m4a"]
+
+        # --recursive streams files while scanning, but reports the same events
+        (input_dir / "sub").mkdir()
+        (input_dir / "sub" / "c.m4a").write_bytes(_build_m4a(duration=60))
+        events = [json.loads(line) for line in run("ndjson", "--recursive").splitlines()]
+        names = [event['event'] for event in events]
+        assert names == ["settings", "result", "result", "result", "files", "summary"], names
+        assert sorted(f['filename'] for f in events[4]['files']) == ["a.m4a", "b.m4a", "sub/c.m4a"], events[4]
+        assert events[-1]['files'] == 3, events[-1]
+
+    print("  ✅ JSON report is one document, NDJSON one event per line, nothing else on stdout")
+    return True
+
+def test_timeout_retry_quarantine():
+    """Test that a hung encode is killed, transient failures are retried and poison files quarantined"""
+    print("\n🧯 Testing timeouts, retries and quarantine...")
+
+    import errno
+    import time
+    import convert
+    from convert import AudioConverter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = Path(tmp) / "in"
+        input_dir.mkdir()
+        for name in ("hang", "flaky"):
+            (input_dir / f"{name}.m4a").write_bytes(_build_m4a(duration=60))
+        attempts = {}
+
+        def hang_or_flake(input_path, outputs):
+            attempts[input_path.stem] = attempts.get(input_path.stem, 0) + 1
+            if input_path.stem == "hang":
+                # Stands in for an ffmpeg stuck on a corrupt input
+                process = convert.spawn(['sleep', '30'])
+                process.wait()
+                raise RuntimeError(f"ffmpeg exited with {process.returncode}")
+            if attempts["flaky"] == 1:
+                raise RuntimeError("Resource temporarily unavailable")
+
+        converter = AudioConverter(input_dir, Path(tmp) / "out", use_index=False, job_timeout=0.3,
+                                   retries=1, retry_backoff=0.0, quarantine_dir=Path(tmp) / "quarantine")
+        converter.encode = _fake_encoder(hang_or_flake)
+        hang = converter.convert_one(input_dir / "hang.m4a")
+        flaky = converter.convert_one(input_dir / "flaky.m4a")
+
+        assert hang['status'] == 'FAILED' and hang['error'] == "Timed out after 0.3s", hang
+        assert hang['attempts'] == 2 and attempts["hang"] == 2
+        assert not (input_dir / "hang.m4a").exists()
+        assert (Path(tmp) / "quarantine" / "hang.m4a").exists()
+        assert "Timed out" in (Path(tmp) / "quarantine" / "hang.m4a.error").read_text()
+        assert flaky['status'] == 'OK' and flaky['attempts'] == 2, flaky
+        assert (input_dir / "flaky.m4a").exists()
+
+        # A hung ffprobe is killed as well, and a file slow in Python alone is not a timeout
+        bin_dir = Path(tmp) / "bin"
+        bin_dir.mkdir()
+        (bin_dir / "ffprobe").write_text("#!/bin/sh\nexec sleep 30\n")
+        (bin_dir / "ffprobe").chmod(0o755)
+        (input_dir / "odd.mkv").write_bytes(b"not really matroska")
+        (input_dir / "slow.m4a").write_bytes(_build_m4a(duration=60))
+
+        def slow_then_fail(input_path, outputs):
+            time.sleep(0.5)
+            raise RuntimeError("Invalid data found when processing input")
+
+        converter = AudioConverter(input_dir, Path(tmp) / "out", use_index=False, job_timeout=0.3)
+        converter.encode = _fake_encoder(slow_then_fail)
+        path = os.environ["PATH"]
+        os.environ["PATH"] = f"{bin_dir}{os.pathsep}{path}"
+        try:
+            started = time.perf_counter()
+            odd = converter.convert_one(input_dir / "odd.mkv")
+            elapsed = time.perf_counter() - started
+        finally:
+            os.environ["PATH"] = path
+        slow = converter.convert_one(input_dir / "slow.m4a")
+
+        assert odd['status'] == 'FAILED' and odd['error'] == "Timed out after 0.3s", odd
+        assert elapsed < 5, elapsed
+        assert slow['status'] == 'FAILED' and slow['error'].startswith("Invalid data"), slow
+
+        # A broken input is not retried, and quarantined once it failed in two runs; a full disk never is
+        (input_dir / "corrupt.m4a").write_bytes(_build_m4a(duration=60))
+        (input_dir / "full.m4a").write_bytes(_build_m4a(duration=60))
+        attempts.clear()
+
+        def corrupt_or_full(input_path, outputs):
+            attempts[input_path.stem] = attempts.get(input_path.stem, 0) + 1
+            if input_path.stem == "corrupt":
+                raise RuntimeError("Invalid data found when processing input")
+            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+        for run in (1, 2):
+            converter = AudioConverter(input_dir, Path(tmp) / "out", job_timeout=0.3, retries=2,
+                                       retry_backoff=0.0, quarantine_dir=Path(tmp) / "quarantine")
+            converter.encode = _fake_encoder(corrupt_or_full)
+            corrupt = converter.convert_one(input_dir / "corrupt.m4a")
+            full = converter.convert_one(input_dir / "full.m4a")
+            converter.close()
+            assert corrupt['attempts'] == 1 and corrupt['cause'] == 'input', corrupt
+            assert full['attempts'] == 1 and full['cause'] == 'environment', full
+            assert 'quarantined' not in full and (input_dir / "full.m4a").exists()
+            assert ('quarantined' in corrupt) == (run == 2), corrupt
+        assert attempts == {"corrupt": 2, "full": 2}, attempts
+        assert (Path(tmp) / "quarantine" / "corrupt.m4a").exists()
+        assert convert.failure_cause(RuntimeError("out.mp3: No space left on device")) == 'environment'
+
+    print("  ✅ Hung encode and probe killed; transient failure retried; only broken inputs quarantined")
+    return True
+
+def test_find_duplicates():
+    """Test that identical inputs are detected regardless of their names"""
+    print("\n🔗 Testing duplicate detection...")
+
+    from convert import AudioConverter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = Path(tmp) / "in"
+        input_dir.mkdir()
+        body = os.urandom(300 * 1024)
+        paths = {}
+        for name, data in (("a", body), ("b", body), ("c", body[:-1] + b"x"), ("d", b"short")):
+            paths[name] = input_dir / f"{name}.m4a"
+            paths[name].write_bytes(data)
+
+        converter = AudioConverter(input_dir, Path(tmp) / "out", dedup=True)
+        duplicates = converter.find_duplicates([paths[n] for n in "abcd"])
+        converter.close()
+
+        assert duplicates == {paths["b"]: paths["a"]}, duplicates
+
+        # A duplicate of a failed file fails the same way, with the same fields as any failure
+        failed = converter.failed_result(paths["a"], "Invalid data found when processing input", 'input', 2)
+        linked = converter.link_duplicate(paths["b"], paths["a"], failed)
+        assert linked == dict(failed, filename="b.m4a"), linked
+        converted = {'status': 'OK', 'outputs': [{'quality': converter.quality, 'codec': 'mp3'}]}
+        linked = converter.link_duplicate(paths["b"], paths["a"], converted)  # a.mp3 was never written
+        assert linked['status'] == 'FAILED' and linked['cause'] == 'environment' and linked['attempts'] == 1, linked
+
+    print("  ✅ Same-size files with different content kept apart; failed duplicates carry a cause")
+    return True
+
+def test_stage_metrics():
+    """Test stage aggregation and the Prometheus export"""
+    print("\n⏱️  Testing stage metrics...")
+
+    from convert import new_stage_metrics, stage_totals, prometheus_metrics
+
+    results = [
+        {'filename': 'a.m4a', 'status': 'OK',
+         'metrics': new_stage_metrics(probe_time=0.5, encode_time=2.0, queue_wait=1.0, cpu_time=3.0, peak_rss_kb=100)},
+        {'filename': 'b.m4a', 'status': 'OK',
+         'metrics': new_stage_metrics(decode_time=1.5, encode_time=1.0, cpu_time=None, peak_rss_kb=None)},
+        {'filename': 'c.m4a', 'status': 'SKIPPED'},
+    ]
+    totals = stage_totals(results)
+    assert totals['files'] == 2
+    assert totals['encode_time'] == 3.0 and totals['decode_time'] == 1.5
+    assert totals['cpu_time'] == 3.0 and totals['peak_rss_kb'] == 100
+
+    text = prometheus_metrics(results)
+    assert 'converter_files_total{status="SKIPPED"} 1' in text
+    assert 'converter_stage_seconds{stage="encode"} 3.000000' in text
+    assert 'converter_ffmpeg_peak_rss_bytes 102400' in text
+
+    print("  ✅ Stage totals and Prometheus text rendered")
+    return True
+
+def test_recursive_scan():
+    """Test recursive scanning, pattern filters and mirrored output paths"""
+    print("\n🌲 Testing recursive scan...")
+
+    from convert import AudioConverter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "in"
+        for relative in ("talk.m4a", "b/deep/LOUD.M4A", "b/notes.txt", "tmp/draft.m4a"):
+            (root / relative).parent.mkdir(parents=True, exist_ok=True)
+            (root / relative).write_bytes(b"x")
+
+        converter = AudioConverter(root, Path(tmp) / "out", recursive=True, exclude=["tmp/*"], use_index=False)
+        files = converter.iter_input_files()
+        assert not isinstance(files, list), "scan should be lazy"
+        names = [converter.relative_name(f) for f in files]
+        assert names == ["talk.m4a", "b/deep/LOUD.M4A"], names
+        assert converter.output_path_for(root / "b/deep/LOUD.M4A") == Path(tmp) / "out/b/deep/LOUD.mp3"
+
+        flat = AudioConverter(root, Path(tmp) / "out", use_index=False)
+        assert [f.name for f in flat.find_audio_files()] == ["talk.m4a"]
+
+    print("  ✅ Nested, upper-case and filtered files handled")
+    return True
+
+def test_stem_collisions():
+    """Test that inputs differing only in extension get separate outputs and partial files"""
+    print("\n👯 Testing output name collisions...")
+
+    import time
+    from convert import AudioConverter, make_partial_path
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = Path(tmp) / "in"
+        input_dir.mkdir()
+        for name in ("solo.m4a", "talk.M4A", "talk.m4a"):
+            (input_dir / name).write_bytes(_build_m4a(duration=60))
+
+        converter = AudioConverter(input_dir, Path(tmp) / "out", jobs=3, use_index=False)
+        files = converter.find_audio_files()
+        assert converter.output_path_for(input_dir / "solo.m4a").name == "solo.mp3"
+        assert converter.output_path_for(input_dir / "talk.m4a").name == "talk.m4a.mp3"
+
+        # Both talk encodes run at the same time
+        converter.encode = _fake_encoder(lambda input_path, outputs: time.sleep(0.2))
+        results = converter.convert_files(files)
+        assert [r['status'] for r in results] == ["OK"] * 3, results
+        outputs = sorted(p.name for p in (Path(tmp) / "out").iterdir())
+        assert outputs == ["solo.mp3", "talk.M4A.mp3", "talk.m4a.mp3"], outputs
+
+        output = Path(tmp) / "out" / "x.mp3"
+        first, second = make_partial_path(output), make_partial_path(output)
+        assert first != second and first.exists() and second.exists()
+
+    print("  ✅ talk.m4a and talk.M4A keep their extensions; partial names are unique")
+    return True
+
+def test_encoder_backends():
+    """Test backend registration and the cached --backend auto choice"""
+    print("\n🔌 Testing encoder backends...")
+
+    import convert
+    from convert import AudioConverter, EncoderBackend
+
+    convert.register_encoder_backend(EncoderBackend(
+        'fake', "Test backend", lambda converter, input_path, outputs: {}, lambda: True, codecs=('mp3',)
+    ))
+    saved = os.environ.get('XDG_CACHE_HOME')
+    try:
+        assert 'fake' in convert.available_backends(['mp3'])
+        assert 'fake' not in convert.available_backends(['opus']), "mp3-only backend offered for opus"
+
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ['XDG_CACHE_HOME'] = tmp
+            runs = []
+
+            def fake_benchmark(candidates):
+                runs.append(candidates)
+                return {name: (0.1 if name == 'fake' else 1.0) for name in candidates}
+
+            for _ in range(2):
+                converter = AudioConverter(Path(tmp) / "in", Path(tmp) / "out", backend="auto", use_index=False)
+                converter.benchmark_backends = fake_benchmark
+                assert converter.resolve_backend() == 'fake'
+                assert converter.backend == 'fake'
+            assert len(runs) == 1, "second converter should reuse the cached choice"
+            assert (Path(tmp) / "audio-converter" / "backend-choice.json").exists()
+
+            # An ffmpeg that cannot synthesize the clip, or none at all, times nothing instead of crashing
+            bin_dir = Path(tmp) / "bin"
+            bin_dir.mkdir()
+            (bin_dir / "ffmpeg").write_text("#!/bin/sh\nexit 1\n")
+            (bin_dir / "ffmpeg").chmod(0o755)
+            path = os.environ["PATH"]
+            try:
+                for search_path in (str(bin_dir), str(Path(tmp) / "empty")):
+                    os.environ["PATH"] = search_path
+                    assert AudioConverter.benchmark_backends(converter, ['ffmpeg', 'fake']) == {}
+            finally:
+                os.environ["PATH"] = path
+    finally:
+        del convert.ENCODER_BACKENDS['fake']
+        if saved is None:
+            os.environ.pop('XDG_CACHE_HOME', None)
+        else:
+            os.environ['XDG_CACHE_HOME'] = saved
+
+    print("  ✅ Fastest backend chosen once and cached; a failed benchmark clip falls back")
+    return True
+
+def test_ffmpeg_encoders():
+    """Test the ffmpeg and stream backends on a short generated clip, including their failures"""
+    print("\n🎛️  Testing ffmpeg and stream encoders...")
+
+    import subprocess
+    from convert import AudioConverter, read_decoded_info
+
+    with tempfile.TemporaryDirectory() as tmp:
+        clip = Path(tmp) / "clip.wav"
+        subprocess.run(['ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', 'sine=duration=10', '-ac', '2', str(clip)],
+                       check=True)
+        junk = Path(tmp) / "junk.wav"
+        junk.write_bytes(os.urandom(50000))
+
+        # An odd buffer size is rounded down to whole stereo frames
+        converter = AudioConverter(Path(tmp) / "in", Path(tmp) / "out", use_index=False,
+                                   backend="stream", buffer_size=10001)
+        info = converter.get_audio_info(clip)
+        sizes = [len(chunk) for chunk in converter.iter_pcm_chunks(clip, info)]
+        assert set(sizes[:-1]) == {10000} and sizes[-1] <= 10000, sizes[-3:]
+        assert sum(sizes) == 10 * 44100 * 4, sum(sizes)
+
+        def fails(output_name, input_path=clip):
+            target = converter.targets[0]
+            try:
+                converter.encode(input_path, [(Path(tmp) / output_name, 64, target)])
+            except RuntimeError as e:
+                return str(e)
+            raise AssertionError(f"{converter.backend} encode of {input_path.name} should fail")
+
+        for backend in ("stream", "ffmpeg"):
+            converter.backend = backend
+            output = Path(tmp) / "out" / f"{backend}.mp3"
+            metrics = converter.encode(clip, [(output, 64, converter.targets[0])])
+            assert abs(read_decoded_info(output)['duration'] - 10) < 0.1, backend
+            assert metrics['encode_time'] > 0 and metrics['cpu_time'] > 0, metrics
+            assert "Invalid data" in fails(f"out/{backend}-junk.mp3", junk)
+        # The encoder dies before taking all the PCM: its error wins over the broken pipe
+        converter.backend = "stream"
+        assert "No such file" in fails("missing/stream.mp3")
+
+    print("  ✅ PCM chunked in whole frames; encoder and decoder errors reported")
+    return True
+
+def test_convert_files_order():
+    """Test that worker threads finishing out of order still give results in input order"""
+    print("\n🔀 Testing convert_files ordering...")
+
+    import time
+    from convert import AudioConverter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = Path(tmp) / "in"
+        input_dir.mkdir()
+        files = []
+        for name in ("slow", "medium", "fast"):
+            files.append(input_dir / f"{name}.m4a")
+            files[-1].write_bytes(_build_m4a(duration=60))
+        finished = []
+
+        def delay(input_path, outputs):
+            time.sleep({'slow': 0.4, 'medium': 0.2, 'fast': 0.0}[input_path.stem])
+            finished.append(input_path.stem)
+
+        converter = AudioConverter(input_dir, Path(tmp) / "out", jobs=3, use_index=False)
+        converter.encode = _fake_encoder(delay)
+        results = converter.convert_files(files)
+
+        assert finished == ["fast", "medium", "slow"], finished
+        assert [r['filename'] for r in results] == ["slow.m4a", "medium.m4a", "fast.m4a"]
+        assert all(r['status'] == 'OK' for r in results), results
+
+        # An input deleted while the batch runs fails alone instead of aborting the others
+        def delete_fast(input_path, outputs):
+            if input_path.stem == "slow":
+                files[2].unlink()  # fast.m4a is queued behind the two running files
+            else:
+                time.sleep(0.2)
+
+        converter = AudioConverter(input_dir, Path(tmp) / "out2", jobs=2, incremental=True)
+        converter.encode = _fake_encoder(delete_fast)
+        results = converter.convert_files(files)
+        converter.close()
+
+        assert [r['status'] for r in results] == ["OK", "OK", "FAILED"], results
+        assert results[2]['cause'] == 'environment' and results[2]['filename'] == "fast.m4a", results[2]
+
+    print("  ✅ Results keep input order; a vanished input fails alone")
+    return True
+
+def test_watch_scan():
+    """Test that watch mode queues a file only once it stops changing, and forgets deleted files"""
+    print("\n👀 Testing watch scan...")
+
+    from concurrent.futures import Future, ThreadPoolExecutor
+    from convert import AudioConverter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = Path(tmp) / "in"
+        input_dir.mkdir()
+        recording = input_dir / "live.m4a"
+        recording.write_bytes(bytes(1000))
+        converter = AudioConverter(input_dir, Path(tmp) / "out", use_index=False)
+        pending, handled = {}, {}
+
+        assert converter.watch_scan(pending, handled, 0.0, 5.0) == []
+        # Still being copied: growing resets the settle clock
+        with open(recording, 'ab') as f:
+            f.write(bytes(1000))
+        assert converter.watch_scan(pending, handled, 6.0, 5.0) == []
+        assert converter.watch_scan(pending, handled, 10.0, 5.0) == []
+        assert converter.watch_scan(pending, handled, 11.0, 5.0) == [recording]
+        assert converter.watch_scan(pending, handled, 20.0, 5.0) == [], "a handled file is queued once"
+        assert recording in handled and not pending
+
+        recording.unlink()
+        assert converter.watch_scan(pending, handled, 21.0, 5.0) == []
+        assert not handled and not pending, (handled, pending)
+
+        # A settled file moved away before its worker runs fails alone; so does a crashed conversion
+        moved = input_dir / "moved-away.m4a"
+        moved.write_bytes(_build_m4a(duration=60))
+        converter = AudioConverter(input_dir, Path(tmp) / "out", incremental=True)
+        converter.encode = _fake_encoder()
+        assert converter.watch_scan(pending, handled, 30.0, 5.0) == []
+        assert converter.watch_scan(pending, handled, 40.0, 5.0) == [moved]
+        moved.rename(Path(tmp) / "moved-away.m4a")
+        assert converter.current_outputs(moved) == {} and converter.previous_failures(moved) == 0
+        crashed = Future()
+        crashed.set_exception(RuntimeError("worker crashed"))
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            running = {pool.submit(converter.convert_one, moved): moved, crashed: input_dir / "crash.m4a"}
+        results = converter.watch_results(running)
+        converter.close()
+
+        assert not running and [r['status'] for r in results] == ["FAILED", "FAILED"], results
+        assert results[0]['filename'] == "moved-away.m4a" and results[0]['cause'] == 'environment', results[0]
+        assert results[1]['error'] == "worker crashed", results[1]
+
+    print("  ✅ Growing files wait; settled files queue once; vanished files are forgotten or fail alone")
+    return True
+
 def create_sample_instruction():
     """Create sample instruction file"""
     sample_file = Path("input/README_PLACE_FILES_HERE.txt")
@@ -134,6 +1246,20 @@ def main():
     if not converter_ok:
         all_passed = False
 
+    # Unit tests
+    for unit_test in (test_mp4_header_probe, test_format_headers, test_lazy_imports, test_ffmpeg_check_cache,
+                      test_probe_cache, test_metadata_index, test_strict_size_reencode, test_incremental_skip,
+                      test_multi_target_fanout, test_presets, test_silence_trim, test_normalize_gain,
+                      test_convert_many, test_service_queue, test_atomic_resume, test_report_formats,
+                      test_timeout_retry_quarantine, test_find_duplicates, test_stage_metrics,
+                      test_recursive_scan, test_stem_collisions, test_encoder_backends, test_ffmpeg_encoders,
+                      test_convert_files_order, test_watch_scan):
+        try:
+            unit_test()
+        except AssertionError as e:
+            print(f"  ❌ {unit_test.__name__}: {e}")
+            all_passed = False
+
     # Create sample instruction
     create_sample_instruction()
 